@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'feaapi.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -105,6 +106,14 @@ AUTH_PASSWORD_VALIDATORS = [
 
 LOGIN_URL = '/account/login/'
 
+# Request profiling (see feaapi.middleware.ProfilingMiddleware)
+PROFILING_SAMPLE_RATE = 0.01
+PROFILING_SLOW_REQUEST_MS = 500
+PROFILING_SERVER_TIMING = DEBUG
+
+# Version of the core game data in the fixtures (see feaapi.api.catalog); bump it whenever they change
+CORE_DATA_VERSION = 1
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/2.1/topics/i18n/
@@ -35,3 +35,4 @@ admin.site.register(play.ActiveWeapon)
 admin.site.register(play.GameFormat)
 admin.site.register(play.SkillData)
 admin.site.register(play.MatchRequest)
+admin.site.register(play.PlayerRating)
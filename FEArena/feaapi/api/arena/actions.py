@@ -5,13 +5,15 @@ from ..calc import ranks
 from ..calc import combat
 from ..calc import combat_data
 from .. import skills
-from ...models.core.Game import WeaponBreakBehavior, FireEmblemGame
+from ..catalog import core_catalog
+from ...models.core.Game import WeaponBreakBehavior
 from ...models.core.Skill import Skill
 from ...models.play.ActiveArena import ActiveArena
 from ...models.play.ActiveUnit import ActiveUnit
 from ...models.play.ActiveWeapon import ActiveWeapon
 from ...models.play.ActiveItem import ActiveItem
 from .helper import *
+from .identity import ArenaIndex
 
 
 # def validate_order(action_list: List[str]):
@@ -49,9 +51,9 @@ def execute_action(arena: ActiveArena, unit: ActiveUnit, act: Dict) -> List[Dict
     if act['action'] in restricted_actions:
         raise ValueError(f"Unit is not allowed to perform action '{act['action']}' right now")
     if act['action'] == 'equip_weapon':
-        return equip_weapon(arena.game, unit, act['weapon'])
+        return equip_weapon(arena, unit, act['weapon'])
     elif act['action'] == 'equip_item':
-        return equip_item(unit, act['item'])
+        return equip_item(arena, unit, act['item'])
     elif act['action'] == 'attack':
         return attack(arena, unit, act['target'], act['with_weapon'], act['range'])
     elif act['action'] == 'use_weapon':
@@ -61,15 +63,51 @@ def execute_action(arena: ActiveArena, unit: ActiveUnit, act: Dict) -> List[Dict
     elif act['action'] == 'use_skill':
         return use_skill(arena, unit, act['skill'], act.get('target', None), act.get('extra_data', None))
     elif act['action'] == 'discard_weapon':
-        return discard_weapon(arena.game, unit, act['weapon'])
+        return discard_weapon(arena, unit, act['weapon'])
     elif act['action'] == 'discard_item':
-        return discard_item(unit, act['item'])
+        return discard_item(arena, unit, act['item'])
     elif act['action'] == 'wait':
         return wait(arena)
     else:
         raise ValueError(f"'{act['action']}' is not a valid action")
 
 
+def _held_weapon(arena: ActiveArena, unit: ActiveUnit, weapon_id: Union[int, ActiveWeapon]) -> ActiveWeapon:
+    # finds the given weapon in the arena's index, making sure the unit is the one holding it
+    index = ArenaIndex.of(arena)
+    if isinstance(weapon_id, ActiveWeapon):
+        weapon_id = weapon_id.id
+    weapon = index.weapons.get(weapon_id)
+    if weapon is None:
+        raise ValueError(f"The weapon with id {weapon_id} does not exist!")
+    if index.holder_of_weapon(weapon) is not unit:
+        raise ValueError(f"The active unit {unit.template.nickname} is not holding weapon with id {weapon_id}")
+    return weapon
+
+
+def _held_item(arena: ActiveArena, unit: ActiveUnit, item_id: Union[int, ActiveItem]) -> ActiveItem:
+    # finds the given item in the arena's index, making sure the unit is the one holding it
+    index = ArenaIndex.of(arena)
+    if isinstance(item_id, ActiveItem):
+        item_id = item_id.id
+    item = index.items.get(item_id)
+    if item is None:
+        raise ValueError(f"The item with id {item_id} does not exist!")
+    if index.holder_of_item(item) is not unit:
+        raise ValueError(f"The active unit {unit.template.nickname} is not holding the item with id {item_id}")
+    return item
+
+
+def _target_unit(arena: ActiveArena, unit_id: Optional[int], error: str) -> Optional[ActiveUnit]:
+    # finds the given unit among those in the arena, raising the given error if it isn't there
+    if unit_id is None:
+        return None
+    target = ArenaIndex.of(arena).units.get(unit_id)
+    if target is None:
+        raise ValueError(error)
+    return target
+
+
 def wait(arena: ActiveArena) -> List[Dict]:
     """
     Makes the unit wait. This does nothing other than end the turn, and trigger
@@ -80,69 +118,61 @@ def wait(arena: ActiveArena) -> List[Dict]:
     return [{"action": "wait"}]
 
 
-def equip_weapon(game: FireEmblemGame, unit: ActiveUnit, weapon_id: int) -> List[Dict]:
+def equip_weapon(arena: ActiveArena, unit: ActiveUnit, weapon_id: Union[int, ActiveWeapon]) -> List[Dict]:
     """
     Equips the weapon with the given weapon_id to the unit, if possible, triggering its effects
     on equip. If the unit does not have the weapon, the unit cannot use the weapon, or the
     weapon does not exist, raises a ValueError.
-    :param game: The Fire Emblem game whose mechanics should be used for weapon level considerations
+    :param arena: the ActiveArena the unit is in, whose game's mechanics are used for weapon level considerations
     :param unit: unit to which to equip weapon
-    :param weapon_id: id of weapon to equip
+    :param weapon_id: id of weapon to equip, or for convenience, the weapon itself
     :return: a summary of the equip_weapon action's effects, conforming to the format defined
         in the action_output_schema (see api.arena.schemas)
     """
     # validate
-    try:
-        weapon: ActiveWeapon = ActiveWeapon.objects.get(id=weapon_id)
-    except ObjectDoesNotExist:
-        raise ValueError(f"The weapon with id {weapon_id} does not exist!")
-    if weapon not in unit.weapons.all():
-        raise ValueError(f"The active unit {unit.template.nickname} is not holding weapon with id {weapon_id}")
-    if not ranks.unit_can_equip_weapon(game, unit, weapon):
+    weapon: ActiveWeapon = _held_weapon(arena, unit, weapon_id)
+    if not ranks.unit_can_equip_weapon(arena.game, unit, weapon):
         raise ValueError(f"The active unit {unit.template.nickname}'s weapon rank is insufficient to equip the"
                          f" weapon {weapon.template.name} (rank {weapon.template.rank}")
     # unequip unit's other weapons, and equip this one
     output = []
-    equipped_weapons = unit.weapons.filter(equipped=True)
-    for equipped_weapon in equipped_weapons.all():
+    equipped_weapons = [w for w in unit.weapons.all() if w.equipped]
+    for equipped_weapon in equipped_weapons:
         equipped_weapon.equipped = False
         equipped_weapon.save()
         output.append({"action": "unequip_weapon", "unit": unit.id, "weapon": equipped_weapon.id})
         output += skills.dequip_all(equipped_weapon.template.weapon_effects.all(), unit)
     weapon.equipped = True
     weapon.save()
-    output.append({"action": "equip_weapon", "unit": unit.id, "weapon": weapon_id})
+    output.append({"action": "equip_weapon", "unit": unit.id, "weapon": weapon.id})
     output += skills.equip_all(weapon.template.weapon_effects.all(), unit)
+    skills.invalidate_skill_index(unit)
     # swap item inventory ids, as applicable
     output += shift_weapon_to_front_of_inventory(weapon, unit)
     return output
 
 
-def equip_item(unit: ActiveUnit, item_id: int) -> List[Dict]:
+def equip_item(arena: ActiveArena, unit: ActiveUnit, item_id: int) -> List[Dict]:
     """
     Equips the item with the given item_id to the unit, if possible, triggering its effects
     on equip. If the unit does not have the item, the item isn't equippable, or the item
     does not exist, raises a ValueError.
+    :param arena: the ActiveArena the unit is in
     :param unit: unit to which to equip item
     :param item_id: id of weapon to equip
     :return: a summary of the equip_weapon action's effects, conforming to the format defined
         in the action_output_schema (see api.arena.schemas)
     """
     # validate
-    try:
-        item: ActiveItem = ActiveItem.objects.get(id=item_id)
-    except ObjectDoesNotExist:
-        raise ValueError(f"The item with id {item_id} does not exist!")
-    if item not in unit.items.all():
-        raise ValueError(f"The active unit {unit.template.nickname} is not holding the item with id {item_id}")
+    item: ActiveItem = _held_item(arena, unit, item_id)
     if item.template.prf_users.count and unit not in item.template.prf_users.all():
         raise ValueError(f"The active unit {unit.template.nickname} cannot equip the Prf item {item.template.name}")
     if not item.template.equippable:
         raise ValueError(f"The item {item.template.name} is not equippable")
     # unequip unit's other items, and equip this one
     output = []
-    equipped_items = unit.items.filter(equipped=True)
-    for equipped_item in equipped_items.all():
+    equipped_items = [i for i in unit.items.all() if i.equipped]
+    for equipped_item in equipped_items:
         equipped_item.equipped = False
         equipped_item.save()
         output.append({"action": "unequip_item", "unit": unit.id, "item": equipped_item.id})
@@ -151,6 +181,7 @@ def equip_item(unit: ActiveUnit, item_id: int) -> List[Dict]:
     item.save()
     output.append({"action": "equip_weapon", "unit": unit.id, "weapon": item_id})
     output += skills.equip_all(item.template.item_effects.all(), unit)
+    skills.invalidate_skill_index(unit)
     # swap item inventory ids, as applicable
     output += shift_item_to_front_of_inventory(item, unit)
     return output
@@ -172,26 +203,14 @@ def use_weapon(arena: ActiveArena, unit: ActiveUnit, weapon_id: int,
         in the action_output_schema (See api.arena.schemas)
     """
     # validate
-    try:
-        weapon: ActiveWeapon = ActiveWeapon.objects.get(id=weapon_id)
-    except ObjectDoesNotExist:
-        raise ValueError(f"The weapon with id {weapon_id} does not exist!")
-    if weapon not in unit.weapons.all():
-        raise ValueError(f"The active unit {unit.template.nickname} is not holding weapon with id {weapon_id}")
+    weapon: ActiveWeapon = _held_weapon(arena, unit, weapon_id)
     if not ranks.unit_can_equip_weapon(arena.game, unit, weapon):
         raise ValueError(f"The active unit {unit.template.nickname}'s weapon rank is insufficient to equip the"
                          f" weapon {weapon.template.name} (rank {weapon.template.rank}")
     if not weapon.template.usable:
         raise ValueError(f"The weapon {weapon.template.name} cannot be used with the 'use' command")
-    if target_id is not None:
-        try:
-            target = ActiveUnit.objects.get(id=target_id)
-        except ObjectDoesNotExist:
-            raise ValueError(f"The weapon {weapon.template.name}'s target unit {target_id} does not exist")
-        # validate using team_containing_unit()
-        arena.team_containing_unit(target)
-    else:
-        target = None
+    target = _target_unit(arena, target_id,
+                          f"The weapon {weapon.template.name}'s target unit {target_id} does not exist")
     # use item and decrease durability if possible
     output = list(skills.use_all(weapon.template.weapon_effects.all(), arena, unit, target, extra_data))
     if weapon.uses > 0:
@@ -202,13 +221,14 @@ def use_weapon(arena: ActiveArena, unit: ActiveUnit, weapon_id: int,
         if weapon.template.game.on_weapon_break == WeaponBreakBehavior.BREAK and weapon.template.breaks_into:
             weapon.template = weapon.template.breaks_into
             weapon.uses = weapon.template.uses
+            skills.invalidate_skill_index(unit)
             output.append({
                 "action": "replace_weapon",
                 "weapon": weapon.id,
                 "new_data": weapon.to_dict()
             })
         else:  # weapon.template.game.on_weapon_break == WeaponBreakBehavior.REMOVE, or fallover
-            output += discard_weapon(arena.game, unit, weapon)
+            output += discard_weapon(arena, unit, weapon)
     arena.turn_should_end = True
     return output
 
@@ -229,25 +249,13 @@ def use_item(arena: ActiveArena, unit: ActiveUnit, item_id: int,
         in the action_output_schema (See api.arena.schemas)
     """
     # validate
-    try:
-        item: ActiveItem = ActiveItem.objects.get(id=item_id)
-    except ObjectDoesNotExist:
-        raise ValueError(f"The item with id {item_id} does not exist!")
-    if item not in unit.items.all():
-        raise ValueError(f"The active unit {unit.template.nickname} is not holding the item with id {item_id}")
+    item: ActiveItem = _held_item(arena, unit, item_id)
     if item.template.prf_users.count and unit not in item.template.prf_users.all():
         raise ValueError(f"The active unit {unit.template.nickname} cannot use the Prf item {item.template.name}")
     if not item.template.usable:
         raise ValueError(f"The item {item.template.name} is not usable")
-    if target_id is not None:
-        try:
-            target = ActiveUnit.objects.get(id=target_id)
-        except ObjectDoesNotExist:
-            raise ValueError(f"The item {item.template.name}'s target unit {target_id} does not exist")
-        # validate using team_containing_unit()
-        arena.team_containing_unit(target)
-    else:
-        target = None
+    target = _target_unit(arena, target_id,
+                          f"The item {item.template.name}'s target unit {target_id} does not exist")
     # use item and decrease durability if possible
     output = list(skills.use_all(item.template.item_effects.all(), arena, unit, target, extra_data))
     if item.uses > 0:
@@ -256,7 +264,7 @@ def use_item(arena: ActiveArena, unit: ActiveUnit, item_id: int,
     # break weapon if uses fall to zero
     if item.uses == 0:
         # in all Fire Emblem games, items are removed upon death, not broken
-        output += discard_item(unit, item.id)
+        output += discard_item(arena, unit, item)
     arena.turn_should_end = True
     return output
 
@@ -278,14 +286,10 @@ def use_skill(arena: ActiveArena, unit: ActiveUnit, skill_id: int,
     """
     # validate
     try:
-        skill: Skill = Skill.objects.get(id=skill_id)
+        skill: Skill = core_catalog().skills.get(skill_id)
     except ObjectDoesNotExist:
         raise ValueError(f"The skill with id {skill_id} does not exist!")
-    if skill not in skills.accumulate(
-            personal=unit.template.unit,
-            unit_class=unit.template.unit_class,
-            extra=[*unit.template.extra_skills.all(), *unit.temp_skills.all()]
-    ):
+    if skill not in skills.skill_index(unit).innate:
         raise ValueError(f"The skill {skill.name} is not one of the unit {unit.template.nickname}'s personal, "
                          f"class, or extra skills")
     if not skill.on_use_effect:
@@ -297,79 +301,58 @@ def use_skill(arena: ActiveArena, unit: ActiveUnit, skill_id: int,
         "name": skill.name,
         "show": True
     }]
-    if target_id is not None:
-        try:
-            target = ActiveUnit.objects.get(id=target_id)
-        except ObjectDoesNotExist:
-            raise ValueError(f"The skill {skill.name}'s target unit {target_id} does not exist")
-        # validate using team_containing_unit()
-        arena.team_containing_unit(target)
-    else:
-        target = None
+    target = _target_unit(arena, target_id, f"The skill {skill.name}'s target unit {target_id} does not exist")
     skill_output += skills.use[skill.on_use_effect](arena, unit, target, extra_data)
     arena.turn_should_end = True
     return skill_output
 
 
-def discard_weapon(game: FireEmblemGame, unit: ActiveUnit, weapon_id: Union[int, ActiveWeapon]) -> List[Dict]:
+def discard_weapon(arena: ActiveArena, unit: ActiveUnit, weapon_id: Union[int, ActiveWeapon]) -> List[Dict]:
     """
     Removes the weapon with the given ID from the unit's inventory, and if the weapon was
     previously equipped, equips the first eligible weapon in the unit's inventory.
-    :param game: the game to use for Weapon Equipping Eligibility mechanics, for auto-equip
+    :param arena: the arena the unit is in, whose game is used for Weapon Equipping Eligibility mechanics
     :param unit: Unit holding the weapon to be discarded
     :param weapon_id: the ID of the weapon to be discarded, or for convenience, the weapon itself
     :return: a summary of this action, conforming to the format defined in the action_output_schema
     """
     # validate
-    if not isinstance(weapon_id, ActiveWeapon):
-        try:
-            weapon: ActiveWeapon = ActiveWeapon.objects.get(id=weapon_id)
-        except ObjectDoesNotExist:
-            raise ValueError(f"The weapon with id {weapon_id} does not exist!")
-    else:
-        weapon = weapon_id
-        weapon_id = weapon.id
-    if weapon not in unit.weapons.all():
-        raise ValueError(f"The active unit {unit.template.nickname} is not holding weapon with id {weapon_id}")
+    weapon: ActiveWeapon = _held_weapon(arena, unit, weapon_id)
+    weapon_id = weapon.id
     # execute
-    output = remove_weapon_from_inventory(weapon, unit)
+    output = remove_weapon_from_inventory(weapon, unit, arena)
     # replace equipped weapon
     if weapon.equipped:
         possible_weapons = sorted(unit.weapons.all(), key=lambda w: w.inventory_id)
         for possible_weapon in possible_weapons:
-            if ranks.unit_can_equip_weapon(game, unit, possible_weapon):
-                output += equip_weapon(game, unit, possible_weapon)
+            if ranks.unit_can_equip_weapon(arena.game, unit, possible_weapon):
+                output += equip_weapon(arena, unit, possible_weapon)
                 break
     # delete weapon
     logging.debug(f"Deleting ActiveWeapon {weapon_id} from database")
     weapon.delete()
+    skills.invalidate_skill_index(unit)
     return output
 
 
-def discard_item(unit: ActiveUnit, item_id: Union[int, ActiveItem]) -> List[Dict]:
+def discard_item(arena: ActiveArena, unit: ActiveUnit, item_id: Union[int, ActiveItem]) -> List[Dict]:
     """
     Removes the item with the given ID from the unit's inventory. Does not automatically equip
     a new item.
+    :param arena: the arena the unit is in
     :param unit: Unit holding the weapon to be discarded
     :param item_id: the ID of the item to be discarded, or, for convenience, the item itself
     :return: a summary of this action, conforming to the format defined in the action_output_schema
     """
     # validate
-    if not isinstance(item_id, ActiveItem):
-        try:
-            item: ActiveItem = ActiveItem.objects.get(id=item_id)
-        except ObjectDoesNotExist:
-            raise ValueError(f"The item with id {item_id} does not exist!")
-    else:
-        item = item_id
-        item_id = item.id
-    if item not in unit.items.all():
-        raise ValueError(f"The active unit {unit.template.nickname} is not holding weapon with id {item_id}")
+    item: ActiveItem = _held_item(arena, unit, item_id)
+    item_id = item.id
     # execute
-    output = remove_item_from_inventory(item, unit)
+    output = remove_item_from_inventory(item, unit, arena)
     # delete item
     logging.debug(f"Deleting ActiveItem {item_id} from database")
     item.delete()
+    skills.invalidate_skill_index(unit)
     return output
 
 
@@ -389,18 +372,16 @@ def attack(arena: ActiveArena, attacker: ActiveUnit, target: int, with_weapon: i
         (see api.arena.schemas)
     """
     # validate defender
-    try:
-        defender: ActiveUnit = ActiveUnit.objects.get(id=target)
-    except ObjectDoesNotExist:
-        raise ValueError("The intended target for this attack does not exist")
+    index = ArenaIndex.of(arena)
+    defender: ActiveUnit = _target_unit(arena, target, "The intended target for this attack does not exist")
     attacker_team = arena.current_team()
-    if attacker not in attacker_team.units.all():  # sanity check
+    if index.team_of(attacker) is not attacker_team:  # sanity check
         raise ValueError("The attacking unit is not on the team whose turn it is")
-    if defender in attacker_team.units.all():
+    if index.team_of(defender) is attacker_team:
         raise ValueError("The attacker cannot attack their teammate")
     # load weapon
-    output = equip_weapon(arena.game, attacker, with_weapon)
-    weapon = ActiveWeapon.objects.get(id=with_weapon)
+    output = equip_weapon(arena, attacker, with_weapon)
+    weapon = index.weapons[with_weapon]
     print(weapon.to_dict())
     if weapon.uses == 0:
         raise ValueError(f"The weapon with id {with_weapon} has 0 uses remaining, and cannot be attacked with")
@@ -413,21 +394,9 @@ def attack(arena: ActiveArena, attacker: ActiveUnit, target: int, with_weapon: i
     # execute pre-combat actions
     combat_info: combat_data.CombatData = combat_data.CombatData(attacker, defender, arena, at_range)
     output += skills.before_combat_with_priority(
-        skills1=skills.accumulate(
-            personal=attacker.template.unit,
-            unit_class=attacker.template.unit_class,
-            active_weapons=[combat_info.attacker_weapon] if combat_info.attacker_weapon else [],
-            active_items=defender.items.all(),
-            extra=[*attacker.template.extra_skills.all(), *attacker.temp_skills.all()]
-        ),
+        skills1=skills.skill_index(attacker).for_hook('before_combat', [combat_info.attacker_weapon]),
         unit1=attacker,
-        skills2=skills.accumulate(
-            personal=defender.template.unit,
-            unit_class=defender.template.unit_class,
-            active_weapons=[combat_info.defender_weapon] if combat_info.defender_weapon else [],
-            active_items=defender.items.all(),
-            extra=[*defender.template.extra_skills.all(), *defender.temp_skills.all()]
-        ),
+        skills2=skills.skill_index(defender).for_hook('before_combat', [combat_info.defender_weapon]),
         unit2=defender,
         arena=arena,
         data=combat_info
@@ -438,21 +407,9 @@ def attack(arena: ActiveArena, attacker: ActiveUnit, target: int, with_weapon: i
     output += combat.execute(arena, combat_info)
     # execute post-combat actions
     output += skills.after_combat_with_priority(
-        skills1=skills.accumulate(
-            personal=attacker.template.unit,
-            unit_class=attacker.template.unit_class,
-            active_weapons=[combat_info.attacker_weapon] if combat_info.attacker_weapon else [],
-            active_items=attacker.items.all(),
-            extra=[*attacker.template.extra_skills.all(), *attacker.temp_skills.all()]
-        ),
+        skills1=skills.skill_index(attacker).for_hook('after_combat', [combat_info.attacker_weapon]),
         unit1=attacker,
-        skills2=skills.accumulate(
-            personal=defender.template.unit,
-            unit_class=defender.template.unit_class,
-            active_weapons=[combat_info.defender_weapon] if combat_info.defender_weapon else [],
-            active_items=defender.items.all(),
-            extra=[*defender.template.extra_skills.all(), *defender.temp_skills.all()]
-        ),
+        skills2=skills.skill_index(defender).for_hook('after_combat', [combat_info.defender_weapon]),
         unit2=defender,
         arena=arena,
         data=combat_info
@@ -460,7 +417,7 @@ def attack(arena: ActiveArena, attacker: ActiveUnit, target: int, with_weapon: i
     # evaluate outcome - broken weapons & dead units
     # no need to manually delete supports; cascading deletion should take care of that
     if attacker.current_hp <= 0:
-        attacker_team.units.remove(attacker)
+        index.remove_unit(attacker)
         output.append({
             "action": "kill_unit",
             "team": attacker_team.id,
@@ -468,19 +425,19 @@ def attack(arena: ActiveArena, attacker: ActiveUnit, target: int, with_weapon: i
         })
         # since the attacker is the unit, we'll maybe delete them later on
     elif combat_info.attacker_weapon and combat_info.attacker_weapon.uses == 0:
-        discard_weapon(arena.game, attacker, combat_info.attacker_weapon)
+        discard_weapon(arena, attacker, combat_info.attacker_weapon)
     defender_team = arena.team_containing_unit(defender)
     if defender.current_hp <= 0:
-        defender_team.units.remove(defender)
+        index.remove_unit(defender)
         output.append({
             "action": "kill_unit",
             "team": defender_team.id,
             "unit": defender.id
         })
         logging.debug(f"Deleting ActiveUnit {defender.id} from database")
-        defender.delete()
+        index.delete_unit(defender)
     elif combat_info.defender_weapon and combat_info.defender_weapon.uses == 0:
-        discard_weapon(arena.game, defender, combat_info.defender_weapon)
+        discard_weapon(arena, defender, combat_info.defender_weapon)
     # conclude combat
     output.append({
         "action": "end_combat",
@@ -3,56 +3,47 @@ file: arena.py
 
 Contains the core of the API for interacting with the arena function of FEArena
 """
+import json
 import logging
 import random
+import secrets
 import jsonschema
 import string
-import threading
-from typing import Dict, List, Union
-from time import sleep
+from datetime import timedelta
+from typing import Dict, List, Tuple, Union, Optional
 from django.contrib.auth.models import User
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.utils import timezone
 
 from ...models.play.GameFormat import GameFormat, VictoryCondition
 from . import schemas
 from . import actions as arena_actions
 from .helper import tear_down_arena, save_arena
+from .identity import ArenaIndex
+from .matchmaker import Matchmaker
+from .cache import arena_cache
+from .reaper import arena_reaper
+from . import ratings
+from . import events
 from .. import skills
+from ..calc import ranks
+from ..calc.combat_data import CombatData
+from ..calc.forecast import forecast
+from ..calc.rng import CounterRNG
 from ...models.play.ActiveArena import ActiveArena
 from ...models.play.ActiveUnit import ActiveUnit
+from ...models.play.ActiveWeapon import ActiveWeapon
 from ...models.play import conversions
 from ...models.play.MatchRequest import MatchRequest
+from ...models.play.ArenaPhase import ArenaPhase
 from ...models.build.BuiltTeam import BuiltTeam
 
 
 ARENA_ID_SET = string.ascii_letters + string.digits + '_'
-MATCH_CHECK_INTERVAL = 10.0
-
-
-def check_for_matches():
-    """
-    Preiodically checks whether there are outstanding match requests that can be honored,
-    and starts matches as applicable.
-    """
-    while True:
-        match_requests = {}
-        for mr in MatchRequest.objects.filter(arena_id=None):
-            match_requests \
-                .setdefault(mr.game_format.name, {}) \
-                .setdefault(mr.num_players, []) \
-                .append(mr)
-        for fmt_name, dct in match_requests.items():
-            for players, reqs in dct.items():
-                while len(reqs) >= players:
-                    go_reqs: List[MatchRequest] = [reqs.pop(0) for _ in range(players)]
-                    arena: ActiveArena = start_arena(fmt_name, [req.team_id for req in go_reqs])
-                    for req in go_reqs:
-                        req.arena_id = arena.id
-                        req.save()
-        sleep(MATCH_CHECK_INTERVAL)
-
-
-threading.Thread(target=check_for_matches, daemon=True).start()
+MAX_MATCH_WAIT = 30.0
+# how long a match request stays outstanding after its user last checked on it
+MATCH_REQUEST_TTL = timedelta(minutes=2)
 
 
 def request_match(user: User, req_info: Dict) -> int:
@@ -65,7 +56,7 @@ def request_match(user: User, req_info: Dict) -> int:
     :return: a request_id that should be queried in the future
     """
     # validate
-    if MatchRequest.objects.filter(by=user, arena_id=None).count() > 0:
+    if MatchRequest.objects.filter(by=user, arena_id=None).exclude(expires_at__lte=timezone.now()).exists():
         raise ValueError(f"User is already requesting a game. Wait for that to finsih.")
     try:
         jsonschema.validate(instance=req_info, schema=schemas.request_match_schema)
@@ -80,35 +71,147 @@ def request_match(user: User, req_info: Dict) -> int:
         game_format = GameFormat.objects.get(name=format_name)
     except ObjectDoesNotExist:
         raise ValueError(f"Invalid game format")
-    if BuiltTeam.objects.filter(owned_by=user, id=team_id) == 0:
+    if not BuiltTeam.objects.filter(owned_by=user, id=team_id).exists():
         raise ValueError(f"This user does not own the team they're trying to use, or the team does not exist")
+    validate_team(format_name, team_id)
     # generate request id
     request: MatchRequest = MatchRequest.objects.create(
         by=user,
         team_id=team_id,
         game_format=game_format,
         num_players=players,
+        expires_at=timezone.now() + MATCH_REQUEST_TTL,
     )
+    # the matchmaker reads the request from its own connection, so it has to be committed first
+    transaction.on_commit(lambda: matchmaker.submit(request.id))
     return request.id
 
 
 def check_request_status(user: User, request_id: int) -> Union[None, str]:
     """
-    If the user's match hasn't started yet, returns None. If the user's match has
-    started and is in progress or finished, returns the id of the arena.
-    If the user hasn't made a match request with this ID, raises a ValueError.
+    If the user's match hasn't started yet, returns None, and keeps the request from expiring
+    for another MATCH_REQUEST_TTL. If the user's match has started and is in progress or
+    finished, returns the id of the arena.
+    If the user hasn't made a match request with this ID, or it was cancelled or has expired,
+    raises a ValueError.
     :param user: user whose match to check
     :param request_id: request_id of the match the user wants to check the status of
     :return: None if the match hasn't started yet, or the id of an ActiveArena if it has
     """
+    # after a restart, requests still waiting aren't matched until the matchmaker is running again
+    matchmaker.start()
     try:
         request: MatchRequest = MatchRequest.objects.get(by=user, id=request_id)
-        if request.arena_id:
-            return request.arena_id
-        else:
-            return None
     except ObjectDoesNotExist:
         raise ValueError(f"User {user.username} did not make a match request with id {request_id}")
+    if request.arena_id:
+        return request.arena_id
+    now = timezone.now()
+    if request.expires_at is not None:
+        if request.expires_at <= now:
+            raise ValueError(f"Match request {request_id} has expired")
+        # only push the expiry back once it's half used up, rather than writing on every check
+        if request.expires_at - now < MATCH_REQUEST_TTL / 2:
+            MatchRequest.objects.filter(id=request_id, arena_id=None).update(expires_at=now + MATCH_REQUEST_TTL)
+    return None
+
+
+def cancel_match_request(user: User, request_id: int):
+    """
+    Withdraws the user's match request, if its match hasn't started yet. If the user hasn't
+    made a match request with this ID, or its match has already started, raises a ValueError.
+    :param user: user whose match request to cancel
+    :param request_id: id of the match request to cancel
+    """
+    deleted, _ = MatchRequest.objects.filter(by=user, id=request_id, arena_id=None).delete()
+    if not deleted:
+        if MatchRequest.objects.filter(by=user, id=request_id).exists():
+            raise ValueError(f"The match for request {request_id} has already started")
+        raise ValueError(f"User {user.username} did not make a match request with id {request_id}")
+    transaction.on_commit(lambda: matchmaker.cancel(request_id))
+
+
+def wait_for_match(user: User, request_id: int, timeout: float) -> Union[None, str]:
+    """
+    Like check_request_status, except that if the user's match hasn't started yet, waits for up
+    to the given number of seconds for the matchmaker to start it, instead of returning None
+    straight away. If the user hasn't made a match request with this ID, raises a ValueError.
+    Only matches made by this process's matchmaker end the wait early; one made by another server
+    process is found the next time the request is checked.
+    :param user: user whose match to check
+    :param request_id: request_id of the match the user wants to wait for
+    :param timeout: the most seconds to wait for, capped at MAX_MATCH_WAIT
+    :return: None if the match still hasn't started, or the id of an ActiveArena if it has
+    """
+    arena_id = check_request_status(user, request_id)
+    if arena_id is None:
+        arena_id = matchmaker.wait_for_match(request_id, min(max(timeout, 0.0), MAX_MATCH_WAIT))
+    return arena_id
+
+
+def follow_arena(arena_id: str) -> Tuple[events.ArenaChannel, int]:
+    """
+    Returns the channel on which the changes made by each phase of the given arena are published,
+    as they happen, numbered by the arena version they bring it up to. Anyone can follow any arena.
+    Phases up to the returned version can be caught up on with get_arena_phases; every phase after
+    it will be on the channel. If the arena doesn't exist, raises a ValueError.
+    :param arena_id: id of the arena to follow
+    :return: the arena's event channel, and the arena's version as of following it
+    """
+    # only arenas that exist get a channel, which the reaper lets go of when it deletes them
+    get_arena_version(arena_id)
+    channel = events.arena_channel(arena_id)
+    try:
+        # read the version again now that it's followed, so that no phase falls between the two
+        return channel, get_arena_version(arena_id)
+    except ValueError:
+        # deleted in the meantime, possibly after the reaper already let go of its channel
+        events.forget_arenas([arena_id])
+        raise
+
+
+def get_arena_version(arena_id: str) -> int:
+    """
+    Returns the current version of the given arena, which goes up by one every phase. If the
+    arena doesn't exist, raises a ValueError.
+    :param arena_id: id of the arena
+    :return: the arena's version
+    """
+    version = ActiveArena.objects.filter(id=arena_id).values_list('version', flat=True).first()
+    if version is None:
+        raise ValueError(f"Arena has expired, or may never have existed")
+    return version
+
+
+def get_arena_phases(arena_id: str, since: int) -> List[Tuple[int, str]]:
+    """
+    :param arena_id: id of the arena
+    :param since: the version to start after
+    :return: (version, changes) for each phase of the arena after the given version, oldest first,
+        where changes is a JSON list conforming to the 'changes' of the action_output_schema
+    """
+    return list(ArenaPhase.objects.filter(arena_id=arena_id, version__gt=since)
+                .order_by('version').values_list('version', 'changes'))
+
+
+def get_arena_changes(arena_id: str, since: int) -> Dict:
+    """
+    Returns everything that has changed about the requested ActiveArena since the given version,
+    as a list of the changes made by each phase. If the arena doesn't exist, or hasn't reached
+    the given version, raises a ValueError.
+    :param arena_id: id of arena to fetch
+    :param since: the version of the arena the caller already has
+    :return: the arena's current version and changes, conforming to the arena_changes_schema
+    """
+    version = get_arena_version(arena_id)
+    if not (0 <= since <= version):
+        raise ValueError(f"Arena {arena_id} is at version {version}; there is no version {since}")
+    changes = []
+    for phase_version, phase_changes in get_arena_phases(arena_id, since):
+        # a phase may have been processed since the version was looked up
+        version = max(version, phase_version)
+        changes += json.loads(phase_changes)
+    return {"version": version, "changes": changes}
 
 
 def get_arena_info(arena_id: str) -> Dict:
@@ -123,13 +226,32 @@ def get_arena_info(arena_id: str) -> Dict:
         raise ValueError(f"Arena has expired, or may never have existed")
 
 
-def start_arena(format_name: str, team_ids: List[int]) -> ActiveArena:
+def validate_team(format_name: str, team_id: int):
+    """
+    Raises a ValueError if the given BuiltTeam can't take part in an arena of the given format,
+    e.g. because it doesn't exist, or has units that aren't validated in a format that requires them
+    :param format_name: the format the team would play in
+    :param team_id: id of the BuiltTeam
+    """
+    try:
+        game_format: GameFormat = GameFormat.objects.get(name=format_name)
+    except ObjectDoesNotExist:
+        raise ValueError(f"Format '{format_name}' does not exist")
+    if not BuiltTeam.objects.filter(id=team_id).exists():
+        raise ValueError(f"BuiltTeam with id {team_id} does not exist")
+    if game_format.validated and BuiltTeam.objects.filter(id=team_id, units__validated=False).exists():
+        raise ValueError(f"At least one unit on this team is not validated, and so is invalid for this format")
+
+
+def start_arena(format_name: str, team_ids: List[int], seed: Optional[int] = None) -> ActiveArena:
     """
     Creates/saves a new ActiveArena object with the given BuiltTeams as competitors, and returns it. The
     new ActiveArena object will contain ActiveTeam objects, constructed from the BuiltTeam objects.
     An arena must contain at least two teams, but may contain up to four, which is the maximum.
     :param format_name: the mechanics to use for this fight
     :param team_ids: a list of BuiltTeam ids, containing 2 to 4 elements inclusive.
+    :param seed: seed for the arena's random number stream. Only needs to be given to replay an
+        earlier battle; otherwise a fresh one is picked.
     :return: an ActiveArena object, initialized with the given teams and saved to the database
     """
     # validate
@@ -139,25 +261,25 @@ def start_arena(format_name: str, team_ids: List[int]) -> ActiveArena:
         raise ValueError(f"Format '{format_name}' does not exist")
     if not (2 <= len(team_ids) <= 4):
         raise ValueError(f"Must have 2-4 teams to start an arena battle")
-    teams: List[BuiltTeam] = []
+    built_teams: Dict[int, BuiltTeam] = BuiltTeam.objects.select_related('owned_by').in_bulk(team_ids)
     for team_id in team_ids:
-        try:
-            team: BuiltTeam = BuiltTeam.objects.get(id=team_id)
-            teams.append(team)
-            if game_format.validated and team.units.filter(validated=False).count() > 0:
-                raise ValueError(f"At least one unit on this team is not validated, and so is invalid for this format")
-        except ObjectDoesNotExist:
+        if team_id not in built_teams:
             raise ValueError(f"BuiltTeam with id {team_id} does not exist")
-    random.shuffle(teams)
-    active_teams = {
-        vname: conversions.ActiveTeam_from_BuiltTeam(team)
-        for vname, team in zip(["team0", "team1", "team2", "team3"], teams)
-    }
+    if game_format.validated and BuiltTeam.objects.filter(id__in=team_ids, units__validated=False).exists():
+        raise ValueError(f"At least one unit on this team is not validated, and so is invalid for this format")
+    teams: List[BuiltTeam] = [built_teams[team_id] for team_id in team_ids]
+    if seed is None:
+        seed = secrets.randbits(63)
+    rng = CounterRNG(seed)
+    rng.shuffle(teams)
+    active_teams = dict(zip(["team0", "team1", "team2", "team3"], conversions.ActiveTeams_from_BuiltTeams(teams)))
     arena: ActiveArena = ActiveArena.objects.create(
         game=game_format.game,
         game_format=game_format,
         **active_teams,
-        id=''.join(random.choices(ARENA_ID_SET, k=20))
+        id=''.join(random.choices(ARENA_ID_SET, k=20)),
+        rng_seed=seed,
+        rng_counter=rng.counter
     )
     logging.debug(f"""Created new arena using teams {
         ', '.join(f'{team.owned_by.username}[{team.name}]' for team in teams)
@@ -166,6 +288,9 @@ def start_arena(format_name: str, team_ids: List[int]) -> ActiveArena:
     return arena
 
 
+matchmaker = Matchmaker(start_arena, validate_team)
+
+
 def process_phase(user: User, arena_id: str, action: Dict):
     """
     Processes a user's single action for a particular phase. If it is not the user's turn, the action does not
@@ -177,11 +302,10 @@ def process_phase(user: User, arena_id: str, action: Dict):
     :return: a summary of the end result of the above actions, conforming to the `action_output_schema`
         (see documentation for api.arena.schemas)
     """
+    # after a restart, arenas that expired in the meantime are swept up once the reaper is running again
+    arena_reaper.start()
     # validate request
-    try:
-        arena: ActiveArena = ActiveArena.objects.get(id=arena_id)
-    except ObjectDoesNotExist:
-        raise ValueError(f"Nonexistent arena: {arena_id}")
+    arena: ActiveArena = arena_cache.checkout(arena_id)
     if user != arena.current_team().template.owned_by:
         raise ValueError(f"{user.username}, it's not your turn! " 
                          f"It's {arena.current_team().template.owned_by.username}'s turn. Be patient")
@@ -189,22 +313,16 @@ def process_phase(user: User, arena_id: str, action: Dict):
         jsonschema.validate(instance=action, schema=schemas.action_input_schema)
     except ValueError as e:
         raise ValueError("Action does not conform to the action_input_schema") from e
-    try:
-        unit: ActiveUnit = arena.current_team().units.get(id=action['unit'])
-    except ObjectDoesNotExist:
+    # load everything this phase could touch, once; every lookup from here on goes through this
+    index = ArenaIndex.of(arena)
+    unit: ActiveUnit = index.units.get(action['unit'])
+    if unit is None or index.team_of(unit) is not arena.current_team():
         raise ValueError(f"The unit with id {action['unit']} does not belong to this user")
     # process the whole beginning of the turn, because in arena mode only one unit can actually move per turn
     # it is expected that this is done on the #client-side automatically, before sending command to server
     result = [{"action": "begin_turn"}]
     for team_unit in arena.current_team().units.all():
-        result += skills.turn_start_all(
-            skills.accumulate(
-                personal=team_unit.template.unit,
-                unit_class=team_unit.template.unit_class,
-                active_weapons=team_unit.weapons.all(),
-                active_items=team_unit.items.all(),
-                extra=[*team_unit.template.extra_skills.all(), *team_unit.temp_skills.all()],
-            ), team_unit, arena)
+        result += skills.turn_start_all(skills.skill_index(team_unit).for_hook('turn_start'), team_unit, arena)
     # note: the actions are executed sequentially, and the methods in arena_actions will mutate both
     # the unit and the arena passed to them, in addition to adding to the result. If the actions are in
     # an invalid order (e.g. 'equip' after 'attack'), then not all of them will be processed. The #client
@@ -215,31 +333,15 @@ def process_phase(user: User, arena_id: str, action: Dict):
             break
     # execute unit_end_turn before actually checking whether the overall turn should end
     # to accommodate for things like Canto to give the user another chance
-    result += skills.unit_turn_end_all(
-        skills.accumulate(
-            personal=unit.template.unit,
-            unit_class=unit.template.unit_class,
-            active_weapons=unit.weapons.all(),
-            active_items=unit.items.all(),
-            extra=[*unit.template.extra_skills.all(), *unit.temp_skills.all()]
-        ), unit, arena, result
-    )
+    result += skills.unit_turn_end_all(skills.skill_index(unit).for_hook('unit_turn_end'), unit, arena, result)
     battle_over = False
     if arena.turn_should_end:
         for team_unit in arena.current_team().units.all():
-            result += skills.turn_end_all(
-                skills.accumulate(
-                    personal=team_unit.template.unit,
-                    unit_class=team_unit.template.unit_class,
-                    active_weapons=team_unit.weapons.all(),
-                    active_items=team_unit.items.all(),
-                    extra=[*team_unit.template.extra_skills.all(), *unit.temp_skills.all()]
-                ), unit, arena
-            )
+            result += skills.turn_end_all(skills.skill_index(team_unit).for_hook('turn_end'), team_unit, arena)
         result.append({"action": "end_turn"})
         # advance arena phase, and possibly turn
         # check if battle is over
-        if sum(team.units.all().count() == 0 for team in arena.teams()) <= 1:
+        if sum(team.units.all().count() > 0 for team in arena.teams()) <= 1:
             try:
                 surviving_team = next(team for team in arena.teams() if team.units.all().count() > 0)
                 # give the winner their points
@@ -264,6 +366,7 @@ def process_phase(user: User, arena_id: str, action: Dict):
             })
             battle_over = True
             arena.game_over = True
+            ratings.record_result(arena, winning_team)
         else:
             phase_msg = arena.advance_phase()
             result += phase_msg
@@ -275,15 +378,8 @@ def process_phase(user: User, arena_id: str, action: Dict):
     # (unit should already have been removed from the team containing it
     if unit.current_hp <= 0:
         logging.debug(f"Deleting ActiveUnit {unit.id} from database")
-        unit.delete()
-    # next, either save the current state of the arena, or tear it down, depending on whether
-    # someone distinctly won the battle
+        index.delete_unit(unit)
     logging.debug(f"Processed actions from user {user.username} for arena {arena.id}")
-    if battle_over:
-        tear_down_arena(arena)  # will set a 15-minute timer
-    else:
-        save_arena(arena)
-    # finally, return result of phase
     # this time we return the FULL action_output_schema, not just the action part of it, for once
     output = {"changes": result}
     try:
@@ -291,4 +387,68 @@ def process_phase(user: User, arena_id: str, action: Dict):
     except jsonschema.ValidationError as e:
         logging.warning(f"Output for this action set does not conform to the action_output_schema. "
                         f"User={user.username}; Arena={arena.id}; action={action}; return={output}; error={e}")
+    # record what this phase changed, so that clients that are behind can catch up on just that
+    arena.version += 1
+    changes = json.dumps(result)
+    ArenaPhase.objects.create(arena=arena, version=arena.version, changes=changes)
+    # next, either save the current state of the arena, or tear it down, depending on whether
+    # someone distinctly won the battle
+    if battle_over:
+        tear_down_arena(arena)  # its final version is still readable for 15 minutes
+    else:
+        save_arena(arena)
+        arena_cache.checkin_on_commit(arena)
+    ArenaIndex.release(arena)
+    # let everyone following the arena know, once the phase is actually saved
+    transaction.on_commit(lambda: events.publish(arena_id, arena.version, changes, final=battle_over))
+    # finally, return result of phase
     return output
+
+
+def forecast_attack(user: User, arena_id: str, request: Dict) -> Dict:
+    """
+    Forecasts the outcome of an attack the user is considering making, without actually
+    making it. The request is validated the same way the attack action would be, but
+    nothing about the arena is changed (not even which weapon is equipped).
+    :param user: the user whose turn it is
+    :param arena_id: id of the arena the attack would take place in
+    :param request: the prospective attack, conforming to forecast_input_schema in api.arena.schemas
+    :return: the forecast, conforming to forecast_output_schema in api.arena.schemas
+    """
+    # validate request
+    try:
+        arena: ActiveArena = ActiveArena.objects.get(id=arena_id)
+    except ObjectDoesNotExist:
+        raise ValueError(f"Nonexistent arena: {arena_id}")
+    current_team = arena.current_team()
+    if user != current_team.template.owned_by:
+        raise ValueError(f"{user.username}, it's not your turn, so you can't attack right now")
+    try:
+        jsonschema.validate(instance=request, schema=schemas.forecast_input_schema)
+    except jsonschema.ValidationError as e:
+        raise ValueError("Request does not conform to the forecast_input_schema") from e
+    # only units in this arena can be looked up, the same as when actually attacking
+    index = ArenaIndex.of(arena)
+    unit: ActiveUnit = index.units.get(request['unit'])
+    if unit is None or index.team_of(unit) is not current_team:
+        raise ValueError(f"The unit with id {request['unit']} does not belong to this user")
+    defender: ActiveUnit = index.units.get(request['target'])
+    if defender is None:
+        raise ValueError("The intended target for this attack does not exist")
+    if index.team_of(defender) is current_team:
+        raise ValueError("The attacker cannot attack their teammate")
+    weapon: ActiveWeapon = index.weapons.get(request['with_weapon'])
+    if weapon is None or index.holder_of_weapon(weapon) is not unit:
+        raise ValueError(f"The active unit {unit.template.nickname} is not holding weapon "
+                         f"with id {request['with_weapon']}")
+    if not ranks.unit_can_equip_weapon(arena.game, unit, weapon):
+        raise ValueError(f"The active unit {unit.template.nickname}'s weapon rank is insufficient to equip the"
+                         f" weapon {weapon.template.name} (rank {weapon.template.rank}")
+    at_range = request['range']
+    if not (weapon.template.min_range <= at_range <= weapon.template.max_range):
+        raise ValueError(f"Cannot attack at range {at_range} using weapon {weapon.template.name} with "
+                         f"range {weapon.template.min_range}-{weapon.template.max_range}")
+    # load everything once, then play it out
+    data = CombatData(unit, defender, arena, at_range, attacker_weapon=weapon)
+    samples = int(request['samples']) if 'samples' in request else None
+    return forecast(data, samples)
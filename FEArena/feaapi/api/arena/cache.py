@@ -0,0 +1,88 @@
+"""
+file: cache.py
+
+Keeps arenas that are being played in memory between phases, along with everything about
+them that a phase always needs (their game and format, and their teams with their templates
+and owners), so that processing a phase doesn't start by loading all of that again.
+A cached arena only ever reflects committed phases: it is taken out of the cache while a
+phase is being processed, and only put back once that phase has been committed.
+"""
+import threading
+from collections import OrderedDict
+from typing import Optional
+from django.db import transaction
+from ...models.play.ActiveArena import ActiveArena
+
+# the most arenas to keep in memory at once; the ones played least recently are dropped first
+MAX_CACHED_ARENAS = 1000
+
+
+def load_arena(arena_id: str) -> Optional[ActiveArena]:
+    """
+    :param arena_id: id of the arena to load
+    :return: the arena, with its game, format, and teams (with templates and owners) loaded
+        alongside it, or None if it doesn't exist
+    """
+    return ActiveArena.objects.select_related(
+        'game', 'game_format', *(f'team{i}__template__owned_by' for i in range(4))
+    ).filter(id=arena_id).first()
+
+
+class ArenaCache:
+    """
+    Arenas in play, by id. An arena is checked out of the cache to process a phase, then checked
+    back in once that phase commits. If the phase fails, the arena is simply never checked back
+    in, and the next phase loads it from the database again.
+    """
+
+    def __init__(self, max_arenas: int = MAX_CACHED_ARENAS):
+        self._arenas: 'OrderedDict[str, ActiveArena]' = OrderedDict()
+        self._max_arenas = max_arenas
+        self._lock = threading.Lock()
+
+    def checkout(self, arena_id: str) -> ActiveArena:
+        """
+        Takes the given arena out of the cache, or loads it if it isn't cached or if it has
+        been changed elsewhere since it was. If the arena doesn't exist, raises a ValueError.
+        :param arena_id: id of the arena
+        :return: the arena, which belongs to the caller until it's checked back in
+        """
+        with self._lock:
+            arena = self._arenas.pop(arena_id, None)
+        if arena is not None:
+            version = ActiveArena.objects.filter(id=arena_id).values_list('version', flat=True).first()
+            if version != arena.version:
+                arena = None
+        if arena is None:
+            arena = load_arena(arena_id)
+        if arena is None:
+            raise ValueError(f"Nonexistent arena: {arena_id}")
+        return arena
+
+    def checkin_on_commit(self, arena: ActiveArena):
+        """
+        Puts the given arena back into the cache once the current transaction commits, i.e.
+        once the database agrees with it. If the transaction is rolled back, it's dropped.
+        :param arena: an arena previously checked out, whose changes have all been saved
+        """
+        transaction.on_commit(lambda: self._checkin(arena))
+
+    def _checkin(self, arena: ActiveArena):
+        with self._lock:
+            self._arenas[arena.id] = arena
+            self._arenas.move_to_end(arena.id)
+            while len(self._arenas) > self._max_arenas:
+                self._arenas.popitem(last=False)
+
+    def evict(self, arena_id: str):
+        """
+        Drops the given arena from the cache, if it's there
+        """
+        with self._lock:
+            self._arenas.pop(arena_id, None)
+
+
+arena_cache = ArenaCache()
+
+
+__all__ = ['ArenaCache', 'arena_cache', 'load_arena']
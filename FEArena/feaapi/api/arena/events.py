@@ -0,0 +1,94 @@
+"""
+file: events.py
+
+Relays the changes made by each phase of an arena battle to everyone following it (its
+participants and any spectators) as soon as the phase is processed, so that they can apply
+the changes to what they already have, rather than downloading the whole arena again.
+"""
+import threading
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Tuple
+
+# how many of the latest phases each arena keeps, for followers that reconnect and need to catch up
+ARENA_EVENT_HISTORY = 64
+
+
+class ArenaChannel:
+    """
+    The latest phases processed in one arena, each numbered by the arena version it brought
+    the arena up to, and serialized once as JSON conforming to the action_output_schema
+    (see api.arena.schemas)
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._events: Deque[Tuple[int, str]] = deque(maxlen=ARENA_EVENT_HISTORY)
+        self.last_event_id = 0
+        # set once the battle is over, after which there will be no more events
+        self.closed = False
+
+    def publish(self, version: int, changes: str, final: bool = False):
+        """
+        Adds a phase's output to the channel, and wakes everyone waiting on it
+        :param version: the arena's version after the phase
+        :param changes: the changes made by the phase, as a JSON list
+        :param final: whether this was the last phase of the battle
+        """
+        data = f'{{"changes": {changes}}}'
+        with self._condition:
+            self.last_event_id = max(self.last_event_id, version)
+            self._events.append((version, data))
+            self.closed = self.closed or final
+            self._condition.notify_all()
+
+    def events_after(self, event_id: int, timeout: float) -> List[Tuple[int, str]]:
+        """
+        Returns every event after the given one that the channel still has, waiting up to the
+        given number of seconds for one if there aren't any yet
+        :param event_id: the last event the caller has seen, or 0 for none
+        :param timeout: the most seconds to wait for
+        :return: (event id, JSON) for each newer event, in order; empty if none came in time
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.last_event_id > event_id or self.closed, timeout)
+            return [(i, data) for i, data in self._events if i > event_id]
+
+
+_channels: Dict[str, ArenaChannel] = {}
+_channels_lock = threading.Lock()
+
+
+def arena_channel(arena_id: str) -> ArenaChannel:
+    """
+    :param arena_id: id of an ActiveArena
+    :return: the channel for the given arena's events, creating it if need be
+    """
+    with _channels_lock:
+        return _channels.setdefault(arena_id, ArenaChannel())
+
+
+def publish(arena_id: str, version: int, changes: str, final: bool = False):
+    """
+    Sends the output of a phase to everyone following the given arena. Once the final phase
+    has been published, the arena's channel stays closed until the arena itself is deleted,
+    so that anyone who starts following it after the battle still catches the end.
+    :param arena_id: id of the arena the phase took place in
+    :param version: the arena's version after the phase
+    :param changes: the changes made by the phase, as a JSON list
+    :param final: whether this was the last phase of the battle
+    """
+    arena_channel(arena_id).publish(version, changes, final)
+
+
+def forget_arenas(arena_ids: Iterable[str]):
+    """
+    Lets go of the channels of the given arenas, which have been deleted; anyone already
+    following them keeps theirs
+    :param arena_ids: ids of the deleted arenas
+    """
+    with _channels_lock:
+        for arena_id in arena_ids:
+            _channels.pop(arena_id, None)
+
+
+__all__ = ['ArenaChannel', 'arena_channel', 'publish', 'forget_arenas']
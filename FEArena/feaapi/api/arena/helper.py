@@ -5,12 +5,20 @@ Helper methods.
 """
 import operator
 import logging
-from typing import Union, List, Dict
-from threading import Timer
+from typing import Union, List, Dict, Optional
+from datetime import timedelta
+from django.utils import timezone
+from ...models._util import save_changed
 from ...models.play.ActiveArena import ActiveArena
 from ...models.play.ActiveWeapon import ActiveWeapon
 from ...models.play.ActiveItem import ActiveItem
 from ...models.play.ActiveUnit import ActiveUnit
+from ...models.play.ActiveTeam import ActiveTeam
+from .identity import ArenaIndex
+from .reaper import arena_reaper
+
+# how long a finished arena stays around for, before it's deleted
+TEAR_DOWN_DELAY = timedelta(minutes=15)
 
 
 def _move_inventory_in_direction(inventory_id: int, unit: ActiveUnit, direction: bool) -> List[Dict]:
@@ -84,18 +92,23 @@ def shift_weapon_to_front_of_inventory(this: ActiveWeapon, unit: ActiveUnit) ->
     return _shift_thing_to_front_of_inventory(this, unit, 'weapon')
 
 
-def remove_weapon_from_inventory(this: ActiveWeapon, unit: ActiveUnit) -> List[Dict]:
+def remove_weapon_from_inventory(this: ActiveWeapon, unit: ActiveUnit,
+                                 arena: Optional[ActiveArena] = None) -> List[Dict]:
     """
     Removes the given weapon from the unit's inventory, and shifts every item in the inventory
     after it forwards.
     This method DOES NOT VALIDATE that the weapon in question actually belongs to this unit.
     :param this: ActiveWeapon to remove from inventory
     :param unit: unit from whose inventory to remove weapon
+    :param arena: if given, the arena the unit is in, whose index (see api.arena.identity) is kept up to date
     :return: a list of inventory_id change messages and a weapon_removal message, conforming
         action_output_schema (see api/arenas/schemas.py)
     """
     output = _move_inventory_in_direction(this.inventory_id, unit, False)
-    unit.weapons.remove(this)
+    if arena is not None:
+        ArenaIndex.of(arena).remove_weapon(unit, this)
+    else:
+        unit.weapons.remove(this)
     output.append({
         "action": "remove_weapon",
         "weapon": this.id,
@@ -104,18 +117,23 @@ def remove_weapon_from_inventory(this: ActiveWeapon, unit: ActiveUnit) -> List[D
     return output
 
 
-def remove_item_from_inventory(this: ActiveItem, unit: ActiveUnit) -> List[Dict]:
+def remove_item_from_inventory(this: ActiveItem, unit: ActiveUnit,
+                               arena: Optional[ActiveArena] = None) -> List[Dict]:
     """
     Removes the given item from the unit's inventory, and shifts every item in the inventory
     after it forwards.
     This method DOES NOT VALIDATE that the weapon in question actually belongs to this unit.
     :param this: ActiveItem to remove from inventory
     :param unit: unit from whose inventory to remove weapon
+    :param arena: if given, the arena the unit is in, whose index (see api.arena.identity) is kept up to date
     :return: a list of inventory_id change messages and an item_removal message, conforming
         action_output_schema (see api/arenas/schemas.py)
     """
     output = _move_inventory_in_direction(this.inventory_id, unit, False)
-    unit.items.remove(this)
+    if arena is not None:
+        ArenaIndex.of(arena).remove_item(unit, this)
+    else:
+        unit.items.remove(this)
     output.append({
         "action": "remove_item",
         "item": this.id,
@@ -126,44 +144,32 @@ def remove_item_from_inventory(this: ActiveItem, unit: ActiveUnit) -> List[Dict]
 
 def save_arena(arena: ActiveArena):
     """
-    Saves changes to the database for this ActiveArena and all related objects, from the bottom up
+    Saves changes to the database for this ActiveArena and all related objects. Only the fields
+    that have changed are written, with one UPDATE per kind of object rather than one per object.
+    The units, weapons and items saved are the ones in the arena's index (see api.arena.identity),
+    i.e. the very instances the phase changed, rather than freshly loaded copies of them
     :param arena: Arena to save
     """
-    # foreign keys must be saved individually before their targets, so do that first.
     # note that Built objects (i.e. templates) and core objects (i.e. arena.game) should
     # not need to be saved, as they should not have changed
     logging.debug(f"Saving arena {arena.id} and all sub-objects to database")
-    for team in arena.teams():
-        for unit in team.units.all():
-            for weapon in unit.weapons.all():
-                weapon.save()
-            for item in unit.items.all():
-                item.save()
-            unit.save()
-        team.save()
+    index = ArenaIndex.of(arena)
+    save_changed(ActiveWeapon, index.weapons.values())
+    save_changed(ActiveItem, index.items.values())
+    save_changed(ActiveUnit, index.units.values())
+    save_changed(ActiveTeam, arena.teams())
     arena.save()
 
 
 def tear_down_arena(arena: ActiveArena):
     """
-    Deletes all Active components of this arena, then deletes this arena
+    Marks this arena to be deleted, along with all its Active components, 15 minutes from now.
+    Until then, its final state can still be read. The deletion is done by the arena reaper.
     :param arena: Arena to delete
     """
-    # prepare to do so
-    def finish_tear_down_arena():
-        # ignore Built and Core components
-        logging.debug(f"Deleting arena {arena.id} and all sub-objects from database")
-        for team in arena.teams():
-            for unit in team.units.all():
-                for weapon in unit.weapons.all():
-                    weapon.delete()
-                for item in unit.items.all():
-                    item.delete()
-                unit.delete()
-            team.delete()
-        arena.delete()
-    # set a timer
-    Timer(60 * 15, finish_tear_down_arena).start()
+    arena.expires_at = timezone.now() + TEAR_DOWN_DELAY
+    arena.save()
+    arena_reaper.start()
 
 
 __all__ = [
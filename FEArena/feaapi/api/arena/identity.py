@@ -0,0 +1,167 @@
+"""
+file: identity.py
+
+An identity map of the units, weapons and items in an arena, loaded all at once at the start of
+a phase. Every part of the phase that looks one of them up, by id or by who holds it, gets the
+same instance, so a change made through one reference is seen through all the others and is
+saved along with the arena (see helper.save_arena), rather than being lost on a separate copy.
+The teams' units, and the units' weapons and items, are loaded as Django prefetches, so that
+team.units.all(), unit.weapons.all() and unit.items.all() hand back those same instances too.
+"""
+from typing import Dict, Iterable, Optional
+from django.db.models import Model, Prefetch, prefetch_related_objects
+from ...models.play.ActiveArena import ActiveArena
+from ...models.play.ActiveTeam import ActiveTeam
+from ...models.play.ActiveUnit import ActiveUnit
+from ...models.play.ActiveWeapon import ActiveWeapon
+from ...models.play.ActiveItem import ActiveItem
+
+
+def _set_prefetched(instance: Model, relation: str, objects: Iterable[Model]):
+    # makes instance.<relation>.all() return exactly the given objects, as though they had been prefetched
+    cache = instance.__dict__.setdefault('_prefetched_objects_cache', {})
+    cache.pop(relation, None)
+    queryset = getattr(instance, relation).get_queryset()
+    queryset._result_cache = list(objects)
+    queryset._prefetch_done = True
+    cache[relation] = queryset
+
+
+class ArenaIndex:
+    """
+    Every unit, weapon and item in an arena, by id, along with the unit holding each weapon and
+    item (the team holding each unit is kept by the arena itself; see ActiveArena.unit_teams).
+    Changes to who holds what should go through this, so that it stays in step with the database.
+    """
+
+    def __init__(self, arena: ActiveArena):
+        self.arena = arena
+        teams = arena.teams()
+        # teams kept between phases (see api.arena.cache) may still have the last phase's units
+        for team in teams:
+            getattr(team, '_prefetched_objects_cache', {}).pop('units', None)
+        prefetch_related_objects(
+            teams,
+            Prefetch('units', queryset=ActiveUnit.objects.select_related(
+                'template__unit', 'template__unit_class')),
+            Prefetch('units__weapons', queryset=ActiveWeapon.objects.select_related('template')),
+            Prefetch('units__items', queryset=ActiveItem.objects.select_related('template')),
+        )
+        self.units: Dict[int, ActiveUnit] = {}
+        self.weapons: Dict[int, ActiveWeapon] = {}
+        self.items: Dict[int, ActiveItem] = {}
+        unit_teams: Dict[int, ActiveTeam] = {}
+        self._weapon_holders: Dict[int, ActiveUnit] = {}
+        self._item_holders: Dict[int, ActiveUnit] = {}
+        for team in teams:
+            for unit in team.units.all():
+                self.units[unit.id] = unit
+                unit_teams[unit.id] = team
+                for weapon in unit.weapons.all():
+                    self.weapons[weapon.id] = weapon
+                    self._weapon_holders[weapon.id] = unit
+                for item in unit.items.all():
+                    self.items[item.id] = item
+                    self._item_holders[item.id] = unit
+        # the arena may as well not look up what was just loaded
+        arena.__dict__['_unit_teams'] = unit_teams
+
+    @classmethod
+    def of(cls, arena: ActiveArena) -> 'ArenaIndex':
+        """
+        :return: the index of the given arena's current phase, building it if there isn't one yet
+        """
+        index = arena.__dict__.get('index')
+        if index is None:
+            index = arena.index = cls(arena)
+        return index
+
+    @staticmethod
+    def release(arena: ActiveArena):
+        """
+        Drops the given arena's index, and the units, weapons and items loaded with it, once its
+        phase is over
+        """
+        arena.__dict__.pop('index', None)
+        for team in arena.teams():
+            getattr(team, '_prefetched_objects_cache', {}).pop('units', None)
+
+    def team_of(self, unit: ActiveUnit) -> Optional[ActiveTeam]:
+        """
+        :return: the team the given unit is on, or None if it isn't on any of the arena's teams
+        """
+        return self.arena.unit_teams().get(unit.id)
+
+    def holder_of_weapon(self, weapon: ActiveWeapon) -> Optional[ActiveUnit]:
+        """
+        :return: the unit holding the given weapon, or None if nobody in the arena is
+        """
+        return self._weapon_holders.get(weapon.id)
+
+    def holder_of_item(self, item: ActiveItem) -> Optional[ActiveUnit]:
+        """
+        :return: the unit holding the given item, or None if nobody in the arena is
+        """
+        return self._item_holders.get(item.id)
+
+    def remove_unit(self, unit: ActiveUnit):
+        """
+        Takes the given unit off of its team, e.g. because it has died
+        """
+        team = self.arena.team_containing_unit(unit)
+        remaining = [u for u in team.units.all() if u.id != unit.id]
+        self.arena.remove_unit(unit)
+        _set_prefetched(team, 'units', remaining)
+        del self.units[unit.id]
+
+    def delete_unit(self, unit: ActiveUnit):
+        """
+        Deletes the given unit from the database, along with every weapon and item it's holding,
+        e.g. because it has died. Takes it off of its team first, if it's still on one.
+        """
+        if self.team_of(unit) is not None:
+            self.remove_unit(unit)
+        weapon_ids = [weapon.id for weapon in unit.weapons.all()]
+        item_ids = [item.id for item in unit.items.all()]
+        for weapon_id in weapon_ids:
+            self.weapons.pop(weapon_id, None)
+            self._weapon_holders.pop(weapon_id, None)
+        for item_id in item_ids:
+            self.items.pop(item_id, None)
+            self._item_holders.pop(item_id, None)
+        ActiveWeapon.objects.filter(id__in=weapon_ids).delete()
+        ActiveItem.objects.filter(id__in=item_ids).delete()
+        unit.delete()
+
+    def remove_weapon(self, unit: ActiveUnit, weapon: ActiveWeapon):
+        """
+        Takes the given weapon out of the given unit's inventory
+        """
+        remaining = [w for w in unit.weapons.all() if w.id != weapon.id]
+        unit.weapons.remove(weapon)
+        _set_prefetched(unit, 'weapons', remaining)
+        self.weapons.pop(weapon.id, None)
+        self._weapon_holders.pop(weapon.id, None)
+
+    def remove_item(self, unit: ActiveUnit, item: ActiveItem):
+        """
+        Takes the given item out of the given unit's inventory
+        """
+        remaining = [i for i in unit.items.all() if i.id != item.id]
+        unit.items.remove(item)
+        _set_prefetched(unit, 'items', remaining)
+        self.items.pop(item.id, None)
+        self._item_holders.pop(item.id, None)
+
+    def add_item(self, unit: ActiveUnit, item: ActiveItem):
+        """
+        Puts the given item, which nobody else is holding, into the given unit's inventory
+        """
+        held = list(unit.items.all()) + [item]
+        unit.items.add(item)
+        _set_prefetched(unit, 'items', held)
+        self.items[item.id] = item
+        self._item_holders[item.id] = unit
+
+
+__all__ = ['ArenaIndex']
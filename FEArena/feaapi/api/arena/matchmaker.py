@@ -0,0 +1,313 @@
+"""
+file: matchmaker.py
+
+Groups outstanding match requests by format and number of players, and starts an arena as
+soon as enough players of similar rating (see api.arena.ratings) are waiting in a group. How
+far apart in rating players can be starts out narrow, and widens the longer they wait, so that
+nobody waits forever. Requests are handed to the matchmaker of the process they are made in
+as they are made, so they can be matched straight away. The database remains the record of
+which requests are outstanding, and is read again every few seconds: that picks up requests
+made before a restart, or through another server process, and drops any that another process
+has matched or that have been cancelled there. Two processes may try to match the same request
+at once; only one of them can (see Matchmaker._start_match), and the other puts the rest back.
+"""
+import bisect
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from ...models.play.ActiveArena import ActiveArena
+from ...models.play.MatchRequest import MatchRequest
+from .ratings import ratings_for
+
+# how many of the most recent matches to remember, for anyone who starts waiting on one just after it's made
+RECENT_MATCHES = 10000
+# how far apart in rating players can be when matched as soon as they ask
+BASE_RATING_WINDOW = 100.0
+# how much further apart they can be for every second the longest-waiting of them has waited
+RATING_WINDOW_GROWTH = 10.0
+# after waiting this many seconds, a player will be matched with anyone
+MAX_RATING_WAIT = 120.0
+# how often (in seconds) to look again at everyone waiting, since their windows have widened
+RESCAN_INTERVAL = 5.0
+
+
+def rating_window(waited: float) -> float:
+    """
+    :param waited: how many seconds a player has been waiting for a match
+    :return: how far apart in rating the players they're matched with can be
+    """
+    if waited >= MAX_RATING_WAIT:
+        return float('inf')
+    return BASE_RATING_WINDOW + RATING_WINDOW_GROWTH * max(waited, 0.0)
+
+
+class _WaitingPlayers:
+    """
+    The outstanding requests for one format and number of players, sorted by rating, so that
+    finding where a player fits among the others is a binary search
+    """
+
+    def __init__(self, num_players: int):
+        self.num_players = num_players
+        # (rating, request id), in order
+        self._order: List[Tuple[float, int]] = []
+        # request id -> (request, rating, when its wait started, as a timestamp)
+        self._requests: Dict[int, Tuple[MatchRequest, float, float]] = {}
+
+    def __len__(self):
+        return len(self._order)
+
+    def __contains__(self, request_id: int) -> bool:
+        return request_id in self._requests
+
+    def add(self, request: MatchRequest, rating: float) -> int:
+        """
+        :return: where the request now is among those waiting
+        """
+        entry = (rating, request.id)
+        index = bisect.bisect_left(self._order, entry)
+        self._order.insert(index, entry)
+        self._requests[request.id] = (request, rating, request.last_updated.timestamp())
+        return index
+
+    def request_ids(self) -> List[int]:
+        """
+        :return: the ids of every request waiting
+        """
+        return list(self._requests)
+
+    def remove(self, request_id: int):
+        _, rating, _ = self._requests.pop(request_id)
+        del self._order[bisect.bisect_left(self._order, (rating, request_id))]
+
+    def _acceptable(self, start: int, now: float) -> Optional[float]:
+        # the rating spread of the group starting at the given index, if everyone in it would accept it
+        group = self._order[start:start + self.num_players]
+        spread = group[-1][0] - group[0][0]
+        longest_wait = now - min(self._requests[request_id][2] for _, request_id in group)
+        return spread if spread <= rating_window(longest_wait) else None
+
+    def _take(self, start: int) -> List[MatchRequest]:
+        group = [self._requests[request_id][0] for _, request_id in self._order[start:start + self.num_players]]
+        for request in group:
+            self.remove(request.id)
+        return group
+
+    def match_around(self, index: int, now: float) -> Optional[List[MatchRequest]]:
+        """
+        Looks for an acceptable group containing whoever is at the given index, preferring the
+        one closest in rating, and takes it out of those waiting
+        :return: the requests in the group, or None if there's no acceptable group
+        """
+        best, best_spread = None, None
+        first = max(0, index - self.num_players + 1)
+        last = min(index, len(self._order) - self.num_players)
+        for start in range(first, last + 1):
+            spread = self._acceptable(start, now)
+            if spread is not None and (best_spread is None or spread < best_spread):
+                best, best_spread = start, spread
+        return self._take(best) if best is not None else None
+
+    def match_all(self, now: float) -> List[List[MatchRequest]]:
+        """
+        Takes out every acceptable group among those waiting, going up from the lowest rating
+        :return: the requests in each group
+        """
+        groups = []
+        start = 0
+        while start + self.num_players <= len(self._order):
+            if self._acceptable(start, now) is not None:
+                groups.append(self._take(start))
+            else:
+                start += 1
+        return groups
+
+
+class Matchmaker:
+    """
+    Matches up requests on a background thread, which sleeps until there's a request to look at,
+    or until it's time to look again at the requests that are waiting.
+    The thread is started by the first call to submit() or start().
+    """
+
+    def __init__(self, start_arena: Callable[[str, List[int]], ActiveArena],
+                 validate_team: Callable[[str, int], None]):
+        """
+        :param start_arena: creates an arena in the given format, between the given BuiltTeams
+        :param validate_team: raises a ValueError if the given BuiltTeam can't play in the given format
+        """
+        self._start_arena = start_arena
+        self._validate_team = validate_team
+        # (request id, whether it's being cancelled rather than submitted)
+        self._requests: 'queue.Queue[Tuple[int, bool]]' = queue.Queue()
+        # outstanding requests for each (format name, number of players)
+        self._buckets: Dict[Tuple[str, int], _WaitingPlayers] = {}
+        self._thread = None
+        self._lock = threading.Lock()
+        # arena id for each recently matched request, and a condition notified whenever a match is made
+        self._matched: 'OrderedDict[int, str]' = OrderedDict()
+        self._matched_condition = threading.Condition()
+
+    def start(self):
+        """
+        Starts the matchmaking thread, if it isn't running already
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='matchmaker', daemon=True)
+                self._thread.start()
+
+    def submit(self, request_id: int):
+        """
+        Queues up a newly made match request to be matched. This should only be called once the
+        MatchRequest has been committed to the database.
+        :param request_id: id of the MatchRequest
+        """
+        self.start()
+        self._requests.put((request_id, False))
+
+    def cancel(self, request_id: int):
+        """
+        Stops trying to match a request, which should already have been deleted from the database
+        :param request_id: id of the MatchRequest
+        """
+        self.start()
+        self._requests.put((request_id, True))
+
+    def wait_for_match(self, request_id: int, timeout: float) -> Optional[str]:
+        """
+        Blocks until the given request is matched by this matchmaker, or the timeout passes. Requests
+        matched before this is called are only found if they were matched recently; callers should
+        check the MatchRequest itself first.
+        :param request_id: id of the MatchRequest to wait on
+        :param timeout: the most seconds to wait for
+        :return: the id of the arena the request was matched into, or None if it wasn't matched in time
+        """
+        with self._matched_condition:
+            self._matched_condition.wait_for(lambda: request_id in self._matched, timeout)
+            return self._matched.get(request_id)
+
+    def _run(self):
+        # the first pass rescans straight away, to pick up whatever was outstanding before the matchmaker started
+        last_rescan = None
+        while True:
+            close_old_connections()
+            try:
+                # if the database can't be read, this is tried again once the interval has passed
+                if last_rescan is None or time.monotonic() - last_rescan >= RESCAN_INTERVAL:
+                    last_rescan = time.monotonic()
+                    self._rescan()
+            except Exception:
+                logging.exception("Matchmaker failed to rescan outstanding match requests")
+            try:
+                request_id, cancelled = self._requests.get(timeout=RESCAN_INTERVAL)
+            except queue.Empty:
+                continue
+            try:
+                if cancelled:
+                    self._remove(request_id)
+                else:
+                    request = MatchRequest.objects.filter(id=request_id, arena_id=None).first()
+                    if request:
+                        player = (request.by_id, request.game_format_id)
+                        self._add(request, ratings_for([player])[player])
+            except Exception:
+                logging.exception(f"Matchmaker failed to process match request {request_id}")
+
+    def _sync_outstanding(self):
+        # brings the requests waiting here into line with the ones outstanding in the database
+        requests = list(MatchRequest.objects.filter(arena_id=None).exclude(expires_at__lte=timezone.now())
+                        .order_by('id'))
+        outstanding = {request.id for request in requests}
+        waiting = set()
+        for bucket in self._buckets.values():
+            for request_id in bucket.request_ids():
+                if request_id in outstanding:
+                    waiting.add(request_id)
+                else:
+                    # matched by another process, or cancelled through one
+                    bucket.remove(request_id)
+        new = [request for request in requests if request.id not in waiting]
+        ratings = ratings_for((request.by_id, request.game_format_id) for request in new)
+        for request in new:
+            self._add(request, ratings[(request.by_id, request.game_format_id)])
+
+    def _add(self, request: MatchRequest, rating: float):
+        key = (request.game_format_id, request.num_players)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _WaitingPlayers(request.num_players)
+        # a request may be both picked up by a rescan and submitted
+        if request.id in bucket:
+            return
+        index = bucket.add(request, rating)
+        match = bucket.match_around(index, time.time())
+        if match:
+            self._start_match(request.game_format_id, match)
+
+    def _remove(self, request_id: int):
+        for bucket in self._buckets.values():
+            if request_id in bucket:
+                bucket.remove(request_id)
+                return
+
+    def _rescan(self):
+        # drop requests whose users have stopped checking on them
+        expired = MatchRequest.objects.filter(arena_id=None, expires_at__lte=timezone.now())
+        for request_id in list(expired.values_list('id', flat=True)):
+            self._remove(request_id)
+        expired.delete()
+        self._sync_outstanding()
+        now = time.time()
+        for (format_name, _), bucket in self._buckets.items():
+            for match in bucket.match_all(now):
+                self._start_match(format_name, match)
+
+    def _start_match(self, format_name: str, match: List[MatchRequest]):
+        try:
+            with transaction.atomic():
+                # a request may have been cancelled or expired since it was queued; if so, the rest go back to waiting
+                outstanding = set(MatchRequest.objects.select_for_update().filter(
+                    id__in=[request.id for request in match], arena_id=None
+                ).exclude(expires_at__lte=timezone.now()).values_list('id', flat=True))
+                if len(outstanding) < len(match):
+                    for request in match:
+                        if request.id in outstanding:
+                            self._requests.put((request.id, False))
+                    return
+                arena = self._start_arena(format_name, [request.team_id for request in match])
+                MatchRequest.objects.filter(id__in=outstanding).update(arena_id=arena.id)
+        except ValueError as e:
+            logging.warning(f"Could not start a match for requests {[request.id for request in match]}: {e}")
+            self._drop_invalid(format_name, match)
+            return
+        logging.debug(f"Matched requests {[request.id for request in match]} into arena {arena.id}")
+        with self._matched_condition:
+            for request in match:
+                self._matched[request.id] = arena.id
+            while len(self._matched) > RECENT_MATCHES:
+                self._matched.popitem(last=False)
+            self._matched_condition.notify_all()
+
+    def _drop_invalid(self, format_name: str, match: List[MatchRequest]):
+        # expires the requests whose teams can't play, so their users can make new ones, and
+        # puts the rest back to wait for another match
+        invalid = set()
+        for request in match:
+            try:
+                self._validate_team(format_name, request.team_id)
+            except ValueError as e:
+                logging.warning(f"Match request {request.id} can't be matched: {e}")
+                invalid.add(request.id)
+        # if no one team is at fault, none of them could be matched together again either
+        if not invalid:
+            invalid = {request.id for request in match}
+        MatchRequest.objects.filter(id__in=invalid, arena_id=None).update(expires_at=timezone.now())
+        for request in match:
+            if request.id not in invalid:
+                self._requests.put((request.id, False))
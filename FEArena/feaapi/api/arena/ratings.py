@@ -0,0 +1,75 @@
+"""
+file: ratings.py
+
+Elo ratings for players, kept separately for each game format. A finished battle is scored as
+a set of head-to-head results between every pair of its players: the winner beats each of the
+others, and everyone else draws with each other (as does everyone, if nobody won).
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from django.db import transaction
+from ...models.play.ActiveArena import ActiveArena
+from ...models.play.ActiveTeam import ActiveTeam
+from ...models.play.PlayerRating import PlayerRating, DEFAULT_RATING
+
+# the most a player's rating can move by in one game
+K_FACTOR = 32.0
+
+
+def expected_score(rating: float, opponent_rating: float) -> float:
+    """
+    :return: the score (1 for a win, 0.5 for a draw, 0 for a loss) a player with the given
+        rating is expected to get, on average, against an opponent with the other
+    """
+    return 1.0 / (1.0 + 10 ** ((opponent_rating - rating) / 400.0))
+
+
+def ratings_for(players: Iterable[Tuple[int, str]]) -> Dict[Tuple[int, str], float]:
+    """
+    Looks up the ratings of many players at once
+    :param players: (user id, game format name) for each player
+    :return: the rating for each given (user id, game format name); the default rating for
+        players who haven't played in that format yet
+    """
+    players = set(players)
+    ratings = {player: DEFAULT_RATING for player in players}
+    if players:
+        for user_id, format_name, rating in PlayerRating.objects.filter(
+                user_id__in={user_id for user_id, _ in players},
+                game_format_id__in={format_name for _, format_name in players},
+        ).values_list('user_id', 'game_format_id', 'rating'):
+            if (user_id, format_name) in ratings:
+                ratings[(user_id, format_name)] = rating
+    return ratings
+
+
+def record_result(arena: ActiveArena, winning_team: Optional[ActiveTeam]):
+    """
+    Updates the ratings of everyone who played in the given arena, according to who won
+    :param arena: an arena whose battle has just finished
+    :param winning_team: the team that won, or None if nobody did
+    """
+    owners: List[int] = [team.template.owned_by_id for team in arena.teams()]
+    winner: Optional[int] = winning_team.template.owned_by_id if winning_team else None
+    # someone playing against themselves has nothing to gain or lose
+    if len(set(owners)) < 2:
+        return
+    with transaction.atomic():
+        for user_id in set(owners):
+            PlayerRating.objects.get_or_create(user_id=user_id, game_format_id=arena.game_format_id)
+        ratings: Dict[int, PlayerRating] = {
+            rating.user_id: rating for rating in PlayerRating.objects.select_for_update().filter(
+                user_id__in=owners, game_format_id=arena.game_format_id)
+        }
+        before = {user_id: rating.rating for user_id, rating in ratings.items()}
+        for user_id, rating in ratings.items():
+            opponents = [other for other in set(owners) if other != user_id]
+            change = 0.0
+            for other in opponents:
+                actual = 1.0 if user_id == winner else 0.0 if other == winner else 0.5
+                change += actual - expected_score(before[user_id], before[other])
+            rating.rating += K_FACTOR * change / len(opponents)
+            rating.games += 1
+        PlayerRating.objects.bulk_update(list(ratings.values()), ['rating', 'games'])
+
+
+__all__ = ['K_FACTOR', 'expected_score', 'ratings_for', 'record_result']
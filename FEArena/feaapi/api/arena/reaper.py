@@ -0,0 +1,109 @@
+"""
+file: reaper.py
+
+Deletes finished arenas, and everything that was created for them, once they've expired.
+Finished arenas are only marked with when they expire (see helper.tear_down_arena); a single
+background thread periodically sweeps up every arena past that time, a batch at a time, so
+arenas that expired while the server was down are cleaned up once it's back.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from ...models.play.ActiveArena import ActiveArena
+from ...models.play.ActiveTeam import ActiveTeam
+from ...models.play.ActiveUnit import ActiveUnit
+from ...models.play.ActiveWeapon import ActiveWeapon
+from ...models.play.ActiveItem import ActiveItem
+from ...models.play.MatchRequest import MatchRequest
+from .cache import arena_cache
+from . import events
+
+# how many seconds to wait between sweeps
+REAP_INTERVAL = 60.0
+# the most arenas to delete in one transaction
+REAP_BATCH_SIZE = 100
+
+
+class ArenaReaper:
+    """
+    Sweeps up expired arenas on a background thread, which is started by the first call to start()
+    """
+
+    def __init__(self, interval: float = REAP_INTERVAL, batch_size: int = REAP_BATCH_SIZE):
+        self._interval = interval
+        self._batch_size = batch_size
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Starts the sweeping thread, if it isn't running already
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='arena-reaper', daemon=True)
+                self._thread.start()
+
+    def sweep(self, now: Optional[datetime] = None) -> int:
+        """
+        Deletes every arena that has expired, along with its teams, units, weapons, items,
+        skill data, phase history and match requests
+        :param now: the time to count arenas as expired by; the current time if not given
+        :return: how many arenas were deleted
+        """
+        now = now or timezone.now()
+        total = 0
+        while True:
+            reaped = self._reap_batch(now)
+            total += reaped
+            if reaped < self._batch_size:
+                break
+        return total
+
+    def _reap_batch(self, now: datetime) -> int:
+        with transaction.atomic():
+            arenas = list(ActiveArena.objects.filter(expires_at__lte=now)
+                          .values_list('id', 'team0_id', 'team1_id', 'team2_id', 'team3_id')[:self._batch_size])
+            if not arenas:
+                return 0
+            arena_ids = [arena[0] for arena in arenas]
+            team_ids = [team_id for arena in arenas for team_id in arena[1:] if team_id is not None]
+            unit_ids = list(ActiveTeam.units.through.objects.filter(activeteam_id__in=team_ids)
+                            .values_list('activeunit_id', flat=True))
+            weapon_ids = list(ActiveUnit.weapons.through.objects.filter(activeunit_id__in=unit_ids)
+                              .values_list('activeweapon_id', flat=True))
+            item_ids = list(ActiveUnit.items.through.objects.filter(activeunit_id__in=unit_ids)
+                            .values_list('activeitem_id', flat=True))
+            # skill data and phase history go along with their arenas, and M2M rows with their owners
+            ActiveArena.objects.filter(id__in=arena_ids).delete()
+            ActiveTeam.objects.filter(id__in=team_ids).delete()
+            ActiveUnit.objects.filter(id__in=unit_ids).delete()
+            ActiveWeapon.objects.filter(id__in=weapon_ids).delete()
+            ActiveItem.objects.filter(id__in=item_ids).delete()
+            # the requests that were matched into them have served their purpose too
+            MatchRequest.objects.filter(arena_id__in=arena_ids).delete()
+        # nothing will be published to them again, or read from the cache
+        events.forget_arenas(arena_ids)
+        for arena_id in arena_ids:
+            arena_cache.evict(arena_id)
+        logging.debug(f"Reaped {len(arena_ids)} expired arenas: {arena_ids}")
+        return len(arena_ids)
+
+    def _run(self):
+        while True:
+            close_old_connections()
+            try:
+                self.sweep()
+            except Exception:
+                logging.exception("Arena reaper failed to sweep expired arenas")
+            time.sleep(self._interval)
+
+
+arena_reaper = ArenaReaper()
+
+
+__all__ = ['ArenaReaper', 'arena_reaper']
@@ -176,6 +176,7 @@ active_arena_schema = {
         "teams": {"type": "array", "items": active_team_schema},
         "turn": {"type": "number"},
         "phase": {"type": "phase"},
+        "version": {"type": "number"},
     }
 }
 
@@ -287,6 +288,21 @@ action_input_schema = {
 }
 
 
+# same as a single 'attack' action, plus the unit making it
+forecast_input_schema = {
+    "type": "object",
+    "properties": {
+        "unit": {"type": "number"},
+        "action": {"type": "string", "const": "attack"},
+        "target": {"type": "number"},
+        "with_weapon": {"type": "number"},
+        "range": {"type": "number"},
+        "samples": {"type": "number"},  # if given, sample this many combats instead of calculating exactly
+    },
+    "required": ["unit", "target", "with_weapon", "range"]
+}
+
+
 action_output_schema = {
     "type": "object",
     "properties": {
@@ -514,3 +530,34 @@ action_output_schema = {
         }
     }
 }
+
+# the changes made to an arena since a given version: every phase's changes, oldest first
+arena_changes_schema = {
+    "type": "object",
+    "properties": {
+        "version": {"type": "number"},  # the arena's current version
+        "changes": action_output_schema["properties"]["changes"],
+    }
+}
+
+
+forecast_side_subschema = {
+    "type": "object",
+    "properties": {
+        "unit": {"type": "number"},
+        "kill_chance": {"type": "number"},
+        "hp_histogram": {"type": "array", "items": {"type": "number"}},  # index is HP after combat
+        "expected_hp": {"type": "number"},
+        "expected_points": {"type": "number"},
+    }
+}
+
+forecast_output_schema = {
+    "type": "object",
+    "properties": {
+        "exact": {"type": "boolean"},
+        "samples": {"type": "number"},  # only present if not exact
+        "attacker": forecast_side_subschema,
+        "defender": forecast_side_subschema,
+    }
+}
@@ -0,0 +1,319 @@
+"""
+file: simulate.py
+
+Plays out whole arena battles many times over, for balancing teams and formats. The arena
+is read from the database once, and every way one unit could attack another is turned
+into a plan for the combat kernel; from then on, battles are played entirely in memory,
+which lets them be spread across several processes.
+"""
+import django
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
+from ...models.play.ActiveArena import ActiveArena
+from ...models.play.GameFormat import VictoryCondition
+from ..calc import kernel
+from ..calc.combat import CombatRecords, combat_rules, combatant
+from ..calc.combat_data import CombatData
+from ..calc.rng import CounterRNG
+from ..calc.stats import UnitStatSnapshot
+
+DEFAULT_MAX_TURNS = 50
+POINTS_FOR_SURVIVAL = 30
+# each battle draws from its own window of the simulation's random number stream, so that
+# battle i comes out the same no matter how the battles are split between processes
+BATTLE_STREAM_LENGTH = 1 << 32
+
+
+class UnitPlan:
+    """
+    One unit taking part in simulated battles, as it stands at the start of each battle
+    """
+    __slots__ = ('id', 'name', 'team', 'combatant', 'weapon_uses')
+
+    def __init__(self, id: int, name: str, team: int, combatant: kernel.Combatant, weapon_uses: int):
+        self.id = id
+        self.name = name
+        self.team = team
+        self.combatant = combatant
+        # uses left on the unit's equipped weapon, or 0 if it has none
+        self.weapon_uses = weapon_uses
+
+
+class Matchup:
+    """
+    Everything about one unit attacking another that stays the same over the course of a battle
+    """
+    __slots__ = ('strikes', 'expected_dealt', 'expected_taken')
+
+    def __init__(self, strikes: Tuple[Tuple, ...], expected_dealt: float, expected_taken: float):
+        # (whether the attacker is the one striking, atk, prt_rsl, hit, avo, crit, ddg) for each attack
+        self.strikes = strikes
+        # the damage each side can expect to deal over the whole combat, if both survive it
+        self.expected_dealt = expected_dealt
+        self.expected_taken = expected_taken
+
+
+class BattlePlan:
+    """
+    Everything needed to play out battles between a particular set of teams, without the database
+    """
+    __slots__ = ('rules', 'victory', 'team_names', 'units', 'targets')
+
+    def __init__(self, rules: kernel.CombatRules, victory: str, team_names: List[str],
+                 units: List[UnitPlan], targets: List[List[Tuple[int, Matchup]]]):
+        self.rules = rules
+        self.victory = victory
+        self.team_names = team_names
+        self.units = units
+        # for each unit, (index of defender, matchup) for every enemy it could attack
+        self.targets = targets
+
+
+class SimulationTally:
+    """
+    Running totals over a number of simulated battles. Tallies of separate runs over the
+    same BattlePlan can be merged.
+    """
+    __slots__ = ('battles', 'wins', 'draws', 'turns', 'damage_dealt', 'damage_taken', 'survived')
+
+    def __init__(self, teams: int, units: int):
+        self.battles = 0
+        self.wins = [0] * teams
+        self.draws = 0
+        self.turns = 0
+        self.damage_dealt = [0] * units
+        self.damage_taken = [0] * units
+        self.survived = [0] * units
+
+    def merge(self, other: 'SimulationTally'):
+        """
+        Adds the other tally's totals onto this one's
+        """
+        self.battles += other.battles
+        self.draws += other.draws
+        self.turns += other.turns
+        for totals, others in ((self.wins, other.wins), (self.damage_dealt, other.damage_dealt),
+                               (self.damage_taken, other.damage_taken), (self.survived, other.survived)):
+            for i, value in enumerate(others):
+                totals[i] += value
+
+    def to_dict(self, plan: BattlePlan) -> Dict:
+        """
+        :param plan: the plan the battles were played from
+        :return: win rates per team, and average damage and survival rate per unit
+        """
+        battles = max(self.battles, 1)
+        return {
+            "battles": self.battles,
+            "draw_rate": self.draws / battles,
+            "average_turns": self.turns / battles,
+            "teams": [{
+                "team": name,
+                "win_rate": self.wins[t] / battles,
+                "units": [{
+                    "unit": unit.id,
+                    "name": unit.name,
+                    "average_damage_dealt": self.damage_dealt[i] / battles,
+                    "average_damage_taken": self.damage_taken[i] / battles,
+                    "survival_rate": self.survived[i] / battles,
+                } for i, unit in enumerate(plan.units) if unit.team == t]
+            } for t, name in enumerate(plan.team_names)]
+        }
+
+
+def _matchup(records: CombatRecords) -> Matchup:
+    rules = records.rules
+    strikes, expected = [], {True: 0.0, False: 0.0}
+    for strike in records.strikes():
+        by_attacker = strike.by is records.attacker
+        strikes.append((by_attacker, strike.atk, strike.prt_rsl, strike.hit, strike.avo, strike.crit, strike.ddg))
+        p_hit = kernel.hit_probability(rules.rng_method, strike.hit - strike.avo)
+        p_crit = kernel.crit_probability(strike.crit - strike.ddg)
+        expected[by_attacker] += p_hit * ((1 - p_crit) * kernel.strike_damage(rules, strike, crit=False)
+                                          + p_crit * kernel.strike_damage(rules, strike, crit=True))
+    return Matchup(tuple(strikes), expected[True], expected[False])
+
+
+def load_plan(arena: ActiveArena) -> BattlePlan:
+    """
+    Reads everything about the given arena's teams that battles between them depend on.
+    Each unit fights with whatever weapon it has equipped, at that weapon's minimum range.
+    As with forecasts, skills are not accounted for beyond what they have already done to
+    the units' stats. Nothing in the arena is modified.
+    :param arena: an arena that hasn't started yet
+    :return: a plan for playing out battles between the arena's teams
+    """
+    rules = combat_rules(arena.game)
+    teams = arena.teams()
+    active_units, units = [], []
+    for t, team in enumerate(teams):
+        for unit in team.units.all():
+            try:
+                weapon = unit.weapons.get(equipped=True)
+            except (ObjectDoesNotExist, MultipleObjectsReturned):
+                weapon = None
+            stats = UnitStatSnapshot.of(unit)
+            active_units.append((unit, weapon, stats))
+            units.append(UnitPlan(unit.id, unit.template.nickname, t, combatant(rules, unit, stats.max_hp),
+                                  weapon.uses if weapon else 0))
+    targets = []
+    for a, (attacker, weapon, _) in enumerate(active_units):
+        targets.append([])
+        # units can only attack from one or two spaces away in the arena
+        if weapon is None or weapon.template.min_range > 2:
+            continue
+        for d, (defender, _, _) in enumerate(active_units):
+            if units[d].team == units[a].team:
+                continue
+            data = CombatData(attacker, defender, arena, weapon.template.min_range, attacker_weapon=weapon)
+            targets[a].append((d, _matchup(CombatRecords(data))))
+    return BattlePlan(
+        rules=rules,
+        victory=arena.game_format.victory,
+        team_names=[f"{team.template.owned_by.username}[{team.template.name}]" for team in teams],
+        units=units,
+        targets=targets
+    )
+
+
+def _choose_attack(plan: BattlePlan, members: List[int], hps: List[kernel.Combatant],
+                   weapons: List[kernel.WeaponState]) -> Optional[Tuple[int, int, Matchup]]:
+    """
+    The scripted policy every team follows: make whichever attack is expected to leave the
+    enemy worst off relative to the attacker, counting no more damage than either side has HP
+    """
+    best, best_value = None, None
+    for a in members:
+        if hps[a].hp <= 0 or weapons[a].uses == 0:
+            continue
+        for d, matchup in plan.targets[a]:
+            if hps[d].hp <= 0:
+                continue
+            taken = matchup.expected_taken if weapons[d].uses else 0
+            value = min(matchup.expected_dealt, hps[d].hp) - min(taken, hps[a].hp)
+            if best_value is None or value > best_value:
+                best, best_value = (a, d, matchup), value
+    return best
+
+
+def play_battle(plan: BattlePlan, rng, max_turns: int, tally: SimulationTally):
+    """
+    Plays out one battle from start to finish, adding its outcome to the tally. Like in the
+    arena, one unit per team acts each phase, and the order teams go in is shuffled first.
+    A battle still going after max_turns is counted as a draw.
+    :param plan: the teams to pit against each other
+    :param rng: source of random numbers
+    :param max_turns: the most turns to let the battle go on for
+    :param tally: the totals to add this battle's outcome to
+    """
+    rules = plan.rules
+    hps = [kernel.Combatant(u.combatant.hp, u.combatant.max_hp, u.combatant.level, u.combatant.class_exp,
+                            u.combatant.class_strength, u.combatant.promoted, u.combatant.fully_promoted)
+           for u in plan.units]
+    weapons = [kernel.WeaponState(u.weapon_uses) for u in plan.units]
+    members = [[i for i, u in enumerate(plan.units) if u.team == t] for t in range(len(plan.team_names))]
+    scores = [0] * len(members)
+    order = list(range(len(members)))
+    rng.shuffle(order)
+    turn, phase = 1, 0
+
+    def standing() -> List[int]:
+        return [t for t in order if any(hps[i].hp > 0 for i in members[t])]
+
+    while turn <= max_turns:
+        team = order[phase]
+        choice = _choose_attack(plan, members[team], hps, weapons)
+        if choice:
+            a, d, matchup = choice
+            attacker, defender = hps[a], hps[d]
+            attacker_hp, defender_hp = attacker.hp, defender.hp
+            kernel.resolve_combat(rules, [
+                kernel.Strike(attacker, defender, weapons[a], *stats) if by_attacker
+                else kernel.Strike(defender, attacker, weapons[d], *stats)
+                for by_attacker, *stats in matchup.strikes
+            ], rng)
+            dealt, taken = defender_hp - defender.hp, attacker_hp - attacker.hp
+            tally.damage_dealt[a] += dealt
+            tally.damage_taken[a] += taken
+            tally.damage_dealt[d] += taken
+            tally.damage_taken[d] += dealt
+            scores[team] += kernel.calculate_exp(rules, attacker, defender, dealt)
+            scores[plan.units[d].team] += kernel.calculate_exp(rules, defender, attacker, taken)
+        remaining = standing()
+        if len(remaining) <= 1:
+            break
+        # advance to the next team with anyone left on it, possibly starting a new turn
+        while True:
+            phase += 1
+            if phase == len(order):
+                phase = 0
+                turn += 1
+            if order[phase] in remaining:
+                break
+    remaining = standing()
+    tally.battles += 1
+    tally.turns += min(turn, max_turns)
+    for i, record in enumerate(hps):
+        if record.hp > 0:
+            tally.survived[i] += 1
+    if len(remaining) > 1:
+        tally.draws += 1
+        return
+    for t in remaining:
+        scores[t] += POINTS_FOR_SURVIVAL * sum(hps[i].hp > 0 for i in members[t])
+    if plan.victory == VictoryCondition.POINTS:
+        winner = max(range(len(scores)), key=lambda t: scores[t])
+    elif remaining:
+        winner = remaining[0]
+    else:
+        tally.draws += 1
+        return
+    tally.wins[winner] += 1
+
+
+def run_battles(plan: BattlePlan, seed: int, first: int, count: int, max_turns: int) -> SimulationTally:
+    """
+    Plays out a consecutive run of battles
+    :param plan: the teams to pit against each other
+    :param seed: seed for the whole simulation's random number stream
+    :param first: index of the first battle to play
+    :param count: how many battles to play
+    :param max_turns: the most turns to let each battle go on for
+    :return: the totals over the battles played
+    """
+    tally = SimulationTally(len(plan.team_names), len(plan.units))
+    for i in range(first, first + count):
+        play_battle(plan, CounterRNG(seed, i * BATTLE_STREAM_LENGTH), max_turns, tally)
+    return tally
+
+
+def simulate(plan: BattlePlan, battles: int, seed: int, max_turns: int = DEFAULT_MAX_TURNS,
+             workers: int = 1) -> SimulationTally:
+    """
+    Plays out the given number of battles, split as evenly as possible between worker processes.
+    The results depend only on the plan, the number of battles and the seed.
+    :param plan: the teams to pit against each other
+    :param battles: how many battles to play
+    :param seed: seed for the simulation's random number stream
+    :param max_turns: the most turns to let each battle go on for
+    :param workers: how many processes to play battles in. With 1, they're played in this process.
+    :return: the totals over every battle played
+    """
+    if battles < 1:
+        raise ValueError("Must simulate at least one battle")
+    workers = max(min(workers, battles), 1)
+    if workers == 1:
+        return run_battles(plan, seed, 0, battles, max_turns)
+    chunks, first = [], 0
+    for w in range(workers):
+        count = battles // workers + (w < battles % workers)
+        chunks.append((first, count))
+        first += count
+    tally = SimulationTally(len(plan.team_names), len(plan.units))
+    # worker processes import this module to run battles, which needs the app registry set up
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        futures = [pool.submit(run_battles, plan, seed, first, count, max_turns) for first, count in chunks]
+        for future in futures:
+            tally.merge(future.result())
+    return tally
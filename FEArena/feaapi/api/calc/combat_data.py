@@ -5,12 +5,24 @@ A separate file containing helper classes for skills to process on,
 separated from its parent combat.py to avoid circular import issues
 """
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
+import random
 from typing import Union, List, Iterator, Dict
 from ...models.core.Game import FollowUpCriteria
 from ...models.play.ActiveUnit import ActiveUnit
 from ...models.play.ActiveWeapon import ActiveWeapon
 from ...models.play.ActiveArena import ActiveArena
 from . import battle_stats
+from .stats import UnitStatSnapshot
+
+
+def _equipped_weapon(unit: ActiveUnit) -> ActiveWeapon:
+    # looks through the unit's weapons as already loaded (see api.arena.identity), rather than querying for them
+    equipped = [weapon for weapon in unit.weapons.all() if weapon.equipped]
+    if not equipped:
+        raise ObjectDoesNotExist
+    if len(equipped) > 1:
+        raise MultipleObjectsReturned
+    return equipped[0]
 
 
 class AttackData:
@@ -26,7 +38,7 @@ class AttackData:
     def __init__(self, by: ActiveUnit, against: ActiveUnit, with_weapon: ActiveWeapon, against_weapon: ActiveWeapon,
                  atk: int, prt_rsl: int, hit: int, avo: int, crit: int, ddg: int,
                  skillable=True, counterattack: bool = False, followup: bool = False, tags: List[str] = None,
-                 next_attack: Union['AttackData', None] = None):
+                 next_attack: Union['AttackData', None] = None, rng=random):
         self.by = by
         self.against = against
         self.with_weapon = with_weapon
@@ -44,6 +56,8 @@ class AttackData:
         # renderer to determine whether to show a particular animation
         self.tags = tags if tags else []
         self.next = next_attack
+        # the random number stream of the arena this attack takes place in, for skills to roll with
+        self.rng = rng
 
     def replace(self, other: 'AttackData'):
         """
@@ -65,6 +79,7 @@ class AttackData:
         self.counterattack = other.counterattack
         self.followup = other.followup
         self.tags = other.tags
+        self.rng = other.rng
         # do not replace next()
 
     def append(self, other: 'AttackData'):
@@ -88,23 +103,27 @@ class AttackData:
 
 
 class CombatData:
-    def __init__(self, attacker: ActiveUnit, defender: ActiveUnit, arena: ActiveArena, at_range: int):
+    def __init__(self, attacker: ActiveUnit, defender: ActiveUnit, arena: ActiveArena, at_range: int,
+                 attacker_weapon: Union[ActiveWeapon, None] = None):
         self.arena = arena
         self.game = arena.game
         self.range = at_range
-        # get attacker's weapon data
+        # get attacker's weapon data, unless we're told which weapon to assume they're holding
         self.attacker = attacker
-        try:
-            self.attacker_weapon: ActiveWeapon = attacker.weapons.get(equipped=True)
-        except ObjectDoesNotExist:
-            raise ValueError("Attacker cannot attack with no equipped weapon")
-        except MultipleObjectsReturned:
-            raise ValueError("Attacker has multiple equipped weapons")
+        if attacker_weapon is not None:
+            self.attacker_weapon: ActiveWeapon = attacker_weapon
+        else:
+            try:
+                self.attacker_weapon: ActiveWeapon = _equipped_weapon(attacker)
+            except ObjectDoesNotExist:
+                raise ValueError("Attacker cannot attack with no equipped weapon")
+            except MultipleObjectsReturned:
+                raise ValueError("Attacker has multiple equipped weapons")
         attacker_weapon_type = self.attacker_weapon.template.weapon_type if self.attacker_weapon else None
         # get defender's weapon data
         self.defender = defender
         try:
-            self.defender_weapon: Union[ActiveWeapon, None] = defender.weapons.get(equipped=True)
+            self.defender_weapon: Union[ActiveWeapon, None] = _equipped_weapon(defender)
         except ObjectDoesNotExist:
             self.defender_weapon: Union[ActiveWeapon, None] = None
         except MultipleObjectsReturned:
@@ -116,43 +135,46 @@ class CombatData:
         else:
             self.attacker_outranges_defender = \
                 not (self.defender_weapon.template.min_range <= at_range <= self.defender_weapon.template.max_range)
+        # resolve each combatant's stats once, rather than once per battle stat
+        self.attacker_stats = UnitStatSnapshot(self.attacker)
+        self.defender_stats = UnitStatSnapshot(self.defender)
         # calculate the core stats for each side
         # Attack Speed
-        self.AS_attacker = battle_stats.attack_speed(self.game, self.attacker, self.attacker_weapon)
-        self.AS_defender = battle_stats.attack_speed(self.game, self.defender, self.defender_weapon)
+        self.AS_attacker = battle_stats.attack_speed(self.game, self.attacker_stats, self.attacker_weapon)
+        self.AS_defender = battle_stats.attack_speed(self.game, self.defender_stats, self.defender_weapon)
         # Hit
-        self.hit_attacker = battle_stats.hit(self.arena, self.attacker, self.attacker_weapon,
+        self.hit_attacker = battle_stats.hit(self.arena, self.attacker_stats, self.attacker_weapon,
                                              self.defender, defender_weapon_type)
         if self.attacker_outranges_defender:
             self.hit_defender = 0
         else:
-            self.hit_defender = battle_stats.hit(self.arena, self.defender, self.defender_weapon,
+            self.hit_defender = battle_stats.hit(self.arena, self.defender_stats, self.defender_weapon,
                                                  self.attacker, attacker_weapon_type)
         # Avoid
-        self.avo_attacker = battle_stats.avoid(self.arena, self.attacker, self.attacker_weapon)
-        self.avo_defender = battle_stats.avoid(self.arena, self.defender, self.defender_weapon)
+        self.avo_attacker = battle_stats.avoid(self.arena, self.attacker_stats, self.attacker_weapon)
+        self.avo_defender = battle_stats.avoid(self.arena, self.defender_stats, self.defender_weapon)
         # Crit
-        self.crit_attacker = battle_stats.crit(self.arena, self.attacker, self.attacker_weapon)
+        self.crit_attacker = battle_stats.crit(self.arena, self.attacker_stats, self.attacker_weapon)
         if self.attacker_outranges_defender:
             self.crit_defender = 0
         else:
-            self.crit_defender = battle_stats.avoid(self.arena, self.defender, self.defender_weapon)
+            self.crit_defender = battle_stats.avoid(self.arena, self.defender_stats, self.defender_weapon)
         # Crit-Avoid
-        self.ddg_attacker = battle_stats.dodge(self.arena, self.attacker)
-        self.ddg_defender = battle_stats.dodge(self.arena, self.defender)
+        self.ddg_attacker = battle_stats.dodge(self.arena, self.attacker_stats)
+        self.ddg_defender = battle_stats.dodge(self.arena, self.defender_stats)
         # Atk
-        self.atk_attacker = battle_stats.attack(self.arena, self.attacker, self.attacker_weapon,
+        self.atk_attacker = battle_stats.attack(self.arena, self.attacker_stats, self.attacker_weapon,
                                                 self.defender, defender_weapon_type)
         if self.attacker_outranges_defender:
             self.atk_defender = 0
         else:
-            self.atk_defender = battle_stats.attack(self.arena, self.defender, self.defender_weapon,
+            self.atk_defender = battle_stats.attack(self.arena, self.defender_stats, self.defender_weapon,
                                                     self.attacker, self.attacker_weapon.template.weapon_type)
         # Prt / Rsl
-        self.prt_attacker = battle_stats.protection(self.arena, self.attacker)
-        self.rsl_attacker = battle_stats.resilience(self.arena, self.attacker)
-        self.prt_defender = battle_stats.protection(self.arena, self.defender)
-        self.rsl_defender = battle_stats.resilience(self.arena, self.defender)
+        self.prt_attacker = battle_stats.protection(self.arena, self.attacker_stats)
+        self.rsl_attacker = battle_stats.resilience(self.arena, self.attacker_stats)
+        self.prt_defender = battle_stats.protection(self.arena, self.defender_stats)
+        self.rsl_defender = battle_stats.resilience(self.arena, self.defender_stats)
         # battle scene info
         self.displayed_dmg_attacker = max(self.atk_attacker - battle_stats.prt_or_rsl(
             self.defender_weapon.template.damage_type, self.prt_defender, self.rsl_defender), 0)
@@ -176,7 +198,8 @@ class CombatData:
             crit=self.crit_attacker,
             ddg=self.ddg_defender,
             counterattack=False,
-            followup=False
+            followup=False,
+            rng=arena.rng
         )
         self.last_attack = self.attack_data
         # counterattack
@@ -194,7 +217,8 @@ class CombatData:
                 crit=self.crit_defender,
                 ddg=self.ddg_attacker,
                 counterattack=True,
-                followup=False
+                followup=False,
+                rng=arena.rng
             ))
         # follow-up
         if self.game.follow_up_criteria != FollowUpCriteria.SKILL_ONLY:
@@ -212,7 +236,8 @@ class CombatData:
                     crit=self.crit_attacker,
                     ddg=self.ddg_defender,
                     counterattack=False,
-                    followup=True
+                    followup=True,
+                    rng=arena.rng
                 ))
             elif self.AS_defender - self.AS_attacker >= self.game.follow_up_criteria \
                     and self.defender_weapon and not self.attacker_outranges_defender:
@@ -229,7 +254,8 @@ class CombatData:
                     crit=self.crit_defender,
                     ddg=self.ddg_attacker,
                     counterattack=True,
-                    followup=True
+                    followup=True,
+                    rng=arena.rng
                 ))
         # various skills will modify these things.
         # but that should be all for now
@@ -295,28 +321,31 @@ class CombatData:
         Recalculates most of the combat based on the new weapons being present.
         The Attack Speed of either combatant does not change, and neither does order of attacks.
         """
+        # stat modifiers may have changed since combat started, so take fresh snapshots
+        self.attacker_stats = UnitStatSnapshot(self.attacker)
+        self.defender_stats = UnitStatSnapshot(self.defender)
         defender_weapon_type = self.defender_weapon.template.weapon_type if self.defender_weapon else None
-        self.hit_attacker = battle_stats.hit(self.arena, self.attacker, self.attacker_weapon,
+        self.hit_attacker = battle_stats.hit(self.arena, self.attacker_stats, self.attacker_weapon,
                                              self.defender, defender_weapon_type)
         if self.attacker_outranges_defender:
             self.hit_defender = 0
         else:
-            self.hit_defender = battle_stats.hit(self.arena, self.defender, self.defender_weapon,
+            self.hit_defender = battle_stats.hit(self.arena, self.defender_stats, self.defender_weapon,
                                                  self.attacker, self.attacker_weapon.template.weapon_type)
-        self.avo_attacker = battle_stats.avoid(self.arena, self.attacker, self.attacker_weapon)
-        self.avo_defender = battle_stats.avoid(self.arena, self.defender, self.defender_weapon)
+        self.avo_attacker = battle_stats.avoid(self.arena, self.attacker_stats, self.attacker_weapon)
+        self.avo_defender = battle_stats.avoid(self.arena, self.defender_stats, self.defender_weapon)
         # Crit
-        self.crit_attacker = battle_stats.crit(self.arena, self.attacker, self.attacker_weapon)
+        self.crit_attacker = battle_stats.crit(self.arena, self.attacker_stats, self.attacker_weapon)
         if self.attacker_outranges_defender:
             self.crit_defender = 0
         else:
-            self.crit_defender = battle_stats.avoid(self.arena, self.defender, self.defender_weapon)
-        self.atk_attacker = battle_stats.attack(self.arena, self.attacker, self.attacker_weapon,
+            self.crit_defender = battle_stats.avoid(self.arena, self.defender_stats, self.defender_weapon)
+        self.atk_attacker = battle_stats.attack(self.arena, self.attacker_stats, self.attacker_weapon,
                                                 self.defender, defender_weapon_type)
         if self.attacker_outranges_defender:
             self.atk_defender = 0
         else:
-            self.atk_defender = battle_stats.attack(self.arena, self.defender, self.defender_weapon,
+            self.atk_defender = battle_stats.attack(self.arena, self.defender_stats, self.defender_weapon,
                                                     self.attacker, self.attacker_weapon.template.weapon_type)
         self.displayed_dmg_attacker = max(self.atk_attacker - battle_stats.prt_or_rsl(
             self.defender_weapon.template.damage_type, self.prt_defender, self.rsl_defender), 0)
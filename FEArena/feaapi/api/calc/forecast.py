@@ -0,0 +1,95 @@
+"""
+file: forecast.py
+
+Works out the likely outcomes of a combat before it happens, either exactly (by walking
+every branch of the attack chain through the combat kernel) or by playing the combat out
+many times over. Everything needed is loaded from the database once, up front; working
+out the outcomes never touches it.
+"""
+import random
+from typing import Dict, Iterable, Optional, Tuple
+from . import kernel
+from .combat import CombatRecords
+from .combat_data import CombatData
+
+MAX_FORECAST_SAMPLES = 10000
+
+
+def _summarize(data: CombatData, records: CombatRecords, outcomes: Iterable[Tuple[int, int, float]]) -> Dict:
+    """
+    Summarizes the given outcomes of a combat from each side's point of view
+    :param data: the combat being forecast
+    :param records: kernel records loaded from the combat, whose HP is as of the start of combat
+    :param outcomes: (attacker HP, defender HP, probability) for each way the combat can end
+    :return: a summary conforming to forecast_output_schema in api.arena.schemas, minus the
+        "exact" and "samples" fields
+    """
+    attacker, defender = records.attacker, records.defender
+    attacker_hp, defender_hp = attacker.hp, defender.hp
+    sides = {
+        "attacker": (data.attacker, attacker, defender, attacker_hp, defender_hp),
+        "defender": (data.defender, defender, attacker, defender_hp, attacker_hp),
+    }
+    summary = {
+        name: {
+            "unit": unit.id,
+            "kill_chance": 0,
+            "hp_histogram": [0] * (max(hp, 0) + 1),
+            "expected_hp": 0,
+            "expected_points": 0,
+        } for name, (unit, _, _, hp, _) in sides.items()
+    }
+    for end_attacker_hp, end_defender_hp, p in outcomes:
+        attacker.hp, defender.hp = end_attacker_hp, end_defender_hp
+        for name, (_, record, enemy, _, enemy_hp) in sides.items():
+            side = summary[name]
+            side["kill_chance"] += p * (enemy.hp <= 0)
+            side["hp_histogram"][max(record.hp, 0)] += p
+            side["expected_hp"] += p * max(record.hp, 0)
+            side["expected_points"] += p * kernel.calculate_exp(records.rules, record, enemy, enemy_hp - enemy.hp)
+    attacker.hp, defender.hp = attacker_hp, defender_hp
+    return summary
+
+
+def forecast(data: CombatData, samples: Optional[int] = None, rng=None) -> Dict:
+    """
+    Works out how the attacks in the given CombatData could turn out. Skills are not
+    accounted for, beyond whatever they have already done to the CombatData; this is the
+    same information an in-game battle forecast would give. Neither the CombatData nor the
+    units in it are modified.
+    By default, the outcome distribution is calculated exactly. If a number of samples is
+    given, the combat is instead played out that many times and the results tallied.
+    :param data: the combat to forecast
+    :param samples: if given, the number of times to play out the combat
+    :param rng: source of random numbers when sampling. If not given, a fresh random.Random is
+        used, so that forecasting doesn't disturb the rolls of real combat.
+    :return: a summary of the outcomes, conforming to forecast_output_schema in api.arena.schemas
+    """
+    records = CombatRecords(data)
+    rules = records.rules
+    attacker, defender = records.attacker, records.defender
+    strikes = records.strikes()
+    if samples is None:
+        distribution = kernel.outcome_distribution(rules, strikes, [attacker, defender])
+        summary = _summarize(data, records, ((a_hp, d_hp, p) for (a_hp, d_hp), p in distribution.items()))
+        summary["exact"] = True
+        return summary
+    if not (1 <= samples <= MAX_FORECAST_SAMPLES):
+        raise ValueError(f"Can only forecast between 1 and {MAX_FORECAST_SAMPLES} combats at a time")
+    if rng is None:
+        rng = random.Random()
+    attacker_hp, defender_hp = attacker.hp, defender.hp
+    weapons = list(records.weapons.values())
+    weapon_uses = [weapon.uses for weapon in weapons]
+    tally: Dict[Tuple[int, int], int] = {}
+    for _ in range(samples):
+        attacker.hp, defender.hp = attacker_hp, defender_hp
+        for weapon, uses in zip(weapons, weapon_uses):
+            weapon.uses = uses
+        kernel.resolve_combat(rules, strikes, rng)
+        tally[(attacker.hp, defender.hp)] = tally.get((attacker.hp, defender.hp), 0) + 1
+    attacker.hp, defender.hp = attacker_hp, defender_hp
+    summary = _summarize(data, records, ((a_hp, d_hp, n / samples) for (a_hp, d_hp), n in tally.items()))
+    summary["exact"] = False
+    summary["samples"] = samples
+    return summary
@@ -0,0 +1,349 @@
+"""
+file: mechanics.py
+
+Each FireEmblemGame names the formulas it uses for its battle stats, combat and EXP by
+method (see the *CalculationMethod choices in models.core.Game). Rather than deciding which
+formula a method means every time a stat is calculated, a game is compiled once into a
+GameMechanics, holding the formulas themselves, which is kept for as long as the process runs.
+The formulas here leave out support bonuses and weapon triangle effects, which battle_stats
+adds on top.
+"""
+import threading
+from functools import partial
+from typing import Callable, Dict, NamedTuple, Optional
+from ...models.core.Weapon import WeaponType, WeaponDamageType
+from ...models.core.Game import FireEmblemGame
+from ...models.core.Game import AttackSpeedCalculationMethod as AS_Methods
+from ...models.core.Game import HitCalculationMethod as Hit_Methods
+from ...models.core.Game import AvoidCalculationMethod as Avoid_Methods
+from ...models.core.Game import CritRateCalculationMethod as Crit_Methods
+from ...models.core.Game import CritAvoidCalculationMethod as Dodge_Methods
+from ...models.play.ActiveWeapon import ActiveWeapon
+from ..catalog import on_reload
+from . import kernel
+from . import weapons
+from .stats import UnitStatSnapshot
+
+_MAGIC_WEAPON_TYPES = (WeaponType.TOME, WeaponType.FIRE, WeaponType.THUNDER, WeaponType.WIND, WeaponType.DARK,
+                       WeaponType.LIGHT, WeaponType.ANIMA, WeaponType.BLACK, WeaponType.WHITE)
+
+
+# Attack Speed, from (unit_stats, weapon). Without a weapon, it's just Spd, except in Three Houses
+
+def _as_spd(unit_stats: UnitStatSnapshot, weapon: Optional[ActiveWeapon]) -> int:
+    return unit_stats.spd
+
+
+def _as_spd_minus_wt(unit_stats: UnitStatSnapshot, weapon: Optional[ActiveWeapon]) -> int:
+    if weapon is None:
+        return unit_stats.spd
+    return unit_stats.spd - weapon.template.wt
+
+
+def _as_spd_minus_wt_minus_con(unit_stats: UnitStatSnapshot, weapon: Optional[ActiveWeapon]) -> int:
+    if weapon is None:
+        return unit_stats.spd
+    return unit_stats.spd - max(weapon.template.wt - unit_stats.con, 0)
+
+
+def _as_spd_minus_wt_minus_con_but_not_for_magic(unit_stats: UnitStatSnapshot,
+                                                 weapon: Optional[ActiveWeapon]) -> int:
+    if weapon is None:
+        return unit_stats.spd
+    if weapon.template.weapon_type in _MAGIC_WEAPON_TYPES:
+        return unit_stats.spd - weapon.template.wt
+    return unit_stats.spd - max(weapon.template.wt - unit_stats.con, 0)
+
+
+def _as_spd_minus_wt_minus_str(unit_stats: UnitStatSnapshot, weapon: Optional[ActiveWeapon]) -> int:
+    if weapon is None:
+        return unit_stats.spd
+    return unit_stats.spd - max(weapon.template.wt - unit_stats.str, 0)
+
+
+def _as_spd_minus_wt_minus_str_over_five(unit_stats: UnitStatSnapshot, weapon: Optional[ActiveWeapon]) -> int:
+    # this is exclusively the calc method for Three Houses, which allows carried items to have weight
+    # if the unit has an equipped item, count that too
+    item_wt = 0
+    for item in unit_stats.unit.items.all():
+        if item.equipped:
+            item_wt = item.template.wt
+    weapon_wt = weapon.template.wt if weapon else 0
+    return unit_stats.spd - max(weapon_wt + item_wt - unit_stats.str // 5, 0)
+
+
+ATTACK_SPEED_FORMULAS: Dict[str, Callable[[UnitStatSnapshot, Optional[ActiveWeapon]], int]] = {
+    AS_Methods.SPEED: _as_spd,
+    AS_Methods.SPEED_MINUS_WEIGHT: _as_spd_minus_wt,
+    AS_Methods.SPEED_MINUS_WEIGHT_MINUS_CON: _as_spd_minus_wt_minus_con,
+    AS_Methods.SPEED_MINUS_WEIGHT_MINUS_CON_BUT_NOT_FOR_MAGIC: _as_spd_minus_wt_minus_con_but_not_for_magic,
+    AS_Methods.SPEED_MINUS_WEIGHT_MINUS_STR: _as_spd_minus_wt_minus_str,
+    AS_Methods.SPEED_MINUS_WEIGHT_MINUS_STR_OVER_FIVE: _as_spd_minus_wt_minus_str_over_five,
+}
+
+
+# Hit, from (game, unit_stats, weapon, opponent_weapon_type); the weapon is never None
+
+def _hit_skl_not_magic(game: FireEmblemGame, unit_stats: UnitStatSnapshot, weapon: ActiveWeapon,
+                       opponent_weapon_type: Optional[str]) -> int:
+    if weapon.template.damage_type == WeaponDamageType.MAGICAL:
+        return weapon.template.hit
+    return unit_stats.skl + weapon.template.hit
+
+
+def _hit_skl_times_2(game: FireEmblemGame, unit_stats: UnitStatSnapshot, weapon: ActiveWeapon,
+                     opponent_weapon_type: Optional[str]) -> int:
+    return unit_stats.skl * 2 + weapon.template.hit
+
+
+def _hit_skl_times_2_plus_luk(game: FireEmblemGame, unit_stats: UnitStatSnapshot, weapon: ActiveWeapon,
+                              opponent_weapon_type: Optional[str]) -> int:
+    return unit_stats.skl * 2 + unit_stats.luk + weapon.template.hit
+
+
+def _hit_skl_times_2_plus_half_luk(game: FireEmblemGame, unit_stats: UnitStatSnapshot, weapon: ActiveWeapon,
+                                   opponent_weapon_type: Optional[str]) -> int:
+    return unit_stats.skl * 2 + unit_stats.luk // 2 + weapon.template.hit
+
+
+def _hit_skl_times_2_plus_half_luk_plus_rank(game: FireEmblemGame, unit_stats: UnitStatSnapshot,
+                                             weapon: ActiveWeapon, opponent_weapon_type: Optional[str]) -> int:
+    return unit_stats.skl * 2 + unit_stats.luk // 2 + weapon.template.hit + \
+        weapons.weapon_rank_hit_bonus(game, unit_stats.unit, weapon.template.weapon_type, opponent_weapon_type)
+
+
+def _hit_skl_plus_half_luk_plus_rank(game: FireEmblemGame, unit_stats: UnitStatSnapshot, weapon: ActiveWeapon,
+                                     opponent_weapon_type: Optional[str]) -> int:
+    return unit_stats.skl + unit_stats.luk // 2 + weapon.template.hit + \
+        weapons.weapon_rank_hit_bonus(game, unit_stats.unit, weapon.template.weapon_type, opponent_weapon_type)
+
+
+def _hit_skl_times_threehalfs_plus_half_luk_plus_rank(game: FireEmblemGame, unit_stats: UnitStatSnapshot,
+                                                      weapon: ActiveWeapon,
+                                                      opponent_weapon_type: Optional[str]) -> int:
+    return (unit_stats.skl * 1.5 + unit_stats.luk / 2) // 1 + weapon.template.hit + \
+        weapons.weapon_rank_hit_bonus(game, unit_stats.unit, weapon.template.weapon_type, opponent_weapon_type)
+
+
+def _hit_skl_or_half_skl_plus_luk(game: FireEmblemGame, unit_stats: UnitStatSnapshot, weapon: ActiveWeapon,
+                                  opponent_weapon_type: Optional[str]) -> int:
+    if weapon.template.damage_type == WeaponDamageType.MAGICAL:
+        return weapon.template.hit + (unit_stats.skl + unit_stats.luk) // 2
+    return weapon.template.hit + unit_stats.skl
+
+
+HIT_FORMULAS: Dict[str, Callable[[FireEmblemGame, UnitStatSnapshot, ActiveWeapon, Optional[str]], int]] = {
+    Hit_Methods.SKL_NOT_MAGIC: _hit_skl_not_magic,
+    Hit_Methods.SKL_TIMES_2: _hit_skl_times_2,
+    Hit_Methods.SKL_TIMES_2_PLUS_LUK: _hit_skl_times_2_plus_luk,
+    Hit_Methods.SKL_TIMES_2_PLUS_HALF_LUK: _hit_skl_times_2_plus_half_luk,
+    Hit_Methods.SKL_TIMES_2_PLUS_HALF_LUK_PLUS_RANK: _hit_skl_times_2_plus_half_luk_plus_rank,
+    Hit_Methods.SKL_PLUS_HALF_LUK_PLUS_RANK: _hit_skl_plus_half_luk_plus_rank,
+    Hit_Methods.SKL_TIMES_THREEHALFS_PLUS_HALF_LUK_PLUS_RANK: _hit_skl_times_threehalfs_plus_half_luk_plus_rank,
+    Hit_Methods.SKL_OR_HALF_SKL_PLUS_LUK: _hit_skl_or_half_skl_plus_luk,
+}
+
+
+# Avoid, from (attack_speed, unit_stats, weapon), where attack_speed is the game's own AS formula
+
+def _is_magic(weapon: Optional[ActiveWeapon]) -> bool:
+    return bool(weapon) and weapon.template.damage_type == WeaponDamageType.MAGICAL
+
+
+def _avo_as_or_luk(attack_speed, unit_stats: UnitStatSnapshot, weapon: Optional[ActiveWeapon]) -> int:
+    if _is_magic(weapon):
+        return unit_stats.luk
+    return attack_speed(unit_stats, weapon)
+
+
+def _avo_as_or_spd_plus_luk(attack_speed, unit_stats: UnitStatSnapshot, weapon: Optional[ActiveWeapon]) -> int:
+    if _is_magic(weapon):
+        return unit_stats.spd + unit_stats.luk
+    return attack_speed(unit_stats, weapon)
+
+
+def _avo_spd_plus_luk(attack_speed, unit_stats: UnitStatSnapshot, weapon: Optional[ActiveWeapon]) -> int:
+    return unit_stats.spd + unit_stats.luk
+
+
+def _avo_as_times_two_plus_luk(attack_speed, unit_stats: UnitStatSnapshot, weapon: Optional[ActiveWeapon]) -> int:
+    return 2 * attack_speed(unit_stats, weapon) + unit_stats.luk
+
+
+def _avo_as_plus_half_luk(attack_speed, unit_stats: UnitStatSnapshot, weapon: Optional[ActiveWeapon]) -> int:
+    return attack_speed(unit_stats, weapon) + unit_stats.luk // 2
+
+
+def _avo_as_times_threehalfs_plus_half_luk(attack_speed, unit_stats: UnitStatSnapshot,
+                                           weapon: Optional[ActiveWeapon]) -> int:
+    return int(attack_speed(unit_stats, weapon) * 1.5 + unit_stats.luk / 2)
+
+
+def _avo_as_or_half_spd_plus_luk(attack_speed, unit_stats: UnitStatSnapshot, weapon: Optional[ActiveWeapon]) -> int:
+    if _is_magic(weapon):
+        return (unit_stats.spd + unit_stats.luk) // 2
+    return attack_speed(unit_stats, weapon)
+
+
+AVOID_FORMULAS: Dict[str, Callable] = {
+    Avoid_Methods.AS_OR_LUK: _avo_as_or_luk,
+    Avoid_Methods.AS_OR_SPD_PLUS_LUK: _avo_as_or_spd_plus_luk,
+    Avoid_Methods.SPD_PLUS_LUK: _avo_spd_plus_luk,
+    Avoid_Methods.AS_TIMES_TWO_PLUS_LUK: _avo_as_times_two_plus_luk,
+    Avoid_Methods.AS_PLUS_HALF_LUCK: _avo_as_plus_half_luk,
+    Avoid_Methods.AS_TIMES_THREEHALFS_PLUS_HALF_LUK: _avo_as_times_threehalfs_plus_half_luk,
+    Avoid_Methods.AS_OR_HALF_SPD_PLUS_LUK: _avo_as_or_half_spd_plus_luk,
+}
+
+
+# Crit, from (game, unit_stats, weapon); the weapon is never None
+
+def _crit_half_skl_plus_luk(game: FireEmblemGame, unit_stats: UnitStatSnapshot, weapon: ActiveWeapon) -> int:
+    return weapon.template.crit + (unit_stats.skl + unit_stats.luk) // 2
+
+
+def _crit_skl(game: FireEmblemGame, unit_stats: UnitStatSnapshot, weapon: ActiveWeapon) -> int:
+    return weapon.template.crit + unit_stats.skl
+
+
+def _crit_zero(game: FireEmblemGame, unit_stats: UnitStatSnapshot, weapon: ActiveWeapon) -> int:
+    return 0
+
+
+def _crit_half_skl(game: FireEmblemGame, unit_stats: UnitStatSnapshot, weapon: ActiveWeapon) -> int:
+    return weapon.template.crit + unit_stats.skl // 2
+
+
+def _crit_half_skl_plus_rank(game: FireEmblemGame, unit_stats: UnitStatSnapshot, weapon: ActiveWeapon) -> int:
+    return weapon.template.crit + unit_stats.skl // 2 + \
+        weapons.weapon_rank_crit_bonus(game, unit_stats.unit, weapon.template.weapon_type)
+
+
+def _crit_half_skl_or_skl_minus_10(game: FireEmblemGame, unit_stats: UnitStatSnapshot, weapon: ActiveWeapon) -> int:
+    skl = unit_stats.skl
+    if skl < 20:
+        return weapon.template.crit + skl // 2
+    return weapon.template.crit + skl - 10
+
+
+def _crit_half_skl_minus_four(game: FireEmblemGame, unit_stats: UnitStatSnapshot, weapon: ActiveWeapon) -> int:
+    return weapon.template.crit + (unit_stats.skl - 4) // 2
+
+
+CRIT_FORMULAS: Dict[str, Callable[[FireEmblemGame, UnitStatSnapshot, ActiveWeapon], int]] = {
+    Crit_Methods.HALF_SKILL_PLUS_LUK: _crit_half_skl_plus_luk,
+    Crit_Methods.SKL: _crit_skl,
+    Crit_Methods.ZERO: _crit_zero,
+    Crit_Methods.HALF_SKILL: _crit_half_skl,
+    Crit_Methods.HALF_SKILL_PLUS_RANK: _crit_half_skl_plus_rank,
+    Crit_Methods.HALF_SKILL_OR_SKILL_MINUS_10: _crit_half_skl_or_skl_minus_10,
+    Crit_Methods.HALF_SKILL_MINUS_FOUR: _crit_half_skl_minus_four,
+}
+
+
+# Dodge, from (unit_stats)
+
+DODGE_FORMULAS: Dict[str, Callable[[UnitStatSnapshot], int]] = {
+    Dodge_Methods.ZERO: lambda unit_stats: 0,
+    Dodge_Methods.HALF_LUK: lambda unit_stats: unit_stats.luk // 2,
+    Dodge_Methods.LUK: lambda unit_stats: unit_stats.luk,
+}
+
+
+def _unrecognized(description: str, method: str, game: FireEmblemGame) -> Callable[..., int]:
+    # stands in for a formula the game names but that isn't implemented, failing only once it's actually used
+    def formula(*args):
+        raise ValueError(f"Unrecognized {description} '{method}' for game {game.name}")
+    return formula
+
+
+def _unrecognized_attack_speed(method: str, game: FireEmblemGame) -> Callable[..., int]:
+    # as for every AS method but Three Houses', a unit without a weapon has AS equal to its Spd,
+    # so an unrecognized method only fails once a weapon is involved
+    unrecognized = _unrecognized("AS calculation method", method, game)
+
+    def formula(unit_stats: UnitStatSnapshot, weapon: Optional[ActiveWeapon]) -> int:
+        if weapon is None:
+            return unit_stats.spd
+        return unrecognized(unit_stats, weapon)
+    return formula
+
+
+class GameMechanics(NamedTuple):
+    """
+    A game's formulas, ready to call. Get one with mechanics_for(), rather than making one directly.
+    """
+    game: FireEmblemGame
+    # what the kernel needs to resolve attacks and EXP
+    rules: kernel.CombatRules
+    # (unit_stats, weapon) -> AS
+    attack_speed: Callable[[UnitStatSnapshot, Optional[ActiveWeapon]], int]
+    # (unit_stats, weapon, opponent_weapon_type) -> Hit, before supports and the weapon triangle
+    hit: Callable[[UnitStatSnapshot, ActiveWeapon, Optional[str]], int]
+    # (unit_stats, weapon) -> Avo, before supports
+    avoid: Callable[[UnitStatSnapshot, Optional[ActiveWeapon]], int]
+    # (unit_stats, weapon) -> Crit, before supports
+    crit: Callable[[UnitStatSnapshot, ActiveWeapon], int]
+    # (unit_stats) -> Ddg, before supports
+    dodge: Callable[[UnitStatSnapshot], int]
+
+
+def compile_mechanics(game: FireEmblemGame) -> GameMechanics:
+    """
+    :param game: the game whose formulas to look up
+    :return: the game's formulas, ready to call
+    """
+    def lookup(formulas: Dict[str, Callable], method: str, description: str) -> Callable:
+        return formulas.get(method) or _unrecognized(description, method, game)
+
+    attack_speed = (ATTACK_SPEED_FORMULAS.get(game.attack_speed_method)
+                    or _unrecognized_attack_speed(game.attack_speed_method, game))
+    return GameMechanics(
+        game=game,
+        rules=kernel.CombatRules(
+            name=game.name,
+            rng_method=game.rng_method,
+            crit_damage=game.crit_damage,
+            min_damage=game.min_damage_per_attack,
+            exp_method=game.exp_method,
+        ),
+        attack_speed=attack_speed,
+        hit=partial(lookup(HIT_FORMULAS, game.hit_method, "Hit Calculation Method"), game),
+        avoid=partial(lookup(AVOID_FORMULAS, game.avoid_method, "Avoid Calculation Method"), attack_speed),
+        crit=partial(lookup(CRIT_FORMULAS, game.crit_method, "Crit calculation method"), game),
+        dodge=lookup(DODGE_FORMULAS, game.crit_avoid_method, "Crit Avoid calculation method"),
+    )
+
+
+_mechanics: Dict[str, GameMechanics] = {}
+_mechanics_lock = threading.Lock()
+
+
+def mechanics_for(game: FireEmblemGame) -> GameMechanics:
+    """
+    :param game: a game
+    :return: the game's compiled formulas, compiling them the first time they're asked for
+    """
+    mechanics = _mechanics.get(game.pk)
+    if mechanics is None:
+        with _mechanics_lock:
+            mechanics = _mechanics.get(game.pk)
+            if mechanics is None:
+                mechanics = _mechanics[game.pk] = compile_mechanics(game)
+    return mechanics
+
+
+def forget_mechanics():
+    """
+    Drops every compiled game, so that they're compiled again from the database when next needed,
+    e.g. after the games' data has been reloaded
+    """
+    with _mechanics_lock:
+        _mechanics.clear()
+
+
+# a new version of the core data may have changed how a game works
+on_reload(forget_mechanics)
+
+
+__all__ = ['GameMechanics', 'compile_mechanics', 'mechanics_for', 'forget_mechanics']
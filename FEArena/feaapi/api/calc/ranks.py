@@ -8,8 +8,9 @@ from ...models.build.BuiltUnit import BuiltUnit
 from ...models.play.ActiveUnit import ActiveUnit
 from ...models.play.ActiveWeapon import ActiveWeapon
 from ...models.core.Game import FireEmblemGame
-from ...models.core.WeaponRank import WeaponRank, WeaponRankPointRequirement
+from ...models.core.WeaponRank import WeaponRank
 from ...models.core.Weapon import Weapon, WeaponType
+from ..catalog import core_catalog
 
 
 _rank_comp: Dict[str, int] = {
@@ -28,20 +29,16 @@ _rank_comp: Dict[str, int] = {
 def weapon_rank_from_points(game: FireEmblemGame, points: int, cap: str = WeaponRank.SS) -> str:
     """
     Returns the weapon rank that the given number of points equates to, given a total
-    amount of weapon EXP. Returns a ValueError if the given game does not have weapon rank data.
+    amount of weapon EXP. Returns WeaponRank.NONE if the given game does not have weapon rank data.
     :param game: the game to check
     :param points: the number of points to check the weapon rank for
     :param cap: The maximum weapon rank attainable for this weapon type
     :return: the string corresponding to the weapon rank this much Weapon EXP adds up to
     """
-    try:
-        achieved_rank = max(
-            WeaponRankPointRequirement.objects.filter(game=game),
-            key=lambda r: (points >= r.points_required, r.points_required)
-        ).weapon_rank
-        return achieved_rank if _rank_comp[achieved_rank] <= _rank_comp[cap] else cap
-    except ValueError:
+    achieved_rank = core_catalog().weapon_rank_at(game, points)
+    if achieved_rank is None:
         return WeaponRank.NONE
+    return achieved_rank if _rank_comp[achieved_rank] <= _rank_comp[cap] else cap
 
 
 def unit_can_equip_weapon(game: FireEmblemGame, unit: ActiveUnit, weapon: ActiveWeapon) -> bool:
@@ -55,7 +52,7 @@ def unit_can_equip_weapon(game: FireEmblemGame, unit: ActiveUnit, weapon: Active
         ActiveWeapon, or False otherwise
     """
     # if the unit is a Prf user of the weapon, the answer is automatically yes
-    if unit.template.unit in weapon.template.prf_users.all():
+    if unit.template.unit_id in core_catalog().weapon_prf_users(weapon.template):
         return True
     if weapon.template.rank != WeaponRank.PRF and (
             _rank_comp[weapon_rank_for_unit(game, weapon.template.weapon_type, unit)]
@@ -75,7 +72,7 @@ def built_unit_can_equip_weapon(game: FireEmblemGame, unit: BuiltUnit, weapon: W
         Weapon, or False otherwise
     """
     # if the unit is a Prf user of the weapon, the answer is automatically yes
-    if unit.unit in weapon.prf_users.all():
+    if unit.unit_id in core_catalog().weapon_prf_users(weapon):
         return True
     if weapon.rank != WeaponRank.PRF and (
             _rank_comp[weapon_rank_for_built_unit(game, weapon.weapon_type, unit)] >= _rank_comp[weapon.rank]):
@@ -4,17 +4,29 @@ file: stats.py
 Contains methods for calculating the final stat values of ActiveUnits.
 """
 
+from typing import List, Optional, Union
+from ...models.build.BuiltClass import BuiltClass
 from ...models.play.ActiveUnit import ActiveUnit
 
 
-def calc_max_hp(unit: ActiveUnit) -> int:
+def _class_history(unit: ActiveUnit) -> List[BuiltClass]:
+    """
+    Loads the given ActiveUnit's class history, along with each entry's Class template,
+    in a single query
+    """
+    return list(unit.template.unit_class_history.select_related('template'))
+
+
+def calc_max_hp(unit: ActiveUnit, class_history: Optional[List[BuiltClass]] = None) -> int:
     """
     Calculates the given ActiveUnit's Max HP stat by adding together unit bases,
     class bases, growths from each, current bonuses, and stat caps.
     :param unit: unit for which to calculate Max HP
+    :param class_history: the unit's class history, if it has already been loaded
     :return: the unit's current Max HP stat
     """
-    class_history = unit.template.unit_class_history.all()
+    if class_history is None:
+        class_history = _class_history(unit)
     # add unit and class bases together
     unit_base = unit.template.unit.base_hp
     class_base = unit.template.unit_class.base_hp
@@ -35,14 +47,16 @@ def calc_max_hp(unit: ActiveUnit) -> int:
     return final_value
 
 
-def calc_str(unit: ActiveUnit) -> int:
+def calc_str(unit: ActiveUnit, class_history: Optional[List[BuiltClass]] = None) -> int:
     """
     Calculates the given ActiveUnit's Strength stat by adding together unit bases,
     class bases, growths from each, current bonuses, and stat caps.
     :param unit: unit for which to calculate Str
+    :param class_history: the unit's class history, if it has already been loaded
     :return: the unit's current Str stat
     """
-    class_history = unit.template.unit_class_history.all()
+    if class_history is None:
+        class_history = _class_history(unit)
     # add unit and class bases together
     unit_base = unit.template.unit.base_str
     class_base = unit.template.unit_class.base_hp
@@ -63,14 +77,16 @@ def calc_str(unit: ActiveUnit) -> int:
     return final_value
 
 
-def calc_mag(unit: ActiveUnit) -> int:
+def calc_mag(unit: ActiveUnit, class_history: Optional[List[BuiltClass]] = None) -> int:
     """
     Calculates the given ActiveUnit's Magic stat by adding together unit bases,
     class bases, growths from each, current bonuses, and stat caps.
     :param unit: unit for which to calculate Mag
+    :param class_history: the unit's class history, if it has already been loaded
     :return: the unit's current Mag stat
     """
-    class_history = unit.template.unit_class_history.all()
+    if class_history is None:
+        class_history = _class_history(unit)
     # add unit and class bases together
     unit_base = unit.template.unit.base_mag
     class_base = unit.template.unit_class.base_hp
@@ -91,14 +107,16 @@ def calc_mag(unit: ActiveUnit) -> int:
     return final_value
 
 
-def calc_spd(unit: ActiveUnit) -> int:
+def calc_spd(unit: ActiveUnit, class_history: Optional[List[BuiltClass]] = None) -> int:
     """
     Calculates the given ActiveUnit's Speed stat by adding together unit bases,
     class bases, growths from each, current bonuses, and stat caps.
     :param unit: unit for which to calculate Spd
+    :param class_history: the unit's class history, if it has already been loaded
     :return: the unit's current Spd stat
     """
-    class_history = unit.template.unit_class_history.all()
+    if class_history is None:
+        class_history = _class_history(unit)
     # add unit and class bases together
     unit_base = unit.template.unit.base_spd
     class_base = unit.template.unit_class.base_hp
@@ -119,14 +137,16 @@ def calc_spd(unit: ActiveUnit) -> int:
     return final_value
 
 
-def calc_skl(unit: ActiveUnit) -> int:
+def calc_skl(unit: ActiveUnit, class_history: Optional[List[BuiltClass]] = None) -> int:
     """
     Calculates the given ActiveUnit's Skill/Dexterity stat by adding together unit bases,
     class bases, growths from each, current bonuses, and stat caps.
     :param unit: unit for which to calculate Skl/Dex
+    :param class_history: the unit's class history, if it has already been loaded
     :return: the unit's current Skl/Dex stat
     """
-    class_history = unit.template.unit_class_history.all()
+    if class_history is None:
+        class_history = _class_history(unit)
     # add unit and class bases together
     unit_base = unit.template.unit.base_skl
     class_base = unit.template.unit_class.base_hp
@@ -147,14 +167,16 @@ def calc_skl(unit: ActiveUnit) -> int:
     return final_value
 
 
-def calc_luk(unit: ActiveUnit) -> int:
+def calc_luk(unit: ActiveUnit, class_history: Optional[List[BuiltClass]] = None) -> int:
     """
     Calculates the given ActiveUnit's Luck stat by adding together unit bases,
     class bases, growths from each, current bonuses, and stat caps.
     :param unit: unit for which to calculate Luk
+    :param class_history: the unit's class history, if it has already been loaded
     :return: the unit's current Luk stat
     """
-    class_history = unit.template.unit_class_history.all()
+    if class_history is None:
+        class_history = _class_history(unit)
     # add unit and class bases together
     unit_base = unit.template.unit.base_luk
     class_base = unit.template.unit_class.base_hp
@@ -175,14 +197,16 @@ def calc_luk(unit: ActiveUnit) -> int:
     return final_value
 
 
-def calc_def(unit: ActiveUnit) -> int:
+def calc_def(unit: ActiveUnit, class_history: Optional[List[BuiltClass]] = None) -> int:
     """
     Calculates the given ActiveUnit's Defense stat by adding together unit bases,
     class bases, growths from each, current bonuses, and stat caps.
     :param unit: unit for which to calculate Def
+    :param class_history: the unit's class history, if it has already been loaded
     :return: the unit's current Def stat
     """
-    class_history = unit.template.unit_class_history.all()
+    if class_history is None:
+        class_history = _class_history(unit)
     # add unit and class bases together
     unit_base = unit.template.unit.base_def
     class_base = unit.template.unit_class.base_hp
@@ -203,14 +227,16 @@ def calc_def(unit: ActiveUnit) -> int:
     return final_value
 
 
-def calc_res(unit: ActiveUnit) -> int:
+def calc_res(unit: ActiveUnit, class_history: Optional[List[BuiltClass]] = None) -> int:
     """
     Calculates the given ActiveUnit's Resistance stat by adding together unit bases,
     class bases, growths from each, current bonuses, and stat caps.
     :param unit: unit for which to calculate Res
+    :param class_history: the unit's class history, if it has already been loaded
     :return: the unit's current Res stat
     """
-    class_history = unit.template.unit_class_history.all()
+    if class_history is None:
+        class_history = _class_history(unit)
     # add unit and class bases together
     unit_base = unit.template.unit.base_res
     class_base = unit.template.unit_class.base_hp
@@ -231,14 +257,16 @@ def calc_res(unit: ActiveUnit) -> int:
     return final_value
 
 
-def calc_cha(unit: ActiveUnit) -> int:
+def calc_cha(unit: ActiveUnit, class_history: Optional[List[BuiltClass]] = None) -> int:
     """
     Calculates the given ActiveUnit's Charm stat by adding together
      unit bases, lass bases, growths from each, current bonuses, and stat caps.
     :param unit: unit for which to calculate Cha
+    :param class_history: the unit's class history, if it has already been loaded
     :return: the unit's current Cha stat
     """
-    class_history = unit.template.unit_class_history.all()
+    if class_history is None:
+        class_history = _class_history(unit)
     # add unit and class bases together
     unit_base = unit.template.unit.base_cha
     class_base = unit.template.unit_class.base_hp
@@ -259,14 +287,16 @@ def calc_cha(unit: ActiveUnit) -> int:
     return final_value
 
 
-def calc_mov(unit: ActiveUnit) -> int:
+def calc_mov(unit: ActiveUnit, class_history: Optional[List[BuiltClass]] = None) -> int:
     """
     Calculates the given ActiveUnit's Movement stat by adding together
      unit bases, lass bases, growths from each, current bonuses, and stat caps.
     :param unit: unit for which to calculate Mov
+    :param class_history: the unit's class history, if it has already been loaded
     :return: the unit's current Mov stat
     """
-    class_history = unit.template.unit_class_history.all()
+    if class_history is None:
+        class_history = _class_history(unit)
     # add unit and class bases together
     unit_base = unit.template.unit.base_mov
     class_base = unit.template.unit_class.base_hp
@@ -287,14 +317,16 @@ def calc_mov(unit: ActiveUnit) -> int:
     return final_value
 
 
-def calc_con(unit: ActiveUnit) -> int:
+def calc_con(unit: ActiveUnit, class_history: Optional[List[BuiltClass]] = None) -> int:
     """
     Calculates the given ActiveUnit's Constitution/Build stat by adding together
      unit bases, lass bases, growths from each, current bonuses, and stat caps.
     :param unit: unit for which to calculate Con/Bld
+    :param class_history: the unit's class history, if it has already been loaded
     :return: the unit's current Con/Bld stat
     """
-    class_history = unit.template.unit_class_history.all()
+    if class_history is None:
+        class_history = _class_history(unit)
     # add unit and class bases together
     unit_base = unit.template.unit.base_con
     class_base = unit.template.unit_class.base_hp
@@ -313,3 +345,38 @@ def calc_con(unit: ActiveUnit) -> int:
     # apply current transient boosts/reductions
     final_value += unit.mod_con
     return final_value
+
+
+class UnitStatSnapshot:
+    """
+    The final values of every stat of an ActiveUnit, resolved all at once from a single
+    load of the unit's class history. This is intended to be built once per unit per
+    combat, and handed to the battle_stats functions in place of the ActiveUnit itself,
+    so that no stat gets recalculated (or re-queried) more than once.
+    The snapshot does not track changes to the unit's modifiers after it was taken.
+    """
+
+    def __init__(self, unit: ActiveUnit):
+        self.unit = unit
+        class_history = _class_history(unit)
+        self.max_hp = calc_max_hp(unit, class_history)
+        self.str = calc_str(unit, class_history)
+        self.mag = calc_mag(unit, class_history)
+        self.skl = calc_skl(unit, class_history)
+        self.spd = calc_spd(unit, class_history)
+        self.luk = calc_luk(unit, class_history)
+        self.def_ = calc_def(unit, class_history)
+        self.res = calc_res(unit, class_history)
+        self.cha = calc_cha(unit, class_history)
+        self.mov = calc_mov(unit, class_history)
+        self.con = calc_con(unit, class_history)
+
+    @staticmethod
+    def of(unit: Union[ActiveUnit, 'UnitStatSnapshot']) -> 'UnitStatSnapshot':
+        """
+        :param unit: either an ActiveUnit, or a snapshot that has already been taken of one
+        :return: the given snapshot, or a new snapshot of the given ActiveUnit
+        """
+        if isinstance(unit, UnitStatSnapshot):
+            return unit
+        return UnitStatSnapshot(unit)
@@ -3,12 +3,12 @@ file: calc/support.py
 
 Helper methods for calculating boosts obtained from supports
 """
-from typing import Dict, Optional, Iterable, Set
+from typing import Dict, List, Optional, Set, Tuple
 from ...models.play.ActiveUnit import ActiveUnit
 from ...models.play.ActiveArena import ActiveArena
 from ...models.play.ActiveTeam import ActiveTeam
 from ...models.build.RankedSupport import RankedSupport
-from ...models.core.Unit import Unit, Affinity
+from ...models.core.Unit import Affinity
 from ...models.core.Game import BondSupportBehavior, RankedSupportBehavior
 
 
@@ -24,18 +24,90 @@ gba_affinity_boosts: Dict[Optional[str], Dict] = {
 }
 
 
-def _gba_support_boost_for_unit(unit: ActiveUnit, team: ActiveTeam, stat: str) -> int:
+# the stats a team's tactician gives a bonus to, for units sharing the tactician's affinity
+_TACTICIAN_STATS = ('hit', 'avo', 'ddg')
+
+
+class SupportTable:
+    """
+    The ranked support bonus to each stat for every unit in an arena, given who is still on
+    each unit's team. The supports themselves don't change over a battle, so they're loaded all
+    at once, the first time any bonus is needed; when a unit is removed from its team, only its
+    former teammates' bonuses are worked out again. Use support_table() to get an arena's table.
+    """
+
+    def __init__(self, arena: ActiveArena):
+        self.arena = arena
+        unit_teams = arena.unit_teams()
+        # unit id -> (id of its base Unit, its affinity)
+        self._units: Dict[int, Tuple[int, Optional[str]]] = {}
+        # unit id -> (id of the supporting base Unit, its affinity, the support's rank) for each of its supports
+        self._supports: Dict[int, List[Tuple[int, Optional[str], int]]] = {}
+        templates: Dict[int, List[int]] = {}
+        for unit_id, template_id, base_unit_id, affinity in ActiveUnit.objects.filter(id__in=unit_teams).values_list(
+                'id', 'template_id', 'template__unit_id', 'template__unit__affinity'):
+            self._units[unit_id] = (base_unit_id, affinity)
+            self._supports[unit_id] = []
+            templates.setdefault(template_id, []).append(unit_id)
+        for template_id, supported_by_id, affinity, rank in RankedSupport.objects.filter(
+                unit_id__in=templates).values_list('unit_id', 'supported_by_id', 'supported_by__affinity', 'rank'):
+            for unit_id in templates[template_id]:
+                self._supports[unit_id].append((supported_by_id, affinity, rank))
+        # unit id -> stat -> bonus
+        self._bonuses: Dict[int, Dict[str, int]] = {}
+        for team in arena.teams():
+            self._compute_team(team)
+
+    def _compute_team(self, team: ActiveTeam):
+        members = [unit_id for unit_id, unit_team in self.arena.unit_teams().items()
+                   if unit_team is team and unit_id in self._units]
+        teammates: Set[int] = {self._units[unit_id][0] for unit_id in members}
+        for unit_id in members:
+            affinity = self._units[unit_id][1]
+            supports = [s for s in self._supports[unit_id] if s[0] in teammates]
+            bonuses = {
+                stat: int(sum(
+                    (gba_affinity_boosts[affinity][stat] + gba_affinity_boosts[supporter_affinity][stat]) * rank
+                    for _, supporter_affinity, rank in supports
+                ))
+                for stat in gba_affinity_boosts[None]
+            }
+            if team.template.tactician_rank and team.template.tactician_affinity \
+                    and team.template.tactician_affinity == affinity:
+                for stat in _TACTICIAN_STATS:
+                    bonuses[stat] += team.template.tactician_rank
+            self._bonuses[unit_id] = bonuses
+
+    def bonus(self, unit: ActiveUnit, stat: str) -> int:
+        """
+        :param unit: a unit on one of the arena's teams
+        :param stat: one of the keys of gba_affinity_boosts' entries
+        :return: the unit's bonus to the given stat from its ranked supports (and tactician, if any)
+        """
+        bonuses = self._bonuses.get(unit.id)
+        if bonuses is None:
+            raise ValueError(f"Unit with id {unit.id} is not in any of this arena's teams")
+        return bonuses[stat]
+
+    def remove_unit(self, unit: ActiveUnit, team: ActiveTeam):
+        """
+        Forgets the given unit, which has just been taken off of the given team, and works out
+        its former teammates' bonuses again without it
+        """
+        self._units.pop(unit.id, None)
+        self._supports.pop(unit.id, None)
+        self._bonuses.pop(unit.id, None)
+        self._compute_team(team)
+
+
+def support_table(arena: ActiveArena) -> SupportTable:
     """
-    Helper method that grabs the desired keys from the gba_affinity_boosts dict and adds them up
+    :return: the given arena's SupportTable, which is kept with the arena once it's been built
     """
-    teammates: Set[Unit] = {bu.template.unit for bu in team.units.all()}
-    ranked_supports: Iterable[RankedSupport] = RankedSupport.objects.filter(unit=unit.template)
-    return int(sum(
-        (gba_affinity_boosts[unit.template.unit.affinity][stat]
-         + gba_affinity_boosts[rs.supported_by.affinity][stat]) * rs.rank
-        for rs in ranked_supports
-        if rs.supported_by in teammates
-    ))
+    table = arena.__dict__.get('support_table')
+    if table is None:
+        table = arena.__dict__['support_table'] = SupportTable(arena)
+    return table
 
 
 def hit_boosts(arena: ActiveArena, unit: ActiveUnit) -> int:
@@ -53,13 +125,7 @@ def hit_boosts(arena: ActiveArena, unit: ActiveUnit) -> int:
     # ranked supports
     ranked_support_method = game.ranked_support_behavior
     if ranked_support_method == RankedSupportBehavior.GBA_AFFINITY:
-        unit_team: ActiveTeam = arena.team_containing_unit(unit)
-        if unit_team.template.tactician_rank and unit_team.template.tactician_affinity \
-                and unit_team.template.tactician_affinity == unit.template.unit.affinity:
-            tactician_bonus = unit_team.template.tactician_rank
-        else:
-            tactician_bonus = 0
-        return _gba_support_boost_for_unit(unit, unit_team, 'hit') + tactician_bonus
+        return support_table(arena).bonus(unit, 'hit')
     # TODO implement ranked support behavior for various games
 
 
@@ -78,7 +144,7 @@ def crit_boosts(arena: ActiveArena, unit: ActiveUnit) -> int:
     # ranked supports
     ranked_support_method = game.ranked_support_behavior
     if ranked_support_method == RankedSupportBehavior.GBA_AFFINITY:
-        return _gba_support_boost_for_unit(unit, arena.team_containing_unit(unit), 'crit')
+        return support_table(arena).bonus(unit, 'crit')
     # TODO implement ranked support behavior for various games
 
 
@@ -97,13 +163,7 @@ def avo_boosts(arena: ActiveArena, unit: ActiveUnit) -> int:
     # ranked supports
     ranked_support_method = game.ranked_support_behavior
     if ranked_support_method == RankedSupportBehavior.GBA_AFFINITY:
-        unit_team: ActiveTeam = arena.team_containing_unit(unit)
-        if unit_team.template.tactician_rank and unit_team.template.tactician_affinity \
-                and unit_team.template.tactician_affinity == unit.template.unit.affinity:
-            tactician_bonus = unit_team.template.tactician_rank
-        else:
-            tactician_bonus = 0
-        return _gba_support_boost_for_unit(unit, unit_team, 'avo') + tactician_bonus
+        return support_table(arena).bonus(unit, 'avo')
     # TODO implement ranked support behavior for various games
 
 
@@ -122,13 +182,7 @@ def ddg_boosts(arena: ActiveArena, unit: ActiveUnit) -> int:
     # ranked supports
     ranked_support_method = game.ranked_support_behavior
     if ranked_support_method == RankedSupportBehavior.GBA_AFFINITY:
-        unit_team: ActiveTeam = arena.team_containing_unit(unit)
-        if unit_team.template.tactician_rank and unit_team.template.tactician_affinity \
-                and unit_team.template.tactician_affinity == unit.template.unit.affinity:
-            tactician_bonus = unit_team.template.tactician_rank
-        else:
-            tactician_bonus = 0
-        return _gba_support_boost_for_unit(unit, unit_team, 'ddg') + tactician_bonus
+        return support_table(arena).bonus(unit, 'ddg')
     # TODO implement ranked support behavior for various games
 
 
@@ -147,7 +201,7 @@ def atk_boosts(arena: ActiveArena, unit: ActiveUnit) -> int:
     # ranked supports
     ranked_support_method = game.ranked_support_behavior
     if ranked_support_method == RankedSupportBehavior.GBA_AFFINITY:
-        return _gba_support_boost_for_unit(unit, arena.team_containing_unit(unit), 'atk')
+        return support_table(arena).bonus(unit, 'atk')
     # TODO implement ranked support behavior for various games
 
 
@@ -166,5 +220,5 @@ def prt_rsl_boosts(arena: ActiveArena, unit: ActiveUnit) -> int:
     # ranked supports
     ranked_support_method = game.ranked_support_behavior
     if ranked_support_method == RankedSupportBehavior.GBA_AFFINITY:
-        return _gba_support_boost_for_unit(unit, arena.team_containing_unit(unit), 'prt')
+        return support_table(arena).bonus(unit, 'prt')
     # TODO implement ranked support behavior for various games
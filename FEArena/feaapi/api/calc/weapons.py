@@ -1,11 +1,9 @@
-from django.core.exceptions import ObjectDoesNotExist
 from typing import Union
 from ...models.core.Game import FireEmblemGame
 from ...models.core.Game import WeaponTriangleType
-from ...models.core.WeaponTriangleBonus import WeaponTriangleBonus
-from ...models.core.WeaponRankBonus import WeaponRankBonus
 from ...models.core.Weapon import WeaponType
 from ...models.play.ActiveUnit import ActiveUnit
+from ..catalog import core_catalog
 from . import ranks
 
 
@@ -109,19 +107,12 @@ def weapon_triangle_atk_bonus(game: FireEmblemGame, unit: ActiveUnit, weapon_typ
     """
     wta = weapon_triangle_status(game, weapon_type, opponent_weapon_type)
     if wta is not None:
-        try:
-            wta_weapon_type = weapon_type if wta else opponent_weapon_type
-            wta_weapon_holder = unit if wta else opponent
-            wta_bonus = WeaponTriangleBonus.objects.get(
-                game=game,
-                weapon_rank=ranks.weapon_rank_for_unit(game, wta_weapon_type, wta_weapon_holder)
-            ).atk_bonus
-            if wta is True:
-                return wta_bonus
-            else:
-                return -wta_bonus
-        except ObjectDoesNotExist:
-            pass
+        wta_weapon_type = weapon_type if wta else opponent_weapon_type
+        wta_weapon_holder = unit if wta else opponent
+        wta_bonus = core_catalog().triangle_bonus(
+            game, ranks.weapon_rank_for_unit(game, wta_weapon_type, wta_weapon_holder))
+        if wta_bonus is not None:
+            return wta_bonus.atk_bonus if wta is True else -wta_bonus.atk_bonus
     return 0
 
 
@@ -139,19 +130,12 @@ def weapon_triangle_hit_bonus(game: FireEmblemGame, unit: ActiveUnit, weapon_typ
     """
     wta = weapon_triangle_status(game, weapon_type, opponent_weapon_type)
     if wta is not None:
-        try:
-            wta_weapon_type = weapon_type if wta else opponent_weapon_type
-            wta_weapon_holder = unit if wta else opponent
-            wta_bonus = WeaponTriangleBonus.objects.get(
-                game=game,
-                weapon_rank=ranks.weapon_rank_for_unit(game, wta_weapon_type, wta_weapon_holder)
-            ).hit_bonus
-            if wta is True:
-                return wta_bonus
-            else:
-                return -wta_bonus
-        except ObjectDoesNotExist:
-            pass
+        wta_weapon_type = weapon_type if wta else opponent_weapon_type
+        wta_weapon_holder = unit if wta else opponent
+        wta_bonus = core_catalog().triangle_bonus(
+            game, ranks.weapon_rank_for_unit(game, wta_weapon_type, wta_weapon_holder))
+        if wta_bonus is not None:
+            return wta_bonus.hit_bonus if wta is True else -wta_bonus.hit_bonus
     return 0
 
 
@@ -171,14 +155,8 @@ def weapon_rank_hit_bonus(game: FireEmblemGame, unit: ActiveUnit, weapon_type: s
             and opponent_weapon_type \
             and weapon_triangle_status(game, weapon_type, opponent_weapon_type) is False:
         return 0
-    try:
-        return WeaponRankBonus.objects.get(
-            game=game,
-            weapon_type=weapon_type,
-            weapon_rank=ranks.weapon_rank_for_unit(game, weapon_type, unit)
-        ).hit_bonus
-    except ObjectDoesNotExist:
-        return 0
+    rank_bonus = core_catalog().rank_bonus(game, weapon_type, ranks.weapon_rank_for_unit(game, weapon_type, unit))
+    return rank_bonus.hit_bonus if rank_bonus is not None else 0
 
 
 def weapon_rank_atk_bonus(game: FireEmblemGame, unit: ActiveUnit, weapon_type: str,
@@ -197,14 +175,8 @@ def weapon_rank_atk_bonus(game: FireEmblemGame, unit: ActiveUnit, weapon_type: s
             and opponent_weapon_type \
             and weapon_triangle_status(game, weapon_type, opponent_weapon_type) is False:
         return 0
-    try:
-        return WeaponRankBonus.objects.get(
-            game=game,
-            weapon_type=weapon_type,
-            weapon_rank=ranks.weapon_rank_for_unit(game, weapon_type, unit)
-        ).atk_bonus
-    except ObjectDoesNotExist:
-        return 0
+    rank_bonus = core_catalog().rank_bonus(game, weapon_type, ranks.weapon_rank_for_unit(game, weapon_type, unit))
+    return rank_bonus.atk_bonus if rank_bonus is not None else 0
 
 
 def weapon_rank_crit_bonus(game: FireEmblemGame, unit: ActiveUnit, weapon_type: str) -> int:
@@ -218,11 +190,5 @@ def weapon_rank_crit_bonus(game: FireEmblemGame, unit: ActiveUnit, weapon_type:
     :param weapon_type: the weapon type in use
     :return: the crit bonus that comes from weapon rank
     """
-    try:
-        return WeaponRankBonus.objects.get(
-            game=game,
-            weapon_type=weapon_type,
-            weapon_rank=ranks.weapon_rank_for_unit(game, weapon_type, unit)
-        ).crit_bonus
-    except ObjectDoesNotExist:
-        return 0
+    rank_bonus = core_catalog().rank_bonus(game, weapon_type, ranks.weapon_rank_for_unit(game, weapon_type, unit))
+    return rank_bonus.crit_bonus if rank_bonus is not None else 0
@@ -0,0 +1,379 @@
+"""
+file: catalog.py
+
+The core data that every game is played with (games, classes, units, weapons, items, skills,
+and the tables of bonuses and requirements that go with them) only changes when the fixtures
+are reloaded, so it's read from the database once and then kept in memory by every process, as
+a CoreCatalog. The catalog is shared between threads, and must be treated as read-only: nothing
+in it, including the model instances, should be modified or saved.
+
+Each catalog is loaded for a version of the core data, made up of settings.CORE_DATA_VERSION,
+which should be bumped whenever the fixtures change, and a count of the changes made to the
+core models from within this process (e.g. by loaddata), and is replaced by a new one, loaded
+the next time it's asked for, as soon as either of them moves on.
+"""
+import bisect
+import logging
+import threading
+from types import MappingProxyType
+from typing import Callable, Dict, FrozenSet, Generic, Iterator, List, Mapping, Optional, Tuple, Type, TypeVar
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from ..models.core.Game import FireEmblemGame, FireEmblemGameRoute
+from ..models.core.Skill import Skill
+from ..models.core.Weapon import Weapon
+from ..models.core.WeaponRank import WeaponRankPointRequirement
+from ..models.core.WeaponRankBonus import WeaponRankBonus
+from ..models.core.WeaponTriangleBonus import WeaponTriangleBonus
+from ..models.core.Item import Item
+from ..models.core.Class import Class
+from ..models.core.PromotionBonus import PromotionBonus
+from ..models.core.ExtraSkillAttainment import ExtraSkill
+from ..models.core.Unit import Unit
+from ..models.core.BondSupport import BondSupport
+from ..models.core.RankedSupportTemplate import RankedSupportTemplate
+
+M = TypeVar('M', bound=Model)
+
+# every model whose rows are part of the core data; changing any of them means a new version
+CORE_MODELS = (FireEmblemGame, FireEmblemGameRoute, Skill, Weapon, WeaponRankPointRequirement, WeaponRankBonus,
+               WeaponTriangleBonus, Item, Class, PromotionBonus, ExtraSkill, Unit, BondSupport,
+               RankedSupportTemplate)
+
+
+class CatalogTable(Generic[M]):
+    """
+    Every row of one core model, by id, by name within its game, and by game
+    """
+
+    def __init__(self, model: Type[M], rows: List[M]):
+        self.model = model
+        by_id: Dict = {}
+        by_name: Dict[Tuple[Optional[str], str], M] = {}
+        by_game: Dict[str, List[M]] = {}
+        for row in rows:
+            # games are named on their own; everything else is named within its game
+            game_id = getattr(row, 'game_id', None)
+            by_id[row.pk] = row
+            by_name.setdefault((game_id, row.name), row)
+            if game_id is not None:
+                by_game.setdefault(game_id, []).append(row)
+        self._by_id: Mapping = MappingProxyType(by_id)
+        self._by_name: Mapping[Tuple[Optional[str], str], M] = MappingProxyType(by_name)
+        self._by_game: Mapping[str, Tuple[M, ...]] = MappingProxyType(
+            {game_id: tuple(game_rows) for game_id, game_rows in by_game.items()})
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[M]:
+        return iter(self._by_id.values())
+
+    def __contains__(self, pk) -> bool:
+        return pk in self._by_id
+
+    def get(self, pk) -> M:
+        """
+        :param pk: id of the row (or, for games, its abbreviation)
+        :return: the row with that id. Raises the model's DoesNotExist if there isn't one.
+        """
+        try:
+            return self._by_id[pk]
+        except KeyError:
+            raise self.model.DoesNotExist(f"There's no {self.model.__name__} with id {pk}") from None
+
+    def named(self, name: str, game: Optional[FireEmblemGame] = None) -> M:
+        """
+        :param name: name of the row
+        :param game: the game the row is from; left out when looking up a game itself
+        :return: the row with that name in that game (the first, if there are several, such as a unit
+            recruited on more than one route). Raises the model's DoesNotExist if there isn't one.
+        """
+        try:
+            return self._by_name[(game.pk if game is not None else None, name)]
+        except KeyError:
+            raise self.model.DoesNotExist(f"There's no {self.model.__name__} named {name}"
+                                          f"{f' in {game.pk}' if game is not None else ''}") from None
+
+    def in_game(self, game: FireEmblemGame) -> Tuple[M, ...]:
+        """
+        :return: every row from the given game, in order of id
+        """
+        return self._by_game.get(game.pk, ())
+
+
+def _related(model: Type[Model], field_name: str) -> Dict[int, Tuple[int, ...]]:
+    # the ids on the other end of a many-to-many field, for each row that has any
+    field = model._meta.get_field(field_name)
+    related: Dict[int, List[int]] = {}
+    for source_id, target_id in field.remote_field.through.objects.order_by('pk').values_list(
+            field.m2m_field_name(), field.m2m_reverse_field_name()):
+        related.setdefault(source_id, []).append(target_id)
+    return {source_id: tuple(target_ids) for source_id, target_ids in related.items()}
+
+
+class CoreCatalog:
+    """
+    The core data, as of one version of it. Look rows up through the tables (e.g.
+    catalog.skills.get(709), catalog.weapons.named('Iron Sword', game)), and the data relating
+    them through the methods, which take model instances from the catalog or from the database alike.
+    """
+
+    def __init__(self, version: Tuple):
+        self.version = version
+        self.games: CatalogTable[FireEmblemGame] = CatalogTable(FireEmblemGame, list(
+            FireEmblemGame.objects.order_by('pk')))
+        games = self.games
+        self.skills: CatalogTable[Skill] = CatalogTable(Skill, [
+            self._with(skill, game=games) for skill in Skill.objects.order_by('pk')])
+        self.classes: CatalogTable[Class] = CatalogTable(Class, [
+            self._with(unit_class, game=games) for unit_class in Class.objects.order_by('pk')])
+        self.units: CatalogTable[Unit] = CatalogTable(Unit, [
+            self._with(unit, game=games, initial_class=self.classes)
+            for unit in Unit.objects.select_related('route').order_by('pk')])
+        self.weapons: CatalogTable[Weapon] = CatalogTable(Weapon, [
+            self._with(weapon, game=games) for weapon in Weapon.objects.order_by('pk')])
+        for weapon in self.weapons:
+            if weapon.breaks_into_id is not None:
+                weapon.breaks_into = self.weapons.get(weapon.breaks_into_id)
+        self.items: CatalogTable[Item] = CatalogTable(Item, [
+            self._with(item, game=games) for item in Item.objects.order_by('pk')])
+
+        self._personal_skills = _related(Unit, 'personal_skills')
+        self._class_skills = _related(Class, 'class_skills')
+        self._weapon_effects = _related(Weapon, 'weapon_effects')
+        self._item_effects = _related(Item, 'item_effects')
+        self._promotes_to = _related(Class, 'promotes_to')
+        self._base_classes = _related(Unit, 'base_classes')
+        self._ranked_support_partners: Dict[int, FrozenSet[int]] = {
+            unit_id: frozenset(partner_ids)
+            for unit_id, partner_ids in _related(Unit, 'can_ranked_support').items()}
+        self._weapon_prf_users: Dict[int, FrozenSet[int]] = {
+            weapon_id: frozenset(unit_ids) for weapon_id, unit_ids in _related(Weapon, 'prf_users').items()}
+        self._item_prf_users: Dict[int, FrozenSet[int]] = {
+            item_id: frozenset(unit_ids) for item_id, unit_ids in _related(Item, 'prf_users').items()}
+
+        # the weapon rank each game's point requirements reach, in increasing order of points
+        requirements: Dict[str, List[WeaponRankPointRequirement]] = {}
+        for requirement in WeaponRankPointRequirement.objects.order_by('points_required', 'pk'):
+            requirements.setdefault(requirement.game_id, []).append(requirement)
+        self._rank_points: Dict[str, Tuple[int, ...]] = {
+            game_id: tuple(r.points_required for r in game_requirements)
+            for game_id, game_requirements in requirements.items()}
+        self._rank_names: Dict[str, Tuple[str, ...]] = {
+            game_id: tuple(r.weapon_rank for r in game_requirements)
+            for game_id, game_requirements in requirements.items()}
+
+        self._triangle_bonuses: Dict[Tuple[str, str], WeaponTriangleBonus] = {
+            (bonus.game_id, bonus.weapon_rank): self._with(bonus, game=games)
+            for bonus in WeaponTriangleBonus.objects.all()}
+        self._rank_bonuses: Dict[Tuple[str, str, str], WeaponRankBonus] = {
+            (bonus.game_id, bonus.weapon_type, bonus.weapon_rank): self._with(bonus, game=games)
+            for bonus in WeaponRankBonus.objects.all()}
+        self._promotion_bonuses: Dict[Tuple[int, int], PromotionBonus] = {
+            (bonus.from_class_id, bonus.to_class_id): self._with(bonus, from_class=self.classes,
+                                                                 to_class=self.classes)
+            for bonus in PromotionBonus.objects.order_by('pk')}
+        extra_skills: Dict[int, List[ExtraSkill]] = {}
+        for extra_skill in ExtraSkill.objects.order_by('pk'):
+            extra_skills.setdefault(extra_skill.unit_class_id, []).append(
+                self._with(extra_skill, unit_class=self.classes, skill=self.skills))
+        self._extra_skills: Dict[int, Tuple[ExtraSkill, ...]] = {
+            class_id: tuple(sorted(class_skills, key=lambda s: s.level))
+            for class_id, class_skills in extra_skills.items()}
+        support_templates: Dict[int, List[RankedSupportTemplate]] = {}
+        for template in RankedSupportTemplate.objects.order_by('pk'):
+            support_templates.setdefault(template.unit_id, []).append(
+                self._with(template, unit=self.units, supported_by=self.units))
+        self._support_templates: Dict[int, Tuple[RankedSupportTemplate, ...]] = {
+            unit_id: tuple(templates) for unit_id, templates in support_templates.items()}
+
+    @staticmethod
+    def _with(row: M, **tables: CatalogTable) -> M:
+        # points the given foreign keys of the row at the catalog's own instances
+        for field_name, table in tables.items():
+            setattr(row, field_name, table.get(getattr(row, f'{field_name}_id')))
+        return row
+
+    def personal_skills(self, unit: Unit) -> Tuple[Skill, ...]:
+        """
+        :return: the given unit's personal skills
+        """
+        return tuple(self.skills.get(skill_id) for skill_id in self._personal_skills.get(unit.pk, ()))
+
+    def class_skills(self, unit_class: Class) -> Tuple[Skill, ...]:
+        """
+        :return: the skills that come with the given class
+        """
+        return tuple(self.skills.get(skill_id) for skill_id in self._class_skills.get(unit_class.pk, ()))
+
+    def weapon_effects(self, weapon: Weapon) -> Tuple[Skill, ...]:
+        """
+        :return: the skills the given weapon grants to whoever wields it
+        """
+        return tuple(self.skills.get(skill_id) for skill_id in self._weapon_effects.get(weapon.pk, ()))
+
+    def item_effects(self, item: Item) -> Tuple[Skill, ...]:
+        """
+        :return: the skills the given item grants to whoever holds it
+        """
+        return tuple(self.skills.get(skill_id) for skill_id in self._item_effects.get(item.pk, ()))
+
+    def promotes_to(self, unit_class: Class) -> Tuple[Class, ...]:
+        """
+        :return: the classes related to the given one by promotion (as Class.promotes_to)
+        """
+        return tuple(self.classes.get(class_id) for class_id in self._promotes_to.get(unit_class.pk, ()))
+
+    def base_classes(self, unit: Unit) -> Tuple[Class, ...]:
+        """
+        :return: the classes the given unit can start out in
+        """
+        return tuple(self.classes.get(class_id) for class_id in self._base_classes.get(unit.pk, ()))
+
+    def ranked_support_partners(self, unit: Unit) -> FrozenSet[int]:
+        """
+        :return: ids of the units that the given unit can build a ranked support with
+        """
+        return self._ranked_support_partners.get(unit.pk, frozenset())
+
+    def weapon_prf_users(self, weapon: Weapon) -> FrozenSet[int]:
+        """
+        :return: ids of the units the given weapon is a Prf weapon of, if any
+        """
+        return self._weapon_prf_users.get(weapon.pk, frozenset())
+
+    def item_prf_users(self, item: Item) -> FrozenSet[int]:
+        """
+        :return: ids of the units the given item is a Prf item of, if any
+        """
+        return self._item_prf_users.get(item.pk, frozenset())
+
+    def weapon_rank_at(self, game: FireEmblemGame, points: int) -> Optional[str]:
+        """
+        :param game: the game whose weapon rank requirements to use
+        :param points: a number of weapon rank points
+        :return: the highest weapon rank whose requirement the points meet; if they don't meet any,
+            the rank with the highest requirement. None if the game has no requirements.
+        """
+        rank_points = self._rank_points.get(game.pk)
+        if not rank_points:
+            return None
+        return self._rank_names[game.pk][bisect.bisect_right(rank_points, points) - 1]
+
+    def points_required(self, game: FireEmblemGame, weapon_rank: str) -> Optional[int]:
+        """
+        :return: how many points the given game requires for the given weapon rank, or None if it doesn't say
+        """
+        for rank_name, points in zip(self._rank_names.get(game.pk, ()), self._rank_points.get(game.pk, ())):
+            if rank_name == weapon_rank:
+                return points
+        return None
+
+    def triangle_bonus(self, game: FireEmblemGame, weapon_rank: str) -> Optional[WeaponTriangleBonus]:
+        """
+        :return: the weapon triangle bonus the given game gives at the given weapon rank, if any
+        """
+        return self._triangle_bonuses.get((game.pk, weapon_rank))
+
+    def rank_bonus(self, game: FireEmblemGame, weapon_type: str, weapon_rank: str) -> Optional[WeaponRankBonus]:
+        """
+        :return: the bonus the given game gives for the given rank in the given weapon type, if any
+        """
+        return self._rank_bonuses.get((game.pk, weapon_type, weapon_rank))
+
+    def promotion_bonus(self, from_class: Class, to_class: Class) -> Optional[PromotionBonus]:
+        """
+        :return: the bonuses for promoting from one class into the other, if there are any
+        """
+        return self._promotion_bonuses.get((from_class.pk, to_class.pk))
+
+    def extra_skills(self, unit_class: Class) -> Tuple[ExtraSkill, ...]:
+        """
+        :return: the skills that can be learned in the given class, in order of the level they're learned at
+        """
+        return self._extra_skills.get(unit_class.pk, ())
+
+    def support_templates(self, unit: Unit) -> Tuple[RankedSupportTemplate, ...]:
+        """
+        :return: the ranked supports the given unit can be supported by
+        """
+        return self._support_templates.get(unit.pk, ())
+
+    def support_template(self, unit: Unit, supported_by: Unit) -> Optional[RankedSupportTemplate]:
+        """
+        :return: the ranked support between the given units, if they can have one
+        """
+        return next((template for template in self.support_templates(unit)
+                     if template.supported_by_id == supported_by.pk), None)
+
+
+_catalog: Optional[CoreCatalog] = None
+_catalog_lock = threading.Lock()
+# how many times the core data has been changed from within this process
+_changes = 0
+_reload_callbacks: List[Callable[[], None]] = []
+
+
+def core_version() -> Tuple:
+    """
+    :return: the current version of the core data
+    """
+    return settings.CORE_DATA_VERSION, _changes
+
+
+def core_catalog() -> CoreCatalog:
+    """
+    :return: the catalog of the current version of the core data, loading it if it hasn't been yet
+    """
+    global _catalog
+    version = core_version()
+    catalog = _catalog
+    if catalog is None or catalog.version != version:
+        with _catalog_lock:
+            catalog = _catalog
+            if catalog is None or catalog.version != version:
+                reloading = catalog is not None
+                catalog = _catalog = CoreCatalog(version)
+                logging.debug(f"Loaded core data catalog, version {version}")
+                if reloading:
+                    for callback in _reload_callbacks:
+                        callback()
+    return catalog
+
+
+def on_reload(callback: Callable[[], None]):
+    """
+    Registers something to call whenever the catalog is replaced by a new version, e.g. to drop
+    anything that was worked out from the old one
+    """
+    _reload_callbacks.append(callback)
+
+
+def forget_catalog():
+    """
+    Makes the next call to core_catalog() load the core data again
+    """
+    global _changes
+    _changes += 1
+
+
+def _core_data_changed(**kwargs):
+    # the catalog may be reloaded in the middle of a change, from data that isn't committed yet,
+    # so it's reloaded again once the change commits
+    forget_catalog()
+    transaction.on_commit(forget_catalog, using=kwargs.get('using'))
+
+
+for _model in CORE_MODELS:
+    post_save.connect(_core_data_changed, sender=_model, dispatch_uid=f'catalog.{_model.__name__}.save')
+    post_delete.connect(_core_data_changed, sender=_model, dispatch_uid=f'catalog.{_model.__name__}.delete')
+    for _field in _model._meta.local_many_to_many:
+        m2m_changed.connect(_core_data_changed, sender=_field.remote_field.through,
+                            dispatch_uid=f'catalog.{_model.__name__}.{_field.name}')
+
+
+__all__ = ['CatalogTable', 'CoreCatalog', 'CORE_MODELS', 'core_version', 'core_catalog', 'on_reload',
+           'forget_catalog']
@@ -1,9 +1,10 @@
 from typing import Dict, Callable, Union
-from ...models.core.Skill import Skill
 from ...models.play.SkillData import SkillData
 from ...models.play.ActiveArena import ActiveArena
 from ..calc.combat_data import AfterAttackData
 from ..calc import stats
+from .index import invalidate_skill_index
+from ..catalog import core_catalog
 
 
 def _(_: ActiveArena, __: AfterAttackData) -> None:
@@ -16,9 +17,10 @@ def fe7_poison_on_hit(arena: ActiveArena, aad: AfterAttackData) -> Union[Dict, N
     If this triggers, returns the appropriate activate_skill subschema instance
     """
     if not aad.miss:
-        fe7_poisoned_skill = Skill.objects.get(id=701)  # TODO change after deciding skill id
+        fe7_poisoned_skill = core_catalog().skills.get(701)  # TODO change after deciding skill id
         if fe7_poisoned_skill not in aad.against.temp_skills.all():
-            aad.against.temp_skills.add(Skill.objects.get(id=701))
+            aad.against.temp_skills.add(fe7_poisoned_skill)
+            invalidate_skill_index(aad.against)
             SkillData.objects.add(arena=arena, unit=aad.against, skill=fe7_poisoned_skill, data_int1=5)
         else:
             skill_data = SkillData.objects.get(arena=arena, unit=aad.against, skill=fe7_poisoned_skill)
@@ -3,8 +3,8 @@ from ...models.play.ActiveUnit import ActiveUnit
 from ...models.play.ActiveArena import ActiveArena
 from ...models.play.SkillData import SkillData
 from ...models.core.Skill import Skill
-from ...models.core.Weapon import Weapon
 from ..calc.combat import CombatData
+from ..catalog import core_catalog
 
 
 def _(___: ActiveUnit, _: ActiveArena, __: CombatData) -> None:
@@ -19,13 +19,13 @@ def fe7_light_brand(unit: ActiveUnit, arena: ActiveArena, combat: CombatData):
     """
     Replaces the unit's Mag modifier and weapon template with their original values
     """
-    skill: Skill = Skill.objects.get(id=709)
+    skill: Skill = core_catalog().skills.get(709)
     skill_data: SkillData = SkillData.objects.get(arena=arena, unit=unit, skill=skill)
     unit.mod_mag = skill_data.data_int2
     if combat.attacker == unit:
-        combat.attacker_weapon.template = Weapon.objects.get(id=skill_data.data_int1)
+        combat.attacker_weapon.template = core_catalog().weapons.get(skill_data.data_int1)
     elif combat.defender == unit:
-        combat.defender_weapon.template = Weapon.objects.get(id=skill_data.data_int1)
+        combat.defender_weapon.template = core_catalog().weapons.get(skill_data.data_int1)
     skill_data.delete()
 
 
@@ -33,13 +33,13 @@ def fe7_wind_edge(unit: ActiveUnit, arena: ActiveArena, combat: CombatData):
     """
     Replaces the unit's Mag modifier and weapon template with their original values
     """
-    skill: Skill = Skill.objects.get(id=710)
+    skill: Skill = core_catalog().skills.get(710)
     skill_data: SkillData = SkillData.objects.get(arena=arena, unit=unit, skill=skill)
     unit.mod_mag = skill_data.data_int2
     if combat.attacker == unit:
-        combat.attacker_weapon.template = Weapon.objects.get(id=skill_data.data_int1)
+        combat.attacker_weapon.template = core_catalog().weapons.get(skill_data.data_int1)
     elif combat.defender == unit:
-        combat.defender_weapon.template = Weapon.objects.get(id=skill_data.data_int1)
+        combat.defender_weapon.template = core_catalog().weapons.get(skill_data.data_int1)
     skill_data.delete()
 
 
@@ -47,13 +47,13 @@ def fe7_runesword(unit: ActiveUnit, arena: ActiveArena, combat: CombatData):
     """
     Replaces the unit's Mag modifier with its initial value.
     """
-    skill: Skill = Skill.objects.get(id=711)
+    skill: Skill = core_catalog().skills.get(711)
     skill_data: SkillData = SkillData.objects.get(arena=arena, unit=unit, skill=skill)
     unit.mod_mag = skill_data.data_int2
     if combat.attacker == unit:
-        combat.attacker_weapon.template = Weapon.objects.get(id=skill_data.data_int1)
+        combat.attacker_weapon.template = core_catalog().weapons.get(skill_data.data_int1)
     elif combat.defender == unit:
-        combat.defender_weapon.template = Weapon.objects.get(id=skill_data.data_int1)
+        combat.defender_weapon.template = core_catalog().weapons.get(skill_data.data_int1)
     skill_data.delete()
 
 
@@ -1,5 +1,4 @@
 from typing import Dict, Callable, Union
-import random
 from ..calc.combat_data import AttackData
 from ..calc import stats
 
@@ -17,8 +16,8 @@ def fe7_silencer(atk: AttackData) -> None:
     would activate, sets them both to 100%
     """
     if atk.skillable:
-        avg_roll = (random.randint(0, 99) + random.randint(0, 99)) // 2
-        if avg_roll < atk.hit - atk.avo and random.randint(0, 99) < (atk.crit - atk.ddg) / 2:
+        avg_roll = (atk.rng.randint(0, 99) + atk.rng.randint(0, 99)) // 2
+        if avg_roll < atk.hit - atk.avo and atk.rng.randint(0, 99) < (atk.crit - atk.ddg) / 2:
             # silencer activates
             atk.dmg = atk.against.current_hp
             atk.hit = 999
@@ -36,7 +35,7 @@ def fe7_devil(atk: AttackData) -> None:
     Also, does not return any particular message.
     """
     luk = stats.calc_luk(atk.by)
-    if random.randint(0, 99) < (31 - luk):
+    if atk.rng.randint(0, 99) < (31 - luk):
         atk.against = atk.by
     return None
 
@@ -60,7 +59,8 @@ def brave(atk: AttackData) -> None:
             skillable=atk.skillable,
             counterattack=atk.counterattack,
             followup=atk.followup,
-            tags=["brave"] + atk.tags[:]
+            tags=["brave"] + atk.tags[:],
+            rng=atk.rng
         ))
 
 
@@ -1,11 +1,10 @@
 from typing import Dict, Callable, Union
-from ...models.core.Weapon import Weapon
-from ...models.core.Skill import Skill
 from ...models.play.ActiveUnit import ActiveUnit
 from ...models.play.ActiveArena import ActiveArena
 from ...models.play.SkillData import SkillData
 from ..calc.combat import CombatData
 from ..calc import stats, battle_stats, weapons
+from ..catalog import core_catalog
 
 
 def _(___: ActiveUnit, _: ActiveArena, __: CombatData) -> None:
@@ -297,8 +296,8 @@ def fe7_light_brand(unit: ActiveUnit, arena: ActiveArena, combat: CombatData) ->
     Will reset these properties at the end of combat.
     """
     if combat.range > 1:
-        light_brand = Weapon.objects.get(id=714)
-        light_brand_skill = Skill.objects.get(id=709)
+        light_brand = core_catalog().weapons.get(714)
+        light_brand_skill = core_catalog().skills.get(709)
         if combat.attacker == unit:
             # save information about unit's prior state
             prev_weapon_id = combat.attacker_weapon.template.id
@@ -341,8 +340,8 @@ def fe7_wind_edge(unit: ActiveUnit, arena: ActiveArena, combat: CombatData) -> N
     Will reset these properties at the end of combat.
     """
     if combat.range > 1:
-        wind_edge = Weapon.objects.get(id=718)
-        wind_edge_skill = Skill.objects.get(id=710)
+        wind_edge = core_catalog().weapons.get(718)
+        wind_edge_skill = core_catalog().skills.get(710)
         if combat.attacker == unit:
             # save information about unit's prior state
             prev_weapon_id = combat.attacker_weapon.template.id
@@ -384,8 +383,8 @@ def fe7_runesword(unit: ActiveUnit, arena: ActiveArena, combat: CombatData) -> N
     In FE7 and FE8, the Runesword is always magical, so no weapon-swap necessary.
     Will reset the user's magic modifier at the end of combat.
     """
-    runesword = Weapon.objects.get(id=722)
-    runesword_skill = Skill.objects.get(id=711)
+    runesword = core_catalog().weapons.get(722)
+    runesword_skill = core_catalog().skills.get(711)
     if combat.attacker == unit:
         # save information about unit's prior state
         prev_weapon_id = combat.attacker_weapon.template.id
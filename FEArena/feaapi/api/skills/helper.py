@@ -11,6 +11,7 @@ from ...models.play.ActiveItem import ActiveItem
 from ...models.build.BuiltUnit import BuiltUnit
 from ..calc.combat_data import AttackData, AfterAttackData
 from ..calc.combat import CombatData
+from ..catalog import core_catalog
 from .passive import passive
 from .dequip import dequip
 from .equip import equip
@@ -25,6 +26,8 @@ from .turn_start import turn_start
 from .turn_end import turn_end
 from .unit_turn_end import unit_turn_end
 from .on_build import on_build
+from .index import SkillIndex, skill_index, invalidate_skill_index
+from ...profiling import profiled
 
 
 def _interleave_by_priority(skill_getter1: Callable[[Skill], Callable],
@@ -93,33 +96,35 @@ def accumulate(
     :param extra: an iterable containing extra skills (probably from a BuiltUnit)
     :return: a generator that yields skills one at a time from all given sources
     """
+    catalog = core_catalog()
     # personal, class, and extra skills
     if personal:
-        yield from personal.personal_skills.all()
+        yield from catalog.personal_skills(personal)
     if unit_class:
-        yield from unit_class.class_skills.all()
+        yield from catalog.class_skills(unit_class)
     if extra:
         yield from extra
     # weapons and active weapons
     if weapons:
         for weapon in weapons:
-            yield from weapon.weapon_effects.all()
+            yield from catalog.weapon_effects(weapon)
     if active_weapons:
         for active_weapon in active_weapons:
-            yield from active_weapon.template.weapon_effects.all()
+            yield from catalog.weapon_effects(catalog.weapons.get(active_weapon.template_id))
     # items and active items
     if items:
         for item in items:
-            yield from item.item_effects.all()
+            yield from catalog.item_effects(item)
     if active_items:
         for active_item in active_items:
-            yield from active_item.template.item_effects.all()
+            yield from catalog.item_effects(catalog.items.get(active_item.template_id))
 
 
 def _exists(obj: any) -> bool:
     return bool(obj)
 
 
+@profiled('skill.passive')
 def passive_all(skills: Iterable[Skill], unit: ActiveUnit) -> None:
     """
     Executes the passive_effect for all the given skills, if such exists. Passive skills
@@ -131,6 +136,7 @@ def passive_all(skills: Iterable[Skill], unit: ActiveUnit) -> None:
         passive[s.passive_effect](unit)
 
 
+@profiled('skill.dequip')
 def dequip_all(skills: Iterable[Skill], unit: ActiveUnit) -> List[Dict]:
     """
     Executes the on_dequip_effect for all the given skills, if such exists, returning a list of their
@@ -142,6 +148,7 @@ def dequip_all(skills: Iterable[Skill], unit: ActiveUnit) -> List[Dict]:
     return list(filter(_exists, (dequip[s.on_dequip_effect](unit) for s in skills)))
 
 
+@profiled('skill.equip')
 def equip_all(skills: Iterable[Skill], unit: ActiveUnit) -> List[Dict]:
     """
     Executes the on_equip_effect for all the given skills, if such exists, returning a list of their
@@ -153,6 +160,7 @@ def equip_all(skills: Iterable[Skill], unit: ActiveUnit) -> List[Dict]:
     return list(filter(_exists, (equip[s.on_equip_effect](unit) for s in skills)))
 
 
+@profiled('skill.use')
 def use_all(skills: Iterable[Skill], arena: ActiveArena, unit: ActiveUnit,
             target: Optional[ActiveUnit], extra_data: Optional[str]) -> List[Dict]:
     """
@@ -168,6 +176,7 @@ def use_all(skills: Iterable[Skill], arena: ActiveArena, unit: ActiveUnit,
     return list(filter(_exists, (use[s.on_use_effect](arena, unit, target, extra_data) for s in skills)))
 
 
+@profiled('skill.before_attack')
 def before_attack_all(skills: Iterable[Skill], data: AttackData) -> List[Dict]:
     """
     Executes the before_attack_effect for all the given skills, if such exists, returning a list
@@ -179,6 +188,7 @@ def before_attack_all(skills: Iterable[Skill], data: AttackData) -> List[Dict]:
     return list(filter(_exists, (before_attack[s.before_attack_effect](data) for s in skills)))
 
 
+@profiled('skill.before_attacked')
 def before_attacked_all(skills: Iterable[Skill], data: AttackData) -> List[Dict]:
     """
     Executes the before_attacked_effect for all the given skills, if such exists, returning a list
@@ -190,6 +200,7 @@ def before_attacked_all(skills: Iterable[Skill], data: AttackData) -> List[Dict]
     return list(filter(_exists, (before_attacked[s.before_attacked_effect](data) for s in skills)))
 
 
+@profiled('skill.before_attack')
 def before_attack_with_priority(attacker: Iterable[Skill], attacked: Iterable[Skill], data: AttackData) -> List[Dict]:
     """
     Executes the before_attack_effect or before_attacked_effect, respectively
@@ -204,6 +215,7 @@ def before_attack_with_priority(attacker: Iterable[Skill], attacked: Iterable[Sk
                                    attacked, [data])
 
 
+@profiled('skill.after_attack')
 def after_attack_all(skills: Iterable[Skill], arena: ActiveArena, data: AfterAttackData) -> List[Dict]:
     """
     Executes the after_attack_effect for all the given skills, if such exists, returning a list
@@ -216,6 +228,7 @@ def after_attack_all(skills: Iterable[Skill], arena: ActiveArena, data: AfterAtt
     return list(filter(_exists, (after_attack[s.after_attack_effect](arena, data) for s in skills)))
 
 
+@profiled('skill.after_attacked')
 def after_attacked_all(skills: Iterable[Skill], data: AfterAttackData) -> List[Dict]:
     """
     Executes the after_attacked_effect for all the given skills, if such exists, returning a list
@@ -227,6 +240,7 @@ def after_attacked_all(skills: Iterable[Skill], data: AfterAttackData) -> List[D
     return list(filter(_exists, (after_attacked[s.after_attacked_effect](data) for s in skills)))
 
 
+@profiled('skill.before_combat')
 def before_combat_all(skills: Iterable[Skill], unit: ActiveUnit, arena: ActiveArena, data: CombatData) -> List[Dict]:
     """
     Executes the before_combat_effect for all the given skills, if such exists, returning a list
@@ -240,6 +254,7 @@ def before_combat_all(skills: Iterable[Skill], unit: ActiveUnit, arena: ActiveAr
     return list(filter(_exists, (before_combat[s.before_combat_effect](unit, arena, data) for s in skills)))
 
 
+@profiled('skill.before_combat')
 def before_combat_with_priority(skills1: Iterable[Skill], unit1: ActiveUnit,
                                 skills2: Iterable[Skill], unit2: ActiveUnit,
                                 arena: ActiveArena, data: CombatData) -> List[Dict]:
@@ -260,6 +275,7 @@ def before_combat_with_priority(skills1: Iterable[Skill], unit1: ActiveUnit,
                                    skills2, [unit2, arena, data])
 
 
+@profiled('skill.after_combat')
 def after_combat_all(skills: Iterable[Skill], unit: ActiveUnit, arena: ActiveArena, data: CombatData) -> List[Dict]:
     """
     Executes the after_combat_effect for all the given skills, if such exists, returning a list
@@ -273,6 +289,7 @@ def after_combat_all(skills: Iterable[Skill], unit: ActiveUnit, arena: ActiveAre
     return list(filter(_exists, (after_combat[s.after_combat_effect](unit, arena, data) for s in skills)))
 
 
+@profiled('skill.after_combat')
 def after_combat_with_priority(skills1: Iterable[Skill], unit1: ActiveUnit,
                                skills2: Iterable[Skill], unit2: ActiveUnit,
                                arena: ActiveArena, data: CombatData) -> List[Dict]:
@@ -293,6 +310,7 @@ def after_combat_with_priority(skills1: Iterable[Skill], unit1: ActiveUnit,
                                    skills2, [unit2, arena, data])
 
 
+@profiled('skill.turn_start')
 def turn_start_all(skills: Iterable[Skill], unit: ActiveUnit, arena: ActiveArena) -> List[Dict]:
     """
     Executes the turn_start_effect for all given skills, if such exists, returning a
@@ -305,6 +323,7 @@ def turn_start_all(skills: Iterable[Skill], unit: ActiveUnit, arena: ActiveArena
     return list(filter(_exists, (turn_start[s.turn_start_effect](arena, unit) for s in skills)))
 
 
+@profiled('skill.turn_end')
 def turn_end_all(skills: Iterable[Skill], unit: ActiveUnit, arena: ActiveArena) -> List[Dict]:
     """
     Executes the turn_end_effect for all given skills, if such exists, returning a
@@ -317,6 +336,7 @@ def turn_end_all(skills: Iterable[Skill], unit: ActiveUnit, arena: ActiveArena)
     return list(filter(_exists, (turn_end[s.turn_end_effect](arena, unit) for s in skills)))
 
 
+@profiled('skill.unit_turn_end')
 def unit_turn_end_all(skills: Iterable[Skill], unit: ActiveUnit, arena: ActiveArena, actions: List[Dict]) -> List[Dict]:
     """
     Executes the unit_turn_end_effect for all given skills, if such exists, returning a
@@ -330,6 +350,7 @@ def unit_turn_end_all(skills: Iterable[Skill], unit: ActiveUnit, arena: ActiveAr
     return list(filter(_exists, (unit_turn_end[s.unit_turn_end_effect](arena, unit, actions) for s in skills)))
 
 
+@profiled('skill.on_build')
 def on_build_all(skills: Iterable[Skill], unit: BuiltUnit, av_skills: Set[Skill]):
     """
     Executes the build effect for all given skills, if such exists. Does not return anything, because
@@ -342,7 +363,8 @@ def on_build_all(skills: Iterable[Skill], unit: BuiltUnit, av_skills: Set[Skill]
     return list(filter(_exists, (on_build[s.build_effect](unit, av_skills) for s in skills)))
 
 
-__all__ = ['accumulate', 'passive_all', 'dequip_all', 'equip_all', 'use_all', 'before_attack_all', 'after_attack_all',
+__all__ = ['accumulate', 'SkillIndex', 'skill_index', 'invalidate_skill_index',
+           'passive_all', 'dequip_all', 'equip_all', 'use_all', 'before_attack_all', 'after_attack_all',
            'before_attacked_all', 'after_attacked_all', 'before_combat_all', 'after_combat_all',
            'turn_start_all', 'turn_end_all', 'unit_turn_end_all', 'on_build_all',
            'before_attack_with_priority', 'before_combat_with_priority', 'after_combat_with_priority']
@@ -0,0 +1,116 @@
+"""
+file: index.py
+
+Caches the skills available to each ActiveUnit, already split up by hook, so that the
+hook runners in helper.py don't have to re-query every skill source each time they run.
+Kept apart from helper.py so that the individual skill implementations can invalidate
+the cache without a circular import.
+"""
+from typing import Iterable, Dict, Optional, Tuple
+from ...models.core.Skill import Skill
+from ...models.play.ActiveUnit import ActiveUnit
+from ...models.play.ActiveWeapon import ActiveWeapon
+from ..catalog import core_catalog
+
+
+# the Skill field holding the effect name for each hook that a SkillIndex can be split by
+_hook_fields: Dict[str, str] = {
+    'passive': 'passive_effect',
+    'before_combat': 'before_combat_effect',
+    'after_combat': 'after_combat_effect',
+    'before_attack': 'before_attack_effect',
+    'after_attack': 'after_attack_effect',
+    'before_attacked': 'before_attacked_effect',
+    'after_attacked': 'after_attacked_effect',
+    'turn_start': 'turn_start_effect',
+    'unit_turn_end': 'unit_turn_end_effect',
+    'turn_end': 'turn_end_effect',
+    'use': 'on_use_effect',
+    'equip': 'on_equip_effect',
+    'dequip': 'on_dequip_effect',
+}
+
+
+class SkillIndex:
+    """
+    Every skill available to an ActiveUnit, loaded once and then split up by hook, so that
+    running a hook only has to walk a precomputed tuple instead of re-querying each of the
+    unit's skill sources. Build one with skill_index(), and throw it away with
+    invalidate_skill_index() whenever the unit's weapons, items, or temporary skills change.
+    """
+
+    def __init__(self, unit: ActiveUnit):
+        template = unit.template
+        catalog = core_catalog()
+        # personal, class, extra, and temporary skills
+        self.innate: Tuple[Skill, ...] = (
+            *catalog.personal_skills(template.unit),
+            *catalog.class_skills(template.unit_class),
+            *template.extra_skills.all(),
+            *unit.temp_skills.all(),
+        )
+        self.weapons: Dict[int, Tuple[Skill, ...]] = {
+            weapon.id: catalog.weapon_effects(catalog.weapons.get(weapon.template_id))
+            for weapon in unit.weapons.all()
+        }
+        self.items: Tuple[Skill, ...] = tuple(
+            s for item in unit.items.all()
+            for s in catalog.item_effects(catalog.items.get(item.template_id))
+        )
+        self._by_hook: Dict[Tuple[str, Optional[Tuple[int, ...]]], Tuple[Skill, ...]] = {}
+
+    def weapon_skills(self, weapon: ActiveWeapon) -> Tuple[Skill, ...]:
+        """
+        :param weapon: an ActiveWeapon, normally one held by the unit
+        :return: the skills the given weapon grants to whoever wields it
+        """
+        if weapon.id not in self.weapons:
+            catalog = core_catalog()
+            self.weapons[weapon.id] = catalog.weapon_effects(catalog.weapons.get(weapon.template_id))
+        return self.weapons[weapon.id]
+
+    def for_hook(self, hook: str, weapons: Optional[Iterable[ActiveWeapon]] = None) -> Tuple[Skill, ...]:
+        """
+        Returns the skills that have an effect for the given hook, sorted by priority
+        (highest first). Skills with no effect for the hook are left out entirely.
+        :param hook: name of the hook, e.g. 'before_attack' or 'turn_start'
+        :param weapons: the weapons whose skills should count, e.g. only the one being fought with.
+            If not given, the skills from every weapon the unit is holding count.
+        :return: a tuple of skills, ready to pass to the matching *_all function
+        """
+        weapon_ids = None if weapons is None else tuple(w.id for w in weapons if w)
+        key = (hook, weapon_ids)
+        if key not in self._by_hook:
+            field = _hook_fields[hook]
+            if weapons is None:
+                weapon_skills = [s for skill_list in self.weapons.values() for s in skill_list]
+            else:
+                weapon_skills = [s for w in weapons if w for s in self.weapon_skills(w)]
+            self._by_hook[key] = tuple(sorted(
+                (s for s in (*self.innate, *weapon_skills, *self.items) if getattr(s, field)),
+                key=lambda skl: -skl.priority
+            ))
+        return self._by_hook[key]
+
+
+def skill_index(unit: ActiveUnit) -> SkillIndex:
+    """
+    Returns the SkillIndex cached on the given unit, building it first if necessary.
+    :param unit: the unit whose skills to index
+    :return: the unit's SkillIndex
+    """
+    index = getattr(unit, '_skill_index', None)
+    if index is None:
+        index = SkillIndex(unit)
+        unit._skill_index = index
+    return index
+
+
+def invalidate_skill_index(unit: ActiveUnit) -> None:
+    """
+    Discards the SkillIndex cached on the given unit, if there is one, so that the next call
+    to skill_index() rebuilds it. This must be called whenever a weapon or item is equipped,
+    discarded, or broken, or a temporary skill is added to or removed from the unit.
+    :param unit: the unit whose skills have changed
+    """
+    unit.__dict__.pop('_skill_index', None)
@@ -1,6 +1,7 @@
 from typing import Dict, Callable, Union
-from ...models.core.Skill import Skill
 from ...models.play.ActiveUnit import ActiveUnit
+from .index import invalidate_skill_index
+from ..catalog import core_catalog
 
 
 def _(_: ActiveUnit) -> None:
@@ -12,8 +13,9 @@ def fe7_delphi_shield(unit: ActiveUnit) -> None:
     Gives the unit the temporary skill with ID 1, which should prevent effective-against-flying
     weapons from dealing effective damage
     """
-    anti_flying_weakness = Skill.objects.get(id=1)
+    anti_flying_weakness = core_catalog().skills.get(1)
     unit.temp_skills.add(anti_flying_weakness)
+    invalidate_skill_index(unit)
 
 
 # Passive skills are invoked at unit-creation-time, and do not return any summaries
@@ -1,8 +1,8 @@
 from typing import Dict, Callable, Union
-import random
 from ...models.play.ActiveArena import ActiveArena
 from ...models.play.ActiveUnit import ActiveUnit
 from ...models.play.SkillData import SkillData
+from .index import invalidate_skill_index
 
 
 def _(_: ActiveArena, __: ActiveUnit) -> None:
@@ -16,12 +16,13 @@ def fe7_poisoned(arena: ActiveArena, unit: ActiveUnit) -> Union[Dict, None]:
     """
     fe7_poisoned_skill = unit.temp_skills.get(id=701)  # TODO change when I know fe7_poisoned's ID
     skill_data: SkillData = SkillData.objects.get(arena=arena, unit=unit, skill=fe7_poisoned_skill)
-    hp_to_deduct = random.randint(1, 5)
+    hp_to_deduct = arena.rng.randint(1, 5)
     skill_data.data_int1 -= 1
     if skill_data.data_int1 <= 0:
         # remove skill and delete skill data
         skill_data.delete()
         unit.temp_skills.remove(skill_data)
+        invalidate_skill_index(unit)
     else:
         unit.current_hp -= hp_to_deduct
         skill_data.save()
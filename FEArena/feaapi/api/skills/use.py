@@ -4,6 +4,7 @@ from ...models.play.ActiveArena import ActiveArena
 from ...models.play.ActiveItem import ActiveItem
 from ..calc import stats
 from ..arena.helper import remove_item_from_inventory
+from ..arena.identity import ArenaIndex
 
 
 def _(_: ActiveArena, __: ActiveUnit) -> None:
@@ -36,17 +37,18 @@ def fe7_steal(arena: ActiveArena, unit: ActiveUnit, target: ActiveUnit, item: st
         item_id = int(item)
     except ValueError:
         raise ValueError("The extra_data provided was not an integer")
-    if target.items.filter(id=item_id).count() == 0:
+    index = ArenaIndex.of(arena)
+    target_item: Optional[ActiveItem] = index.items.get(item_id)
+    if target_item is None or index.holder_of_item(target_item) is not target:
         raise ValueError("Target is not holding item")
     if unit.items.count() + 1 >= arena.game.max_inventory_items:
         raise ValueError("Unit is holding too many items and cannot steal")
     new_inventory_id = max(max(w.id for w in unit.weapons.all()), max(i.id for i in unit.items.all()))
     if new_inventory_id >= arena.game.max_inventory_size:
         raise ValueError("Unit's inventory is full, so unit cannot steal")
-    target_item: ActiveItem = target.items.get(id=item_id)
-    remove_item_from_inventory(target_item, target)
+    remove_item_from_inventory(target_item, target, arena)
     target_item.inventory_id = new_inventory_id
-    unit.items.add(target_item)
+    index.add_item(unit, target_item)
     return {
         "action": "steal_item",
         "unit": unit.id,
@@ -16,18 +16,15 @@ from ...models.build.BuiltClass import BuiltClass
 from ...models.build.BuiltWeapon import BuiltWeapon
 from ...models.build.BuiltItem import BuiltItem
 from ...models.build.RankedSupport import RankedSupport
-from ...models.core.RankedSupportTemplate import RankedSupportTemplate
 from ...models.core.Unit import Unit
 from ...models.core.Class import Class
 from ...models.core.Item import Item
-from ...models.core.Weapon import Weapon
-from ...models.core.Skill import Skill
-from ...models.core.ExtraSkillAttainment import ExtraSkill
 from ...models.core.Game import FireEmblemGame, ChangeClassBehavior, PromotionBonus, SupportRank
 from .helper import *
 from . import validator, schemas
 from .. import skills
 from ..calc import ranks
+from ..catalog import core_catalog
 
 
 def build_team(user: User, instructions: Dict) -> Dict:
@@ -46,7 +43,7 @@ def build_team(user: User, instructions: Dict) -> Dict:
     except ValueError as e:
         raise ValueError("Request does not conform to the build_team_schema") from e
     try:
-        game: FireEmblemGame = FireEmblemGame.objects.get(abbrev=instructions["game"])
+        game: FireEmblemGame = core_catalog().games.get(instructions["game"])
     except ObjectDoesNotExist:
         raise ValueError(f"There's no Fire Emblem game abbreviated {instructions['game']}")
     if len(instructions["units"]) > game.team_size and instructions.get("validate", True):
@@ -66,12 +63,12 @@ def build_team(user: User, instructions: Dict) -> Dict:
             team.units.add(unit)
         validator.validate_unit_routes(instructions.get("validate", True), list(team.units.all()))
         # add default supports
+        team_unit_ids = {u.unit_id for u in team.units.all()}
         for unit in team.units.all():
-            for support_template in RankedSupportTemplate.objects.filter(
-                    unit=unit.unit,
-                    default_rank__gt=SupportRank.NONE,
-                    supported_by__in=[u.unit for u in team.units.all()]
-            ):
+            for support_template in core_catalog().support_templates(unit.unit):
+                if support_template.default_rank <= SupportRank.NONE \
+                        or support_template.supported_by_id not in team_unit_ids:
+                    continue
                 validator.validate_support(instructions.get("validate", True), game, unit,
                                            support_template.supported_by, support_template.default_rank)
                 RankedSupport.objects.create(
@@ -114,7 +111,8 @@ def build_unit(game: FireEmblemGame, instructions: Dict, validate: bool = True,
     :return: a BuiltUnit constructed from the ground up based on the instructions
     """
     # get initial unit state
-    base_unit: Unit = Unit.objects.get(id=instructions["base_unit"])
+    catalog = core_catalog()
+    base_unit: Unit = catalog.units.get(instructions["base_unit"])
     current_class: BuiltClass = BuiltClass.objects.create(template=base_unit.initial_class)
     unit: BuiltUnit = BuiltUnit.objects.create(
         nickname=instructions['nickname'],
@@ -126,7 +124,7 @@ def build_unit(game: FireEmblemGame, instructions: Dict, validate: bool = True,
         limited=apply_limits,
     )
     unit.from_instructions['id'] = unit.id
-    skills_from_class = sorted(ExtraSkill.objects.filter(unit_class=current_class.template), key=lambda s: s.level)
+    skills_from_class = catalog.extra_skills(current_class.template)
     available_extra_skills = set(sfc.skill for sfc in skills_from_class if sfc.level <= unit.unit_level)
     applicable_items: List[Item] = []  # growth-boosting items, skillbooks, etc. Statboosters have their own command.
     # don't add to class history until we switch off this class, or at the end
@@ -149,7 +147,7 @@ def build_unit(game: FireEmblemGame, instructions: Dict, validate: bool = True,
         elif mod["action"] == "build_support":
             # first get the unit in question
             try:
-                support_unit = Unit.objects.get(id=mod["with"])
+                support_unit = catalog.units.get(mod["with"])
             except ObjectDoesNotExist:
                 raise ValueError(f"Cannot support with unit {mod['with']} which does not exist")
             # validate the support relationship
@@ -168,7 +166,7 @@ def build_unit(game: FireEmblemGame, instructions: Dict, validate: bool = True,
             apply_rank_boost(game, unit, mod["weapon_type"], mod["points"], apply_limits)
         elif mod["action"] == "promote":
             try:
-                new_class: Class = Class.objects.get(id=mod["into"])
+                new_class: Class = catalog.classes.get(mod["into"])
             except ObjectDoesNotExist:
                 raise ValueError(f"Cannot promote unit into class with id {mod['into']}, because it does not exist")
             validator.validate_promotion(validate, unit, current_class.template, new_class)
@@ -180,14 +178,13 @@ def build_unit(game: FireEmblemGame, instructions: Dict, validate: bool = True,
             current_class = BuiltClass.objects.create(template=new_class)
             unit.unit_class = current_class.template
 
-            skills_from_class = sorted(ExtraSkill.objects.filter(unit_class=current_class.template),
-                                       key=lambda s: s.level)
+            skills_from_class = catalog.extra_skills(current_class.template)
             if game.promotion_behavior == ChangeClassBehavior.RESET_LEVEL:
                 unit.unit_level = 1
             available_extra_skills |= set(sfc.skill for sfc in skills_from_class if sfc.level == unit.unit_level)
         elif mod["action"] == "change_class":
             try:
-                new_class = Class.objects.get(id=mod["into"])
+                new_class = catalog.classes.get(mod["into"])
             except ObjectDoesNotExist:
                 raise ValueError(f"Cannot change unit into class with id {mod['into']}, because it does not exist")
             validator.validate_class_change(validate, game, unit, current_class.template, new_class)
@@ -196,8 +193,7 @@ def build_unit(game: FireEmblemGame, instructions: Dict, validate: bool = True,
             unit.unit_class_history.add(current_class)
             current_class = BuiltClass.objects.create(template=new_class)
             unit.unit_class = current_class.template
-            skills_from_class = sorted(ExtraSkill.objects.filter(unit_class=current_class.template),
-                                       key=lambda s: s.level)
+            skills_from_class = catalog.extra_skills(current_class.template)
             if game.class_change_behavior == ChangeClassBehavior.RESET_LEVEL:
                 unit.unit_level = 1
             # 3H skills should be given a level-learned of 0 or -1, as should Awakening's level 1 skills
@@ -205,7 +201,7 @@ def build_unit(game: FireEmblemGame, instructions: Dict, validate: bool = True,
             available_extra_skills |= set(sfc.skill for sfc in skills_from_class if sfc.level <= 0)
         elif mod["action"] == "apply_item":
             try:
-                item = Item.objects.get(id=mod["item"])
+                item = catalog.items.get(mod["item"])
             except ObjectDoesNotExist:
                 raise ValueError(f"Cannot use item with id {mod['item']} that does not exist")
             applicable_items.append(item)
@@ -219,12 +215,13 @@ def build_unit(game: FireEmblemGame, instructions: Dict, validate: bool = True,
         if equipment['kind'] == 'item':
             # mandatory validation, because ActiveItem does it too during battles
             try:
-                item = Item.objects.get(id=equipment['item'])
+                item = catalog.items.get(equipment['item'])
             except ObjectDoesNotExist:
                 raise ValueError(f"Inventory item with id {equipment['item']} does not exist")
             if equipment['equipped'] and not item.equippable:
                 raise ValueError(f"Item {item.name} is not equippable")
-            elif equipment['equipped'] and item.prf_users.all().count() > 0 and unit.unit not in item.prf_users.all():
+            elif equipment['equipped'] and catalog.item_prf_users(item) \
+                    and unit.unit_id not in catalog.item_prf_users(item):
                 raise ValueError(f"Unit {unit.unit.name} cannot equip Prf item {item.name}")
             # add item to inventory
             unit.items.add(BuiltItem.objects.create(
@@ -235,7 +232,7 @@ def build_unit(game: FireEmblemGame, instructions: Dict, validate: bool = True,
         elif equipment['kind'] == 'weapon':
             # mandatory validation because ActiveWeapon does it too during battles
             try:
-                weapon = Weapon.objects.get(id=equipment['weapon'])
+                weapon = catalog.weapons.get(equipment['weapon'])
             except ObjectDoesNotExist:
                 raise ValueError(f"Inventory weapon with id {equipment['weapon']} does not exist")
             if equipment['equipped'] and not ranks.built_unit_can_equip_weapon(game, unit, weapon):
@@ -255,7 +252,7 @@ def build_unit(game: FireEmblemGame, instructions: Dict, validate: bool = True,
     chosen_skills = []
     for skill_id in instructions["chosen_skills"]:
         try:
-            chosen_skills.append(Skill.objects.get(id=skill_id))
+            chosen_skills.append(catalog.skills.get(skill_id))
         except ObjectDoesNotExist:
             raise ValueError(f"Skill with id {skill_id} does not exist")
     validator.validate_extra_skills(validate, game, unit, available_extra_skills, chosen_skills)
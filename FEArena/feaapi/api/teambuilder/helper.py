@@ -3,15 +3,14 @@ file: teambuilder/helper.py
 
 Helper methods for teambuilding
 """
-from django.core.exceptions import ObjectDoesNotExist
 from ...models.build.BuiltUnit import BuiltUnit
 from ...models.build.BuiltTeam import BuiltTeam
 from ...models.core.Weapon import WeaponType
 from ...models.core.Class import Class
 from ...models.core.PromotionBonus import PromotionBonus
 from ...models.core.Game import FireEmblemGame
-from ...models.core.WeaponRank import WeaponRankPointRequirement
 from ..calc import ranks
+from ..catalog import core_catalog
 import logging
 
 
@@ -119,12 +118,11 @@ def set_rank_to_below_game_max(game: FireEmblemGame, unit: BuiltUnit, weapon_typ
     :return: the total number of boost points the unit now has in this rank
     """
     # get number to set it to
-    try:
-        max_points = WeaponRankPointRequirement.objects.get(game=game, weapon_rank=game.max_weapon_rank)\
-                         .points_required - 1
-    except ObjectDoesNotExist:
+    max_rank_points = core_catalog().points_required(game, game.max_weapon_rank)
+    if max_rank_points is None:
         logging.warning(f"Failed to find a point requirement for game {game.name}'s max weapon rank")
         return
+    max_points = max_rank_points - 1
     if weapon_type == WeaponType.SWORD:
         unit.boost_rank_sword = max_points
     elif weapon_type == WeaponType.LANCE:
@@ -179,9 +177,8 @@ def apply_promotion_bonuses(game: FireEmblemGame, unit: BuiltUnit, from_class: C
     :param to_class: class being promoted into
     :param apply_limits: apply limits when applying rank boost?
     """
-    try:
-        promo_bonus: PromotionBonus = PromotionBonus.objects.get(from_class=from_class, to_class=to_class)
-    except ObjectDoesNotExist:
+    promo_bonus: PromotionBonus = core_catalog().promotion_bonus(from_class, to_class)
+    if promo_bonus is None:
         return
     apply_stat_boost(unit, 'hp', promo_bonus.bonus_hp)
     apply_stat_boost(unit, 'str', promo_bonus.bonus_str)
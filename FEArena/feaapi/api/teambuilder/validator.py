@@ -15,6 +15,7 @@ from ...models.core.Unit import Unit, Affinity
 from ...models.core.Skill import Skill
 from ...models.core.Game import FireEmblemGame, ClassChangeEligibility, SkillLimit, FireEmblemGameRoute, AffinityTypes
 from ..calc import ranks
+from ..catalog import core_catalog
 
 
 def validate_unit_routes(do: bool, units: List[BuiltUnit]):
@@ -67,7 +68,7 @@ def validate_promotion(do: bool, unit: BuiltUnit, current_class: Class, new_clas
         return
     if unit.unit_level < current_class.minimum_promotion_level:
         raise ValueError(f"Level {unit.unit_level} is too low for unit to promote out of class {current_class.name}")
-    if new_class not in current_class.promotes_to.all():
+    if new_class not in core_catalog().promotes_to(current_class):
         raise ValueError(f"Unit in class {current_class.name} ({current_class.game.abbrev}) cannot promote to"
                          f" {new_class.name} ({new_class.game.abbrev}")
 
@@ -106,7 +107,7 @@ def validate_class_change(do: bool, game: FireEmblemGame, unit: BuiltUnit, curre
             raise ValueError(f"Level {unit.unit_level} is too low for unit to change class into {new_class.name}")
     # check that class is part of unit's available class set
     # (for Three Houses, every available class for the unit should be in their individual class set)
-    if new_class != unit.unit.initial_class and new_class not in promotion_tree(unit.unit.base_classes):
+    if new_class != unit.unit.initial_class and new_class not in promotion_tree(core_catalog().base_classes(unit.unit)):
         raise ValueError(f"New class {new_class.name} is not in unit {unit.unit.name}'s class set")
 
 
@@ -156,7 +157,7 @@ def validate_support(do: bool, game: FireEmblemGame, unit: BuiltUnit, supported_
     if not do:
         return
     # check that units can support each other
-    if unit.unit.can_ranked_support.filter(id=supported_by.id).count() == 0:
+    if supported_by.id not in core_catalog().ranked_support_partners(unit.unit):
         raise ValueError(f"Unit {unit.unit.name} cannot support unit {supported_by.name}")
     unit_supports = RankedSupport.objects.filter(unit=unit)
     if 0 <= game.support_rank_limit <= sum(rs.rank for rs in unit_supports) + quantity - 1:
@@ -166,9 +167,8 @@ def validate_support(do: bool, game: FireEmblemGame, unit: BuiltUnit, supported_
         if existing_support.rank >= game.max_support_rank:
             raise ValueError(f"Units {unit.unit.name} and {supported_by.name} already have the highest possible "
                              f"support rank")
-        support_template: RankedSupportTemplate = RankedSupportTemplate.objects.get(unit=unit,
-                                                                                    supported_by=supported_by)
-        if existing_support.rank >= support_template.max_rank:
+        support_template: RankedSupportTemplate = core_catalog().support_template(unit.unit, supported_by)
+        if support_template is not None and existing_support.rank >= support_template.max_rank:
             raise ValueError(f"Units {unit.unit.name} and {supported_by.name} already have the highest possible "
                              f"support rank")
     except ObjectDoesNotExist:
@@ -219,7 +219,7 @@ def promotion_tree(classes: Iterable[Class]) -> Iterator[Class]:
     i = 0
     while i < len(queue):
         yield queue[i]
-        for pc in queue[i].promotes_to.all():
+        for pc in core_catalog().promotes_to(queue[i]):
             if pc not in queue:
                 queue.append(pc)
         i += 1
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class FeaapiConfig(AppConfig):
     name = 'feaapi'
+
+    def ready(self):
+        # keeps the core data catalog up to date with changes made to the core models
+        from .api import catalog  # noqa: F401
@@ -0,0 +1,146 @@
+"""
+file: benchmark.py
+
+Management command that times the most expensive entry points of the teambuilder and the
+arena against a fresh database loaded with the FE7 fixtures, counting the SQL queries each
+makes. The report is JSON, so that runs from different commits can be diffed.
+"""
+import glob
+import json
+import os
+import platform
+import statistics
+import time
+import django
+from typing import Callable, Dict, List, Tuple
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from ...api.arena import arena as arena_api
+from ...api.calc import combat
+from ...api.calc.combat_data import CombatData
+from ...api.teambuilder import build
+from ...models.build.BuiltTeam import BuiltTeam
+from ...models.build.BuiltUnit import BuiltUnit
+from ...models.play import conversions
+from ...models.play.ActiveArena import ActiveArena
+
+BENCHMARK_FORMAT = 'FE7 Survival'
+BENCHMARK_SEED = 1
+
+
+def _unit(base_unit: int, nickname: str, weapons: List[int], level_ups: int = 5) -> Dict:
+    return {
+        "base_unit": base_unit,
+        "nickname": nickname,
+        "modifications": [{"action": "level_up"}] * level_ups,
+        "inventory": [{"kind": "weapon", "weapon": weapon, "equipped": i == 0} for i, weapon in enumerate(weapons)],
+        "chosen_skills": [],
+    }
+
+
+# two teams of three, covering infantry and cavalry, each weapon in the triangle, and ranged attacks
+BENCHMARK_TEAMS = [
+    {"name": "Benchmark A", "game": "FE7", "validate": False, "units": [
+        _unit(703, "Kent", [701, 711]), _unit(706, "Dorcas", [744]), _unit(702, "Sain", [728, 730]),
+    ]},
+    {"name": "Benchmark B", "game": "FE7", "validate": False, "units": [
+        _unit(710, "Matt", [701]), _unit(701, "Lyn", [701]), _unit(709, "Rath", [762]),
+    ]},
+]
+
+
+class Command(BaseCommand):
+    help = ("Times process_phase, CombatData, combat.execute, ActiveTeam_from_BuiltTeam and build_team "
+            "against a fresh database loaded with the FE7 fixtures, and reports wall time and SQL queries as JSON")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help="how many times to run each entry point")
+        parser.add_argument('--output', help="file to write the report to, instead of standard output")
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            call_command('loaddata', *sorted(glob.glob(os.path.join(settings.BASE_DIR, 'fixtures', 'fe7', '*.json'))),
+                         verbosity=0)
+            report = {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "repeat": options['repeat'],
+                "results": self._run(options['repeat']),
+            }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    @staticmethod
+    def _measure(repeat: int, setup: Callable[[], Tuple], target: Callable) -> Dict:
+        """
+        Runs the target the given number of times, each time on fresh arguments from setup, and
+        rolls back whatever either of them did to the database afterwards. Only the target is timed.
+        :return: wall time in milliseconds and the number of SQL queries, across every run
+        """
+        times, queries = [], []
+        for _ in range(repeat):
+            with transaction.atomic():
+                args = setup()
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    target(*args)
+                    times.append((time.perf_counter() - start) * 1000)
+                queries.append(len(captured))
+                transaction.set_rollback(True)
+        return {
+            "wall_ms": {
+                "min": min(times),
+                "median": statistics.median(times),
+                "mean": statistics.mean(times),
+            },
+            "queries": {
+                "min": min(queries),
+                "max": max(queries),
+            },
+        }
+
+    def _run(self, repeat: int) -> Dict:
+        users = [User.objects.create(username=f'benchmark{i}') for i in range(len(BENCHMARK_TEAMS))]
+        team_ids = [build.build_team(user, team)['id'] for user, team in zip(users, BENCHMARK_TEAMS)]
+        # the teams are built unvalidated, to keep the benchmark independent of the validation rules
+        BuiltUnit.objects.update(validated=True)
+        arena_id = arena_api.start_arena(BENCHMARK_FORMAT, team_ids, seed=BENCHMARK_SEED).id
+
+        def combat_setup() -> Tuple[ActiveArena, CombatData]:
+            arena = ActiveArena.objects.get(id=arena_id)
+            attacker = arena.current_team().units.order_by('id').first()
+            defender = next(team for team in arena.teams() if team != arena.current_team()).units.order_by('id').first()
+            return arena, CombatData(attacker, defender, arena, attacker.weapons.get(equipped=True).template.min_range)
+
+        def combat_data_setup() -> Tuple:
+            _, data = combat_setup()
+            return data.attacker, data.defender, data.arena, data.range
+
+        def phase_setup() -> Tuple:
+            arena, data = combat_setup()
+            return arena.current_team().template.owned_by, arena_id, {"unit": data.attacker.id, "actions": [{
+                "action": "attack",
+                "target": data.defender.id,
+                "with_weapon": data.attacker_weapon.id,
+                "range": data.range,
+            }]}
+
+        return {
+            "build_team": self._measure(repeat, lambda: (users[0], BENCHMARK_TEAMS[0]), build.build_team),
+            "ActiveTeam_from_BuiltTeam": self._measure(
+                repeat, lambda: (BuiltTeam.objects.get(id=team_ids[0]),), conversions.ActiveTeam_from_BuiltTeam),
+            "CombatData": self._measure(repeat, combat_data_setup, CombatData),
+            "combat.execute": self._measure(repeat, combat_setup, combat.execute),
+            "process_phase": self._measure(repeat, phase_setup, arena_api.process_phase),
+        }
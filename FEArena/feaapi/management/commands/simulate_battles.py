@@ -0,0 +1,70 @@
+"""
+file: simulate_battles.py
+
+Management command that plays out many battles between the given teams and reports how
+they went, e.g. to check a format's balance. See api.arena.simulate for how battles are played.
+"""
+import json
+import os
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from ...api.arena import simulate
+from ...api.arena.arena import start_arena
+from ...api.teambuilder import build
+
+
+class Command(BaseCommand):
+    help = ("Plays out many battles between two to four teams, each given as a BuiltTeam id or as a file "
+            "of teambuilder JSON, and reports win rates, average turns and average damage per unit")
+
+    def add_arguments(self, parser):
+        parser.add_argument('teams', nargs='+', help="BuiltTeam ids, or paths to teambuilder JSON files")
+        parser.add_argument('--format', required=True, help="name of the GameFormat to battle under")
+        parser.add_argument('--battles', type=int, default=1000, help="how many battles to play")
+        parser.add_argument('--seed', type=int, default=0, help="seed for the simulation's random numbers")
+        parser.add_argument('--max-turns', type=int, default=simulate.DEFAULT_MAX_TURNS,
+                            help="turns after which a battle counts as a draw")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="how many processes to play battles in")
+        parser.add_argument('--json', action='store_true', help="print the report as JSON")
+
+    def handle(self, *args, **options):
+        # the arena (and any teams built from JSON) only exist long enough to be read into a plan
+        try:
+            with transaction.atomic():
+                team_ids = [self._team_id(team) for team in options['teams']]
+                arena = start_arena(options['format'], team_ids, seed=options['seed'])
+                plan = simulate.load_plan(arena)
+                transaction.set_rollback(True)
+            tally = simulate.simulate(plan, options['battles'], options['seed'],
+                                      max_turns=options['max_turns'], workers=options['workers'])
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+        report = tally.to_dict(plan)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(f"{report['battles']} battles, average {report['average_turns']:.2f} turns, "
+                          f"{report['draw_rate']:.1%} drawn")
+        for team in report['teams']:
+            self.stdout.write(f"{team['team']}: {team['win_rate']:.1%} won")
+            for unit in team['units']:
+                self.stdout.write(f"    {unit['name']}: {unit['average_damage_dealt']:.2f} dealt, "
+                                  f"{unit['average_damage_taken']:.2f} taken, {unit['survival_rate']:.1%} survived")
+
+    @staticmethod
+    def _team_id(team: str) -> int:
+        """
+        :param team: a BuiltTeam id, or the path to a file of instructions for the teambuilder
+        :return: the id of the BuiltTeam, building it first if need be
+        """
+        if team.isdigit():
+            return int(team)
+        try:
+            with open(team) as instructions_file:
+                instructions = json.load(instructions_file)
+        except (OSError, json.JSONDecodeError) as e:
+            raise ValueError(f"Could not read teambuilder instructions from '{team}'") from e
+        user, _ = User.objects.get_or_create(username='simulate_battles')
+        return build.build_team(user, instructions)['id']
@@ -0,0 +1,43 @@
+"""
+file: middleware.py
+
+Middleware for the FEArena API
+"""
+import json
+import logging
+import random
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from . import profiling
+
+logger = logging.getLogger('feaapi.profiling')
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a random sample of requests (see feaapi.profiling), and logs each profile as a
+    line of JSON to the 'feaapi.profiling' logger; at WARNING level if the request was slow,
+    otherwise at INFO. Configured by these settings:
+        PROFILING_SAMPLE_RATE: fraction of requests to profile, from 0 (none, the default) to 1 (all)
+        PROFILING_SLOW_REQUEST_MS: how long a request can take before it counts as slow
+        PROFILING_SERVER_TIMING: whether to also report the profile in a Server-Timing header
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        self.slow_request_ms = getattr(settings, 'PROFILING_SLOW_REQUEST_MS', 1000)
+        self.server_timing = getattr(settings, 'PROFILING_SERVER_TIMING', False)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return self.get_response(request)
+        with profiling.profile(f"{request.method} {request.path}") as prof:
+            response = self.get_response(request)
+        record = prof.to_dict()
+        record["status"] = response.status_code
+        level = logging.WARNING if prof.total_ms >= self.slow_request_ms else logging.INFO
+        logger.log(level, json.dumps(record))
+        if self.server_timing:
+            response['Server-Timing'] = prof.server_timing()
+        return response
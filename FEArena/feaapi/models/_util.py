@@ -1,3 +1,4 @@
+from typing import Iterable, List, Set
 from django.db import models
 
 
@@ -13,5 +14,78 @@ class BaseModel(models.Model):
         abstract = True
 
 
+class DirtyTrackingModel(BaseModel):
+    """
+    Abstract model that keeps track of which fields have been assigned to since it was last
+    loaded from or saved to the database, so that saving it only writes those fields, and
+    doesn't touch the database at all if there are none. Fields count as changed when they're
+    assigned to, whatever the value: the same row is often loaded more than once in a phase,
+    and another copy of it may have saved a different value in the meantime.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.mark_clean()
+        return instance
+
+    def __setattr__(self, name, value):
+        assigned = self.__dict__.get('_assigned_fields')
+        if assigned is not None:
+            assigned.add(name)
+        super().__setattr__(name, value)
+
+    def mark_clean(self):
+        """
+        Forgets which fields have been assigned to, as when this has just been loaded or saved
+        """
+        self.__dict__['_assigned_fields'] = set()
+
+    def dirty_fields(self) -> List[str]:
+        """
+        :return: the names of the fields that have been assigned to since this was last loaded
+            or saved; every field, if this has never been loaded or saved
+        """
+        assigned: Set[str] = self.__dict__.get('_assigned_fields')
+        return [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and (assigned is None or field.attname in assigned)
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.__dict__.get('_assigned_fields') is not None and not self._state.adding \
+                and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            dirty = self.dirty_fields()
+            if not dirty:
+                return
+            kwargs['update_fields'] = dirty
+        super().save(*args, **kwargs)
+        self.mark_clean()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.mark_clean()
+
+
+def save_changed(model, instances: Iterable[DirtyTrackingModel]) -> int:
+    """
+    Writes whatever has changed in the given instances of a model to the database, all at once
+    :param model: the DirtyTrackingModel subclass the instances belong to
+    :param instances: instances of that model, each already saved to the database at some point
+    :return: how many of the instances had changes to write
+    """
+    changed = [instance for instance in instances if instance.dirty_fields()]
+    if not changed:
+        return 0
+    fields = sorted({field for instance in changed for field in instance.dirty_fields()})
+    model.objects.bulk_update(changed, fields)
+    for instance in changed:
+        instance.mark_clean()
+    return len(changed)
+
+
 def maxlength(cls):
     return len(max(cls.choices, key=lambda k: len(k[0]))[0])
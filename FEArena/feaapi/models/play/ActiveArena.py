@@ -1,13 +1,15 @@
 from django.db import models
-from .._util import BaseModel
+from .._util import DirtyTrackingModel
+from datetime import datetime
 from typing import List, Dict
 from .ActiveTeam import ActiveTeam
 from .ActiveUnit import ActiveUnit
 from .GameFormat import GameFormat
 from ..core.Game import FireEmblemGame
+from ...api.calc.rng import CounterRNG
 
 
-class ActiveArena(BaseModel):
+class ActiveArena(DirtyTrackingModel):
     id: str = models.CharField(primary_key=True, max_length=20)
     team0: ActiveTeam = models.ForeignKey(ActiveTeam, default=None, null=True, blank=True, on_delete=models.SET_NULL,
                                           related_name='+')
@@ -22,10 +24,34 @@ class ActiveArena(BaseModel):
     turn: int = models.IntegerField(default=1)
     phase: int = models.IntegerField(default=0)
     game_over: bool = models.BooleanField(default=False)
+    # goes up by one with every phase processed; see ArenaPhase for what each one changed
+    version: int = models.IntegerField(default=0)
 
     # this field included for internal use only. Actions will tell the arena whether the turn should end.
     turn_should_end: bool = models.BooleanField(default=False)
 
+    # set once the battle is over, to when the arena should be deleted; see api.arena.reaper
+    expires_at: datetime = models.DateTimeField(default=None, null=True, blank=True, db_index=True)
+
+    # every random roll in this arena comes from the stream these two determine; see the rng property
+    rng_seed: int = models.BigIntegerField(default=0)
+    rng_counter: int = models.BigIntegerField(default=0)
+
+    @property
+    def rng(self) -> CounterRNG:
+        """
+        :return: this arena's random number stream, picking up where the last saved phase left off
+        """
+        if getattr(self, '_rng', None) is None:
+            self._rng = CounterRNG(self.rng_seed, self.rng_counter)
+        return self._rng
+
+    def save(self, *args, **kwargs):
+        # remember how far along the random number stream we are
+        if getattr(self, '_rng', None) is not None:
+            self.rng_counter = self._rng.counter
+        super().save(*args, **kwargs)
+
     def advance_phase(self) -> List[Dict]:
         """
         Advances the current phase, moving to the next team that isn't null or empty.
@@ -56,16 +82,47 @@ class ActiveArena(BaseModel):
         """
         return [self.team0, self.team1, self.team2, self.team3][self.phase]
 
+    def unit_teams(self) -> Dict[int, ActiveTeam]:
+        """
+        Returns the team each of this arena's units is on, by unit id. This is loaded the first
+        time it's needed, then kept with the arena, and kept up to date by remove_unit().
+        """
+        unit_teams = self.__dict__.get('_unit_teams')
+        if unit_teams is None:
+            teams = {team.id: team for team in self.teams()}
+            unit_teams = {
+                unit_id: teams[team_id] for unit_id, team_id in ActiveTeam.units.through.objects.filter(
+                    activeteam_id__in=teams).values_list('activeunit_id', 'activeteam_id')
+            }
+            self.__dict__['_unit_teams'] = unit_teams
+        return unit_teams
+
     def team_containing_unit(self, unit: ActiveUnit) -> ActiveTeam:
         """
-        Returns the first team containing the given unit. Throws a ValueError if not found.
+        Returns the team containing the given unit. Throws a ValueError if not found.
         :param unit: ActiveUnit to search for
         :return: the team containing the given unit
         """
-        for team in self.teams():
-            if unit in team.units.all():
-                return team
-        raise ValueError(f"Unit with id {unit.id} is not in any of this arena's teams")
+        team = self.unit_teams().get(unit.id)
+        if team is None:
+            raise ValueError(f"Unit with id {unit.id} is not in any of this arena's teams")
+        return team
+
+    def remove_unit(self, unit: ActiveUnit) -> ActiveTeam:
+        """
+        Takes the given unit off of the team it's on, e.g. because it has died. Throws a ValueError
+        if it isn't on any of this arena's teams.
+        :param unit: ActiveUnit to remove
+        :return: the team the unit was on
+        """
+        team = self.team_containing_unit(unit)
+        team.units.remove(unit)
+        del self.unit_teams()[unit.id]
+        # ranked support bonuses depend on who's left on the team; see api.calc.support
+        support_table = self.__dict__.get('support_table')
+        if support_table is not None:
+            support_table.remove_unit(unit, team)
+        return team
 
     def to_dict(self):
         """
@@ -80,5 +137,6 @@ class ActiveArena(BaseModel):
                 team.to_dict() for team in [self.team0, self.team1, self.team2, self.team3] if team
             ],
             'turn': self.turn,
-            'phase': self.phase
+            'phase': self.phase,
+            'version': self.version
         }
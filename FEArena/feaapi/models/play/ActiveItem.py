@@ -1,10 +1,10 @@
 from django.db import models
-from .._util import BaseModel
+from .._util import DirtyTrackingModel
 from ..core.Item import Item
 from ..build.BuiltItem import BuiltItem
 
 
-class ActiveItem(BaseModel):
+class ActiveItem(DirtyTrackingModel):
     id: int = models.AutoField(primary_key=True)
     template: Item = models.ForeignKey(Item, on_delete=models.CASCADE)
     equipped: bool = models.BooleanField(default=False)
@@ -29,15 +29,19 @@ class ActiveItem(BaseModel):
         }
 
     @staticmethod
-    def from_BuiltItem(item: BuiltItem) -> 'ActiveItem':
+    def from_BuiltItem(item: BuiltItem, save: bool = True) -> 'ActiveItem':
         """
-        Creates, saves, and returns a new ActiveItem initialized from the given Item as a template
+        Returns a new ActiveItem initialized from the given BuiltItem's Item as a template
+        :param item: the BuiltItem to copy
+        :param save: whether to save the new ActiveItem to the database, rather than leaving that
+            to the caller (e.g. to insert many at once)
         """
-        active_item = ActiveItem.objects.create(
+        active_item = ActiveItem(
             template=item.template,
             uses=item.template.uses,
             inventory_id=item.inventory_id,
             equipped=item.equipped,
         )
+        if save:
+            active_item.save(force_insert=True)
         return active_item
-
@@ -1,10 +1,10 @@
 from django.db import models
-from .._util import BaseModel
+from .._util import DirtyTrackingModel
 from ..build.BuiltTeam import BuiltTeam
 from .ActiveUnit import ActiveUnit
 
 
-class ActiveTeam(BaseModel):
+class ActiveTeam(DirtyTrackingModel):
     id: int = models.AutoField(primary_key=True)
     template: BuiltTeam = models.ForeignKey(BuiltTeam, on_delete=models.CASCADE)
     units = models.ManyToManyField(ActiveUnit)
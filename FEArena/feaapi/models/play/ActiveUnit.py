@@ -1,12 +1,12 @@
 from django.db import models
-from .._util import BaseModel
+from .._util import DirtyTrackingModel
 from ..build.BuiltUnit import BuiltUnit
 from .ActiveWeapon import ActiveWeapon
 from .ActiveItem import ActiveItem
 from ..core import Skill
 
 
-class ActiveUnit(BaseModel):
+class ActiveUnit(DirtyTrackingModel):
     id: int = models.AutoField(primary_key=True)
     # demographic information should be contained in the template unit
     template: BuiltUnit = models.ForeignKey(BuiltUnit, on_delete=models.CASCADE)
@@ -1,10 +1,10 @@
 from django.db import models
-from .._util import BaseModel
+from .._util import DirtyTrackingModel
 from ..core.Weapon import Weapon
 from ..build.BuiltWeapon import BuiltWeapon
 
 
-class ActiveWeapon(BaseModel):
+class ActiveWeapon(DirtyTrackingModel):
     id: int = models.AutoField(primary_key=True)
     inventory_id: int = models.IntegerField(default=0)
     template: Weapon = models.ForeignKey(Weapon, on_delete=models.CASCADE)
@@ -40,14 +40,19 @@ class ActiveWeapon(BaseModel):
         }
 
     @staticmethod
-    def from_BuiltWeapon(weapon: BuiltWeapon) -> 'ActiveWeapon':
+    def from_BuiltWeapon(weapon: BuiltWeapon, save: bool = True) -> 'ActiveWeapon':
         """
-        Creates, saves, and returns a new ActiveWeapon initialized from the given Weapon as a template
+        Returns a new ActiveWeapon initialized from the given BuiltWeapon's Weapon as a template
+        :param weapon: the BuiltWeapon to copy
+        :param save: whether to save the new ActiveWeapon to the database, rather than leaving that
+            to the caller (e.g. to insert many at once)
         """
-        active_weapon = ActiveWeapon.objects.create(
+        active_weapon = ActiveWeapon(
             template=weapon.template,
             uses=weapon.template.uses,
             inventory_id=weapon.inventory_id,
-            equipped=weapon.equipped
+            equipped=weapon.equipped,
         )
+        if save:
+            active_weapon.save(force_insert=True)
         return active_weapon
@@ -0,0 +1,14 @@
+from django.db import models
+from .._util import BaseModel
+from .ActiveArena import ActiveArena
+
+
+class ArenaPhase(BaseModel):
+    arena: ActiveArena = models.ForeignKey(ActiveArena, on_delete=models.CASCADE, related_name='phases')
+    # the arena's version as of the end of this phase
+    version: int = models.IntegerField()
+    # what the phase changed, as a JSON list conforming to the 'changes' of the action_output_schema
+    changes: str = models.TextField()
+
+    class Meta:
+        unique_together = (('arena', 'version'),)
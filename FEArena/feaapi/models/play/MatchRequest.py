@@ -15,3 +15,13 @@ class MatchRequest(BaseModel):
     num_players: int = models.IntegerField()
     last_updated: datetime = models.DateTimeField(auto_now=True)
     arena_id: str = models.CharField(max_length=20, default=None, null=True, blank=True)
+    # an outstanding request is dropped if its user stops checking on it by this time; None never expires
+    expires_at: datetime = models.DateTimeField(default=None, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # outstanding requests by bucket, for the matchmaker
+            models.Index(fields=['arena_id', 'game_format', 'num_players']),
+            # a user's outstanding requests
+            models.Index(fields=['by', 'arena_id']),
+        ]
@@ -0,0 +1,20 @@
+from django.db import models
+from django.contrib.auth.models import User
+from .._util import BaseModel
+from .GameFormat import GameFormat
+
+# the rating every player starts out with in each format
+DEFAULT_RATING = 1500.0
+
+
+class PlayerRating(BaseModel):
+    """
+    A user's Elo rating in one game format, used to match them against players of similar skill
+    """
+    user: User = models.ForeignKey(User, on_delete=models.CASCADE)
+    game_format: GameFormat = models.ForeignKey(GameFormat, on_delete=models.CASCADE)
+    rating: float = models.FloatField(default=DEFAULT_RATING)
+    games: int = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = (('user', 'game_format'),)
@@ -6,3 +6,5 @@ from .ActiveItem import ActiveItem
 from .GameFormat import GameFormat
 from .SkillData import SkillData
 from .MatchRequest import MatchRequest
+from .ArenaPhase import ArenaPhase
+from .PlayerRating import PlayerRating
@@ -1,48 +1,17 @@
+from typing import Dict, List, Optional
+from django.db.models import Prefetch
+from ..build.BuiltClass import BuiltClass
 from ..build.BuiltUnit import BuiltUnit
 from ..build.BuiltTeam import BuiltTeam
 from .ActiveUnit import ActiveUnit
 from .ActiveItem import ActiveItem
 from .ActiveWeapon import ActiveWeapon
 from .ActiveTeam import ActiveTeam
+from .._util import save_changed
 from ...api import skills
 from ...api.calc import stats
 
 
-def ActiveUnit_from_BuiltUnit(built_unit: BuiltUnit):
-    """
-    Creates and saves an ActiveUnit object and all component parts.
-    :param built_unit: unit template to copy, for building this active unit. It is expected
-                       that this built_unit has already been saved to database.
-    """
-    # assign unit and template
-    unit = ActiveUnit.objects.create(template=built_unit)
-    # create weapons and items, and invoke 'equip' skills for the weapons equipped at creation
-    # ignore summaries, since this is creation-time
-    for weapon in unit.template.weapons.all():
-        unit.weapons.add(ActiveWeapon.from_BuiltWeapon(weapon))
-        if weapon.equipped:
-            skills.equip_all(weapon.template.weapon_effects.all(), unit)
-    for item in unit.template.items.all():
-        unit.items.add(ActiveItem.from_BuiltItem(item))
-        if item.equipped:
-            skills.equip_all(item.template.weapon_effects.all(), unit)
-    # apply passive skills
-    for skill in skills.accumulate(
-            personal=built_unit.unit,
-            unit_class=built_unit.unit_class,
-            active_weapons=unit.weapons.all(),
-            active_items=unit.items.all(),
-            extra=built_unit.extra_skills.all(),
-    ):
-        if skill.passive_effect:
-            skills.passive[skill.passive_effect](unit)
-    # calculate current HP manually from max HP (max_hp mod may have been altered)
-    unit.current_hp = stats.calc_max_hp(unit)
-    # save and return unit
-    unit.save()
-    return unit
-
-
 def ActiveTeam_from_BuiltTeam(built_team: BuiltTeam):
     """
     Creates and saves an ActiveTeam object and all component parts.
@@ -52,9 +21,84 @@ def ActiveTeam_from_BuiltTeam(built_team: BuiltTeam):
     # safety check to make using this method more straightforward for ActiveArena
     if built_team is None:
         return None
-    # actually assign important attributes
-    team = ActiveTeam.objects.create(template=built_team)
-    for built_unit in built_team.units.all():
-        team.units.add(ActiveUnit_from_BuiltUnit(built_unit))
-    team.save()
-    return team
+    return ActiveTeams_from_BuiltTeams([built_team])[0]
+
+
+def ActiveTeams_from_BuiltTeams(built_teams: List[Optional[BuiltTeam]]) -> List[Optional[ActiveTeam]]:
+    """
+    Creates and saves an ActiveTeam object and all component parts for each of the given teams,
+    all at once: the templates are loaded together, and each kind of active object is inserted
+    in a single query, so the number of queries doesn't grow with the size or number of teams
+    (passive skills aside, which may make queries of their own).
+    :param built_teams: team templates to copy, each of which is expected to have already been
+                        saved to database. A team may appear more than once, and may be None.
+    :return: the new ActiveTeams, in the same order as the given BuiltTeams (None for None)
+    """
+    templates: Dict[int, BuiltTeam] = BuiltTeam.objects.select_related('owned_by').prefetch_related(
+        Prefetch('units', queryset=BuiltUnit.objects.select_related('unit', 'unit_class').prefetch_related(
+            'weapons__template__weapon_effects',
+            'items__template__item_effects',
+            'extra_skills',
+            'unit__personal_skills',
+            'unit_class__class_skills',
+            Prefetch('unit_class_history', queryset=BuiltClass.objects.select_related('template')),
+        ))
+    ).in_bulk([built_team.id for built_team in built_teams if built_team is not None])
+    # build everything in memory, applying 'equip' skills for what's equipped at creation
+    # (ignoring summaries, since this is creation-time)
+    teams = [ActiveTeam(template=templates[bt.id]) if bt is not None else None for bt in built_teams]
+    team_units: List[List[ActiveUnit]] = []
+    unit_weapons: List[List[ActiveWeapon]] = []
+    unit_items: List[List[ActiveItem]] = []
+    for team in teams:
+        if team is None:
+            continue
+        units = []
+        for built_unit in team.template.units.all():
+            unit = ActiveUnit(template=built_unit)
+            weapons = [ActiveWeapon.from_BuiltWeapon(weapon, save=False) for weapon in built_unit.weapons.all()]
+            items = [ActiveItem.from_BuiltItem(item, save=False) for item in built_unit.items.all()]
+            for weapon in weapons:
+                if weapon.equipped:
+                    skills.equip_all(weapon.template.weapon_effects.all(), unit)
+            for item in items:
+                if item.equipped:
+                    skills.equip_all(item.template.item_effects.all(), unit)
+            units.append(unit)
+            unit_weapons.append(weapons)
+            unit_items.append(items)
+        team_units.append(units)
+    created_teams = [team for team in teams if team is not None]
+    all_units = [unit for units in team_units for unit in units]
+    ActiveTeam.objects.bulk_create(created_teams)
+    ActiveUnit.objects.bulk_create(all_units)
+    ActiveWeapon.objects.bulk_create([weapon for weapons in unit_weapons for weapon in weapons])
+    ActiveItem.objects.bulk_create([item for items in unit_items for item in items])
+    ActiveTeam.units.through.objects.bulk_create([
+        ActiveTeam.units.through(activeteam_id=team.id, activeunit_id=unit.id)
+        for team, units in zip(created_teams, team_units) for unit in units
+    ])
+    ActiveUnit.weapons.through.objects.bulk_create([
+        ActiveUnit.weapons.through(activeunit_id=unit.id, activeweapon_id=weapon.id)
+        for unit, weapons in zip(all_units, unit_weapons) for weapon in weapons
+    ])
+    ActiveUnit.items.through.objects.bulk_create([
+        ActiveUnit.items.through(activeunit_id=unit.id, activeitem_id=item.id)
+        for unit, items in zip(all_units, unit_items) for item in items
+    ])
+    # apply passive skills, now that the units exist for them to act on, then
+    # calculate current HP manually from max HP (max_hp mod may have been altered)
+    for unit, weapons, items in zip(all_units, unit_weapons, unit_items):
+        unit.mark_clean()
+        for skill in skills.accumulate(
+                personal=unit.template.unit,
+                unit_class=unit.template.unit_class,
+                active_weapons=weapons,
+                active_items=items,
+                extra=unit.template.extra_skills.all(),
+        ):
+            if skill.passive_effect:
+                skills.passive[skill.passive_effect](unit)
+        unit.current_hp = stats.calc_max_hp(unit, list(unit.template.unit_class_history.all()))
+    save_changed(ActiveUnit, all_units)
+    return teams
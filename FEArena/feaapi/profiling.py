@@ -0,0 +1,150 @@
+"""
+file: profiling.py
+
+Per-request cost accounting: how many SQL queries were made and how long they took, how
+long each skill hook ran for, and how long was spent (de)serializing JSON. Nothing is
+collected unless a profile is active (see profile()), and until then the hooks in this
+module cost a single context variable lookup, so they can stay in place in production.
+"""
+import functools
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional
+from django.db import connection
+from django.http import HttpRequest, JsonResponse
+
+_active_profile: ContextVar[Optional['Profile']] = ContextVar('active_profile', default=None)
+
+
+class Profile:
+    """
+    The accumulated costs of one request (or any other unit of work)
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.queries = 0
+        self.db_ms = 0.0
+        self.total_ms = 0.0
+        # time spent in each category of work, e.g. 'json' or 'skill.before_combat', and how often
+        self.timings: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, category: str, ms: float):
+        """
+        Records that the given number of milliseconds were spent on the given category of work
+        """
+        self.timings[category] = self.timings.get(category, 0.0) + ms
+        self.counts[category] = self.counts.get(category, 0) + 1
+
+    def _time_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_ms += (time.perf_counter() - start) * 1000
+
+    def to_dict(self) -> Dict:
+        """
+        :return: this profile as a JSON-serializable dict, with times in milliseconds
+        """
+        return {
+            "name": self.name,
+            "total_ms": round(self.total_ms, 3),
+            "queries": self.queries,
+            "db_ms": round(self.db_ms, 3),
+            "timings": {
+                category: {"ms": round(ms, 3), "count": self.counts[category]}
+                for category, ms in sorted(self.timings.items())
+            },
+        }
+
+    def server_timing(self) -> str:
+        """
+        :return: this profile as the value of a Server-Timing HTTP header
+        """
+        metrics = [f'db;dur={self.db_ms:.3f};desc="{self.queries} queries"']
+        metrics += [f'{category.replace(".", "-")};dur={ms:.3f}' for category, ms in sorted(self.timings.items())]
+        metrics.append(f'total;dur={self.total_ms:.3f}')
+        return ', '.join(metrics)
+
+
+@contextmanager
+def profile(name: str) -> Iterator[Profile]:
+    """
+    Collects the costs of everything done inside the with-block, on this thread, into a new Profile
+    :param name: what is being profiled, e.g. the request's method and path
+    :return: the Profile, which is complete once the with-block exits
+    """
+    prof = Profile(name)
+    token = _active_profile.set(prof)
+    start = time.perf_counter()
+    try:
+        with connection.execute_wrapper(prof._time_query):
+            yield prof
+    finally:
+        prof.total_ms = (time.perf_counter() - start) * 1000
+        _active_profile.reset(token)
+
+
+def active_profile() -> Optional[Profile]:
+    """
+    :return: the Profile currently collecting costs, if there is one
+    """
+    return _active_profile.get()
+
+
+@contextmanager
+def timed(category: str):
+    """
+    Adds the time spent inside the with-block to the given category of the active Profile, if any
+    """
+    prof = _active_profile.get()
+    if prof is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        prof.add(category, (time.perf_counter() - start) * 1000)
+
+
+def profiled(category: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator that adds the time spent in every call to the function to the given category
+    of the active Profile, if any
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active_profile.get() is None:
+                return func(*args, **kwargs)
+            with timed(category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def load_json(request: HttpRequest) -> Any:
+    """
+    :return: the body of the given request, parsed as JSON
+    """
+    with timed('json'):
+        return json.load(request)
+
+
+def json_response(data: Any, **kwargs) -> JsonResponse:
+    """
+    :param data: the body of the response, to be serialized as JSON
+    :param kwargs: any other arguments to JsonResponse
+    :return: a JsonResponse containing the given data
+    """
+    with timed('json'):
+        return JsonResponse(data, **kwargs)
+
+
+__all__ = ['Profile', 'profile', 'active_profile', 'timed', 'profiled', 'load_json', 'json_response']
@@ -24,8 +24,13 @@ urlpatterns = [
     re_path(r'teambuilder/teams/(\d+)/?', teambuilder.single_team),
     re_path(r'teambuilder/teams/?', teambuilder.get_teams),
     re_path(r'teambuilder/add/?', teambuilder.build_team),
+    re_path(r'arena/request/(\d+)/cancel/?', arena.cancel_match_request),
+    re_path(r'arena/request/(\d+)/wait/?', arena.wait_for_match),
+    re_path(r'arena/request/(\d+)/events/?', arena.match_request_events),
     re_path(r'arena/request/(\d+)/?', arena.check_match_request_status),
     re_path(r'arena/request/?', arena.request_match),
     re_path(r'arena/([A-Za-z0-9_-]+)/act/?', arena.submit_action),
+    re_path(r'arena/([A-Za-z0-9_-]+)/forecast/?', arena.forecast_attack),
+    re_path(r'arena/([A-Za-z0-9_-]+)/events/?', arena.arena_events),
     re_path(r'arena/([A-Za-z0-9_-]+)/?', arena.get_arena_data),
 ]
@@ -1,11 +1,22 @@
 from django.http import (
-    HttpRequest, HttpResponse, JsonResponse, HttpResponseBadRequest, HttpResponseNotAllowed, HttpResponseNotFound,
+    HttpRequest, HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, HttpResponseNotFound,
+    StreamingHttpResponse,
 )
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
-import json
+from django.views.decorators.http import condition
+from typing import Optional
+from .. import profiling
 from ..api.arena import arena
 
+DEFAULT_MATCH_WAIT = 25.0
+# how often a match status stream sends a keep-alive comment, and how long it stays open for
+MATCH_EVENTS_KEEPALIVE = 15.0
+MATCH_EVENTS_DURATION = 300.0
+# likewise for arena event streams
+ARENA_EVENTS_KEEPALIVE = 15.0
+ARENA_EVENTS_DURATION = 600.0
+
 
 # POST
 @login_required
@@ -18,7 +29,7 @@ def request_match(request: HttpRequest) -> HttpResponse:
     """
     if request.method != 'POST':
         return HttpResponseNotAllowed(['POST'])
-    req_body = json.load(request)
+    req_body = profiling.load_json(request)
     try:
         with transaction.atomic():
             request_id = arena.request_match(request.user, req_body)
@@ -48,20 +59,176 @@ def check_match_request_status(request: HttpRequest, url_request_id: str) -> Htt
         return HttpResponseBadRequest("No match request with the given id exists for this user")
 
 
+# POST
+@login_required
+def cancel_match_request(request: HttpRequest, url_request_id: str) -> HttpResponse:
+    """
+    Given the urlencoded request_id, withdraw the match request, if its match hasn't started yet.
+    :param request: request, including user info
+    :param url_request_id: match request ID, from urlencoded value
+    :return: HTTP 200 if the request was cancelled, or a HTTP 400 if there's no such request
+        or its match has already started
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    try:
+        arena.cancel_match_request(request.user, int(url_request_id))
+    except ValueError as e:
+        return HttpResponseBadRequest(e)
+    return HttpResponse(status=200)
+
+
+# GET
+@login_required
+@transaction.non_atomic_requests
+def wait_for_match(request: HttpRequest, url_request_id: str) -> HttpResponse:
+    """
+    Long-polling version of check_match_request_status: if the match hasn't started yet,
+    holds the request open until it does, or until `timeout` seconds (a query parameter)
+    have passed.
+    :param request: request, including user info
+    :param url_request_id: match request ID, from urlencoded value
+    :return: HTTP 304 if match still hasn't started, or HTTP 200 response containing
+        a single token which is the arena ID, so the user can request arena info
+    """
+    try:
+        timeout = float(request.GET.get('timeout', DEFAULT_MATCH_WAIT))
+    except ValueError:
+        return HttpResponseBadRequest("timeout must be a number of seconds")
+    try:
+        arena_id = arena.wait_for_match(request.user, int(url_request_id), timeout)
+    except ValueError:
+        return HttpResponseBadRequest("No match request with the given id exists for this user")
+    if arena_id is None:
+        return HttpResponse(status=304)
+    return HttpResponse(arena_id, status=200)
+
+
+# GET
+@login_required
+@transaction.non_atomic_requests
+def match_request_events(request: HttpRequest, url_request_id: str) -> HttpResponse:
+    """
+    Server-sent events version of check_match_request_status. The stream sends a `matched`
+    event, whose data is the arena ID, as soon as the match starts, and then closes. If the
+    match hasn't started after a few minutes, it sends a `timeout` event and closes instead,
+    and the client should reconnect. If the request is cancelled or expires meanwhile, it
+    sends a `withdrawn` event and closes.
+    :param request: request, including user info
+    :param url_request_id: match request ID, from urlencoded value
+    :return: a HTTP 400 if there's no such match request, or a text/event-stream response
+    """
+    try:
+        request_id = int(url_request_id)
+        arena_id = arena.check_request_status(request.user, request_id)
+    except ValueError:
+        return HttpResponseBadRequest("No match request with the given id exists for this user")
+    user = request.user
+
+    def events():
+        nonlocal arena_id
+        waited = 0.0
+        while arena_id is None and waited < MATCH_EVENTS_DURATION:
+            yield ": keep-alive\n\n"
+            try:
+                arena_id = arena.wait_for_match(user, request_id, MATCH_EVENTS_KEEPALIVE)
+            except ValueError:
+                yield "event: withdrawn\ndata:\n\n"
+                return
+            waited += MATCH_EVENTS_KEEPALIVE
+        if arena_id is None:
+            yield "event: timeout\ndata:\n\n"
+        else:
+            yield f"event: matched\ndata: {arena_id}\n\n"
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _arena_etag(request: HttpRequest, arena_id: str) -> Optional[str]:
+    try:
+        version = arena.get_arena_version(arena_id)
+    except ValueError:
+        return None
+    # the full arena and the changes since each version are all different representations
+    return f"{arena_id}-{version}-{request.GET.get('since', 'full')}"
+
+
 # GET
+@condition(etag_func=_arena_etag)
 def get_arena_data(request: HttpRequest, arena_id: str) -> HttpResponse:
     """
     Returns the current state of the ActiveArena with the given ID, as JSON
-    conforming to the active_arena_schema defined in api.arena.schemas
-    :param request: unused, the HTTP request
+    conforming to the active_arena_schema defined in api.arena.schemas. If the
+    `since` query parameter is given, returns only the changes made since that
+    version of the arena instead, conforming to the arena_changes_schema.
+    The response has an ETag, which changes whenever the arena does.
+    :param request: the HTTP request, possibly with `since` and If-None-Match
+    :param arena_id: the urlencoded arena id
+    :return: a HTTP 404 if the arena does not exist, a HTTP 304 if the arena
+        hasn't changed since the client's copy, a HTTP 400 if `since` is not a
+        version the arena has reached, or a HTTP 200 containing the arena data
+    """
+    since = request.GET.get('since')
+    if since is None:
+        try:
+            return profiling.json_response(arena.get_arena_info(arena_id))
+        except ValueError:
+            return HttpResponseNotFound()
+    try:
+        arena.get_arena_version(arena_id)
+    except ValueError:
+        return HttpResponseNotFound()
+    try:
+        return profiling.json_response(arena.get_arena_changes(arena_id, int(since)))
+    except ValueError as e:
+        return HttpResponseBadRequest(e)
+
+
+# GET
+@transaction.non_atomic_requests
+def arena_events(request: HttpRequest, arena_id: str) -> HttpResponse:
+    """
+    Streams the changes made by each phase of the arena with the given ID as server-sent
+    events, as the phases are processed. Each event is named `changes`, and its data is the
+    output of that phase, conforming to action_output_schema from api.arena.schemas. A client
+    that reconnects with a Last-Event-ID header is first sent any phases it missed. Event IDs
+    are arena versions, the same as the ones `since` takes when fetching the arena. The stream
+    closes after the battle ends, or after a while, in which case the client should reconnect.
+    :param request: the HTTP request
     :param arena_id: the urlencoded arena id
-    :return: a HTTP 404 if the arena does not exist, or a HTTP 200 containing
-        active arena data, conforming to active_arena_schema from api.arena.schemas
+    :return: a HTTP 404 if the arena does not exist, or a text/event-stream response
     """
     try:
-        return JsonResponse(arena.get_arena_info(arena_id))
+        channel, version = arena.follow_arena(arena_id)
     except ValueError:
         return HttpResponseNotFound()
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', version))
+    except ValueError:
+        return HttpResponseBadRequest("Last-Event-ID must be an event id from this stream")
+    missed = arena.get_arena_phases(arena_id, last_event_id) if last_event_id < version else []
+
+    def events():
+        nonlocal last_event_id
+        waited = 0.0
+        yield ": keep-alive\n\n"
+        for last_event_id, changes in missed:
+            yield f'id: {last_event_id}\nevent: changes\ndata: {{"changes": {changes}}}\n\n'
+        while waited < ARENA_EVENTS_DURATION:
+            new_events = channel.events_after(last_event_id, ARENA_EVENTS_KEEPALIVE)
+            for last_event_id, data in new_events:
+                yield f"id: {last_event_id}\nevent: changes\ndata: {data}\n\n"
+            if channel.closed and last_event_id >= channel.last_event_id:
+                return
+            if not new_events:
+                waited += ARENA_EVENTS_KEEPALIVE
+                yield ": keep-alive\n\n"
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    return response
 
 
 # POST
@@ -80,10 +247,29 @@ def submit_action(request: HttpRequest, arena_id: str) -> HttpResponse:
         return HttpResponseNotAllowed(['POST'])
     try:
         with transaction.atomic():
-            return JsonResponse(arena.process_phase(
+            return profiling.json_response(arena.process_phase(
                 request.user,
                 arena_id,
-                json.load(request)
+                profiling.load_json(request)
             ))
     except ValueError as e:
         return HttpResponseBadRequest(e)
+
+
+# POST
+@login_required
+def forecast_attack(request: HttpRequest, arena_id: str) -> HttpResponse:
+    """
+    Forecasts the outcome of the attack contained in the request (must conform to the
+    forecast_input_schema defined in api.arena.schemas) without carrying it out
+    :param request: POST request including user info and the prospective attack
+    :param arena_id: the id of the arena the attack would take place in
+    :return: a HTTP 400 if there's a problem (error as the body), or a HTTP 200
+        containing JSON conforming to forecast_output_schema
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    try:
+        return profiling.json_response(arena.forecast_attack(request.user, arena_id, profiling.load_json(request)))
+    except ValueError as e:
+        return HttpResponseBadRequest(e)
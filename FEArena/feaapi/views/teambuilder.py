@@ -1,11 +1,11 @@
 from django.http import (
-    HttpRequest, HttpResponse, JsonResponse, HttpResponseBadRequest, HttpResponseNotAllowed, HttpResponseServerError,
+    HttpRequest, HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, HttpResponseServerError,
     HttpResponseForbidden, HttpResponseNotFound
 )
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
-import json
+from .. import profiling
 import logging
 from ..api.teambuilder import build
 
@@ -22,9 +22,9 @@ def build_team(request: HttpRequest) -> HttpResponse:
         return HttpResponseNotAllowed(['POST'])
     try:
         with transaction.atomic():
-            instructions = json.load(request)
+            instructions = profiling.load_json(request)
             data = build.build_team(request.user, instructions)
-            return JsonResponse(data)
+            return profiling.json_response(data)
     except ValueError as e:
         return HttpResponseBadRequest(str(e))
     except IndexError as e:
@@ -40,7 +40,7 @@ def get_teams(request: HttpResponse) -> HttpResponse:
     :return: a HTTPResponse consisting of a list of BuiltTeam data conforming to the built_team_schema
     """
     print("All Teams")
-    return JsonResponse(build.get_all_teams(request.user), safe=False)
+    return profiling.json_response(build.get_all_teams(request.user), safe=False)
 
 
 @login_required
@@ -55,7 +55,7 @@ def single_team(request: HttpRequest, team_id: int) -> HttpResponse:
     if request.method == 'GET':
         try:
             data = build.get_team(request.user, team_id)
-            return JsonResponse(data)
+            return profiling.json_response(data)
         except ValueError:
             return HttpResponseForbidden()
         except ObjectDoesNotExist: